@@ -0,0 +1,50 @@
+"""add notes search_vector for full-text keyword search
+
+Adds a stored, generated tsvector column over note titles (weight A) and
+content (weight B) and a GIN index on it.  Databases created by
+`Base.metadata.create_all` after this change already have both, so every
+statement is idempotent.  Adding a stored generated column rewrites the
+table; the index is built concurrently so writes are not blocked meanwhile.
+
+Postgres only; other databases are left unchanged.
+
+Revision ID: a3f9c1d2e4b5
+Revises:
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f9c1d2e4b5'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(content, '')), 'B')"
+)
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute(
+        "ALTER TABLE notes ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({SEARCH_VECTOR_SQL}) STORED"
+    )
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_notes_search_vector ON notes USING gin (search_vector)")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("DROP INDEX IF EXISTS ix_notes_search_vector")
+    op.execute("ALTER TABLE notes DROP COLUMN IF EXISTS search_vector")
@@ -0,0 +1,48 @@
+"""add a unique index on open tasks per note and description
+
+Extracted tasks are saved with INSERT ... ON CONFLICT DO NOTHING, which
+relies on this partial unique index over (tenant, note, status, description
+hash) for open tasks.  Open duplicates created before the index existed are
+deleted first, keeping the oldest of each.  The index is built concurrently
+so writes are not blocked meanwhile.
+
+Postgres only; other databases are left unchanged.
+
+Revision ID: b7d2e8f4a1c6
+Revises: a3f9c1d2e4b5
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2e8f4a1c6'
+down_revision: Union[str, None] = 'a3f9c1d2e4b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute(
+        "DELETE FROM tasks WHERE id IN ("
+        "SELECT id FROM (SELECT id, row_number() OVER ("
+        "PARTITION BY tenant_id, note_id, md5(description) ORDER BY created_at, id) AS n "
+        "FROM tasks WHERE status = 'open') ranked WHERE n > 1)"
+    )
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_tasks_open_description "
+            "ON tasks (tenant_id, note_id, status, md5(description)) WHERE status = 'open'"
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("DROP INDEX IF EXISTS uq_tasks_open_description")
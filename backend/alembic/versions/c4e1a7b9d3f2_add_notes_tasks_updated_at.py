@@ -0,0 +1,44 @@
+"""add notes tasks_updated_at for write-time task extraction
+
+Records which version of each note its stored tasks were extracted from, so
+the task worker extracts every note once per version.  Existing notes start
+out NULL and are extracted by `scripts/extract_note_tasks.py` or on their
+next write.  Tasks get a `source`, set for tasks extracted at write time;
+only those are replaced when their note changes, so existing tasks (NULL)
+are never removed.  Databases created by `Base.metadata.create_all` after
+this change already have both columns, so they are only added if missing.
+
+Revision ID: c4e1a7b9d3f2
+Revises: b7d2e8f4a1c6
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e1a7b9d3f2'
+down_revision: Union[str, None] = 'b7d2e8f4a1c6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _columns(table: str) -> set:
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade() -> None:
+    if 'tasks_updated_at' not in _columns('notes'):
+        op.add_column('notes', sa.Column('tasks_updated_at', sa.DateTime(timezone=True), nullable=True))
+    if 'source' not in _columns('tasks'):
+        op.add_column('tasks', sa.Column('source', sa.String(length=16), nullable=True))
+
+
+def downgrade() -> None:
+    if 'source' in _columns('tasks'):
+        op.drop_column('tasks', 'source')
+    if 'tasks_updated_at' in _columns('notes'):
+        op.drop_column('notes', 'tasks_updated_at')
@@ -0,0 +1,54 @@
+"""add note_chunks with each note's chunk text, hashes and embeddings
+
+Notes are split into chunks once, when they are written, and the index
+worker stores each chunk's embedding alongside, so index rebuilds read
+vectors from the database instead of re-splitting and re-embedding notes.
+Existing notes get their rows on their next write, the next index update
+that touches them, or a run of `scripts/create_faiss_index.py`.  Databases
+created by `Base.metadata.create_all` after this change already have the
+table, so it is only created if missing.
+
+Revision ID: d8b3f5c2e7a9
+Revises: c4e1a7b9d3f2
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8b3f5c2e7a9'
+down_revision: Union[str, None] = 'c4e1a7b9d3f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_table(name: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade() -> None:
+    if _has_table('note_chunks'):
+        return
+    op.create_table(
+        'note_chunks',
+        sa.Column(
+            'note_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('notes.id', ondelete='CASCADE'), nullable=False
+        ),
+        sa.Column('ordinal', sa.Integer(), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('text', sa.Text(), nullable=False),
+        sa.Column('token_count', sa.Integer(), nullable=False),
+        sa.Column('embedding', sa.LargeBinary(), nullable=True),
+        sa.Column('embedding_model', sa.String(length=64), nullable=True),
+        sa.PrimaryKeyConstraint('note_id', 'ordinal'),
+    )
+
+
+def downgrade() -> None:
+    if _has_table('note_chunks'):
+        op.drop_table('note_chunks')
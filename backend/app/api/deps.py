@@ -1,6 +1,8 @@
 """
 Common dependencies used in API routers.
 """
+from uuid import UUID
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
@@ -21,10 +23,10 @@ def get_current_user(
     token = credentials.credentials
     try:
         payload = decode_token(token)
-        user_id: str = payload.get("sub")
-        tenant_id: str = payload.get("tenant_id")
-        if user_id is None or tenant_id is None:
+        if payload.get("sub") is None or payload.get("tenant_id") is None:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authentication credentials")
+        user_id = UUID(payload["sub"])
+        tenant_id = UUID(payload["tenant_id"])
     except Exception:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authentication credentials")
     user = db.query(User).filter(User.id == user_id, User.tenant_id == tenant_id).first()
@@ -8,8 +8,19 @@ from fastapi import APIRouter, Depends
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
+from ...core.cache import cache_stats
 from ...core.database import get_db
 from ...core.config import settings
+from ...models.user import User
+from ...rag.embedding_cache import get_embedding_cache
+from ...rag.embedding_service import get_embedding_service
+from ...rag.faiss_index import get_index_watcher, index_cache_stats, search_stats
+from ...rag.context_packer import packing_stats
+from ...rag.ranking import ranking_stats
+from ...rag.structured_answer import structured_answer_stats
+from ...services.index_scheduler import get_index_scheduler
+from ...services.task_service import get_task_scheduler
+from ..deps import require_admin
 
 
 router = APIRouter()
@@ -67,3 +78,30 @@ def liveness_check() -> Dict[str, str]:
         "timestamp": datetime.utcnow().isoformat()
     }
 
+
+@router.get("/metrics", response_model=Dict[str, Any])
+def metrics(_: User = Depends(require_admin)) -> Dict[str, Any]:
+    """Internal cache and indexing counters for this worker process.
+
+    Admin only, since the index cache and schedulers report per-tenant keys.
+    
+    Returns:
+        Response cache hit rates, embedding cache, batching, index cache
+        residency, search latency by filter selectivity, result fusion,
+        de-duplication and context packing totals, JSON-mode task extraction
+        totals, and per-tenant index and task extraction scheduler statistics.
+    """
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "response_cache": cache_stats(),
+        "embedding_cache": get_embedding_cache().stats(),
+        "embedding_service": get_embedding_service().stats(),
+        "index_cache": index_cache_stats(),
+        "index_sync": get_index_watcher().stats(),
+        "search": search_stats(),
+        "ranking": ranking_stats(),
+        "context_packing": packing_stats(),
+        "structured_answer": structured_answer_stats(),
+        "index_scheduler": get_index_scheduler().stats(),
+        "task_scheduler": get_task_scheduler().stats(),
+    }
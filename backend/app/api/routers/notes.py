@@ -5,14 +5,16 @@ from datetime import datetime
 from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
 from ...core.cache import cache_get, cache_set, get_cache_key, cache_delete_pattern
 from ...core.database import get_db
 from ...models.note import Note
 from ...schemas.note import NoteCreate, NoteRead, NoteUpdate
-from ...services.index_service import rebuild_index_for_tenant
+from ...services.index_scheduler import get_index_scheduler
+from ...services.index_service import refresh_note_chunks
+from ...services.task_service import get_task_scheduler
 from ..deps import get_current_user, require_admin
 
 
@@ -74,7 +76,6 @@ def list_notes(
 @router.post("/", response_model=NoteRead, status_code=status.HTTP_201_CREATED)
 def create_note(
     note_in: NoteCreate,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user),
 ) -> NoteRead:
@@ -84,7 +85,8 @@ def create_note(
     authenticated user and tenant.  Admins can create notes on behalf of other
     users within their tenant.
     
-    After creation, the FAISS index is automatically rebuilt in the background.
+    After creation, the note's chunks are added to the FAISS index and its
+    tasks are extracted in the background.
     """
     if note_in.tenant_id != current_user.tenant_id:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Tenant mismatch")
@@ -97,6 +99,7 @@ def create_note(
         content=note_in.content,
         tags=note_in.tags,
     )
+    refresh_note_chunks(note)
     db.add(note)
     db.commit()
     db.refresh(note)
@@ -105,8 +108,10 @@ def create_note(
     cache_delete_pattern(f"notes:tenant_id:{note_in.tenant_id}:*")
     cache_delete_pattern(f"search:tenant_id:{note_in.tenant_id}:*")
     
-    # Rebuild index in background (note: don't pass db session to background task)
-    background_tasks.add_task(rebuild_index_for_tenant, str(note_in.tenant_id))
+    # Queue the note for indexing; the scheduler batches writes per tenant
+    get_index_scheduler().schedule_note(str(note_in.tenant_id), str(note.id))
+    # ...and for task extraction, likewise in the background
+    get_task_scheduler().schedule_note(str(note_in.tenant_id), str(note.id))
     
     return NoteRead.model_validate(note)
 
@@ -126,18 +131,20 @@ def get_note(note_id: UUID, db: Session = Depends(get_db), current_user=Depends(
 def update_note(
     note_id: UUID,
     note_in: NoteUpdate,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user),
 ) -> NoteRead:
-    """Update a note. FAISS index is automatically rebuilt in the background."""
+    """Update a note. Its FAISS chunks and tasks are replaced in the background."""
     note = db.query(Note).filter(Note.id == note_id, Note.tenant_id == current_user.tenant_id).first()
     if not note:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Note not found")
     if current_user.role != "admin" and note.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorised to update this note")
-    for field, value in note_in.model_dump(exclude_unset=True).items():
+    changes = note_in.model_dump(exclude_unset=True)
+    for field, value in changes.items():
         setattr(note, field, value)
+    if "content" in changes:
+        refresh_note_chunks(note)
     note.updated_at = datetime.utcnow()
     db.commit()
     db.refresh(note)
@@ -146,8 +153,9 @@ def update_note(
     cache_delete_pattern(f"notes:tenant_id:{note.tenant_id}:*")
     cache_delete_pattern(f"search:tenant_id:{note.tenant_id}:*")
     
-    # Rebuild index in background
-    background_tasks.add_task(rebuild_index_for_tenant, str(note.tenant_id))
+    # Queue the note for re-indexing and task extraction
+    get_index_scheduler().schedule_note(str(note.tenant_id), str(note.id))
+    get_task_scheduler().schedule_note(str(note.tenant_id), str(note.id))
     
     return NoteRead.model_validate(note)
 
@@ -155,11 +163,10 @@ def update_note(
 @router.delete("/{note_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_note(
     note_id: UUID,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user)
 ) -> None:
-    """Delete a note. FAISS index is automatically rebuilt in the background."""
+    """Delete a note. Its FAISS chunks are removed in the background."""
     note = db.query(Note).filter(Note.id == note_id, Note.tenant_id == current_user.tenant_id).first()
     if not note:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Note not found")
@@ -174,5 +181,5 @@ def delete_note(
     cache_delete_pattern(f"notes:tenant_id:{tenant_id}:*")
     cache_delete_pattern(f"search:tenant_id:{tenant_id}:*")
     
-    # Rebuild index in background
-    background_tasks.add_task(rebuild_index_for_tenant, tenant_id)
\ No newline at end of file
+    # Queue removal of the note's chunks from the index
+    get_index_scheduler().schedule_note(tenant_id, str(note_id), deleted=True)
\ No newline at end of file
@@ -3,23 +3,52 @@ Search and knowledge assistant endpoints.
 
 This router provides a semantic search endpoint powered by the RAG pipeline.  It
 returns summarised answers and extracted tasks based on the user's query.
+`/search/stream` returns the same result as server-sent events, sending the
+retrieved chunks before the answer is generated.
 """
-from typing import Any, Dict, Optional
+import json
+import logging
+from typing import Any, Dict, Iterator, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from ...core.cache import cache_get, cache_set, get_cache_key
-from ...core.database import get_db
+from ...core.database import SessionLocal, get_db
 from ..deps import get_current_user
-from ...services.rag_service import query_assistant
+from ...services.rag_service import query_assistant_async, retrieve_chunks, stream_assistant
 
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
+SEARCH_CACHE_TTL = 300
+
+
+def _search_cache_key(current_user, user_id: Optional[str], **params: Any) -> str:
+    return get_cache_key(
+        "search",
+        tenant_id=str(current_user.tenant_id),
+        user_id=user_id or "",
+        query=params["q"],
+        top_k=params["top_k"],
+        start_date=params["start_date"] or "",
+        end_date=params["end_date"] or "",
+        tags=params["tags"] or "",
+        keyword_search=params["keyword_search"],
+        quality=params["quality"],
+    )
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
 
 @router.get("/", response_model=Dict[str, Any])
-def semantic_search(
+async def semantic_search(
     request: Request,
     q: str = Query(..., min_length=1, description="The natural language query"),
     top_k: int = Query(5, ge=1, le=20, description="Number of results to retrieve"),
@@ -27,16 +56,25 @@ def semantic_search(
     end_date: Optional[str] = Query(None, description="Filter notes until this date (ISO format)"),
     tags: Optional[str] = Query(None, description="Comma-separated list of tags to filter by"),
     keyword_search: bool = Query(False, description="Also perform keyword search and combine results"),
+    quality: Optional[str] = Query(
+        None,
+        pattern="^(fast|balanced|accurate)$",
+        description="Vector search effort: fast (lower latency), balanced (tuned default) or accurate (higher recall)",
+    ),
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user),
 ) -> Dict[str, Any]:
     """Perform semantic search across the current tenant's notes.
 
-    The assistant retrieves relevant chunks, summarises them and extracts tasks.
+    The assistant retrieves relevant chunks, summarises them and returns the
+    tasks stored for the notes they came from.
     Users can only search their own notes unless they are tenant admins.
     
     Supports advanced filtering by date range and tags, and can combine
     semantic search with keyword search for better results.
+
+    The summary completion runs on the async OpenAI client, so a slow LLM
+    does not hold a threadpool worker.
     
     Rate limited: 100 requests per hour per user, 1000 per hour per tenant.
     """
@@ -46,24 +84,24 @@ def semantic_search(
     user_id = None if current_user.role == "admin" else str(current_user.id)
     
     # Check cache first
-    cache_key = get_cache_key(
-        "search",
-        tenant_id=str(current_user.tenant_id),
-        user_id=user_id or "",
-        query=q,
+    cache_key = _search_cache_key(
+        current_user,
+        user_id,
+        q=q,
         top_k=top_k,
-        start_date=start_date or "",
-        end_date=end_date or "",
-        tags=tags or "",
+        start_date=start_date,
+        end_date=end_date,
+        tags=tags,
         keyword_search=keyword_search,
+        quality=quality,
     )
     
-    cached_result = cache_get(cache_key)
+    cached_result = await run_in_threadpool(cache_get, cache_key)
     if cached_result:
         return cached_result
     
     try:
-        result = query_assistant(
+        result = await query_assistant_async(
             db,
             tenant_id=str(current_user.tenant_id),
             query=q,
@@ -73,12 +111,105 @@ def semantic_search(
             end_date=end_date,
             tags=tags,
             keyword_search=keyword_search,
+            quality=quality,
         )
         
         # Cache result for 5 minutes
-        cache_set(cache_key, result, ttl=300)
+        await run_in_threadpool(cache_set, cache_key, result, SEARCH_CACHE_TTL)
         
         return result
     except RuntimeError as exc:
         # Missing configuration such as API key
-        raise HTTPException(status_code=500, detail=str(exc))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(exc))
+
+
+@router.get("/stream")
+def stream_search(
+    request: Request,
+    q: str = Query(..., min_length=1, description="The natural language query"),
+    top_k: int = Query(5, ge=1, le=20, description="Number of results to retrieve"),
+    start_date: Optional[str] = Query(None, description="Filter notes from this date (ISO format)"),
+    end_date: Optional[str] = Query(None, description="Filter notes until this date (ISO format)"),
+    tags: Optional[str] = Query(None, description="Comma-separated list of tags to filter by"),
+    keyword_search: bool = Query(False, description="Also perform keyword search and combine results"),
+    quality: Optional[str] = Query(
+        None,
+        pattern="^(fast|balanced|accurate)$",
+        description="Vector search effort: fast (lower latency), balanced (tuned default) or accurate (higher recall)",
+    ),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+) -> StreamingResponse:
+    """Perform semantic search, streaming the result as server-sent events.
+
+    Takes the same parameters as `GET /search/`.  Events are sent in order:
+
+    * `chunks`: `{"chunks": [...], "ranking": {...}}` as soon as retrieval finishes
+    * `answer`: `{"delta": "..."}`, repeated as the summary is generated
+    * `tasks`: `{"tasks": [...]}` with the stored tasks of the retrieved notes
+    * `done`: `{"answer": "..."}` with the complete answer
+
+    A failure after the stream has started is reported as an `error` event
+    (`{"detail": "..."}`).  Completed results are written to the same cache
+    as `GET /search/`, and cached results are replayed as events.
+    """
+    request.state.current_user = current_user
+    
+    user_id = None if current_user.role == "admin" else str(current_user.id)
+    tenant_id = str(current_user.tenant_id)
+    cache_key = _search_cache_key(
+        current_user,
+        user_id,
+        q=q,
+        top_k=top_k,
+        start_date=start_date,
+        end_date=end_date,
+        tags=tags,
+        keyword_search=keyword_search,
+        quality=quality,
+    )
+    
+    cached_result = cache_get(cache_key)
+    if cached_result:
+        def replay() -> Iterator[str]:
+            yield _sse("chunks", {"chunks": cached_result["chunks"], "ranking": cached_result.get("ranking")})
+            yield _sse("answer", {"delta": cached_result["answer"]})
+            yield _sse("tasks", {"tasks": cached_result["tasks"]})
+            yield _sse("done", {"answer": cached_result["answer"]})
+
+        return _event_stream(replay())
+    
+    # Retrieve before the response starts, so a missing configuration is
+    # still reported with an error status
+    try:
+        search_results, ranking = retrieve_chunks(
+            db, tenant_id, q, user_id, top_k, start_date, end_date, tags, keyword_search, quality
+        )
+    except RuntimeError as exc:
+        raise HTTPException(status_code=500, detail=str(exc))
+
+    def events() -> Iterator[str]:
+        # The request's session may be closed before the body is streamed,
+        # so reading tasks uses a session owned by the stream
+        stream_db = SessionLocal()
+        try:
+            for event, data in stream_assistant(stream_db, tenant_id, q, user_id, search_results, ranking):
+                if event == "done":
+                    cache_set(cache_key, data, ttl=SEARCH_CACHE_TTL)
+                    data = {"answer": data["answer"]}
+                yield _sse(event, data)
+        except Exception as exc:
+            logger.exception("Streaming search failed for tenant %s", tenant_id)
+            yield _sse("error", {"detail": str(exc)})
+        finally:
+            stream_db.close()
+
+    return _event_stream(events())
+
+
+def _event_stream(events: Iterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -2,12 +2,38 @@
 Redis caching utilities for improving performance.
 """
 import json
-from typing import Any, Optional
+import threading
+from typing import Any, Dict, Optional
 
 import redis
 from ..core.config import settings
 
 
+# Hit/miss counters per key prefix ("search", "notes", ...) for this process
+_stats: Dict[str, Dict[str, int]] = {}
+_stats_lock = threading.Lock()
+
+
+def _count(key: str, outcome: str) -> None:
+    prefix = key.split(":", 1)[0]
+    with _stats_lock:
+        counters = _stats.setdefault(prefix, {"hits": 0, "misses": 0, "errors": 0})
+        counters[outcome] += 1
+
+
+def cache_stats() -> Dict[str, Dict[str, float]]:
+    """Return response cache hit/miss counters by key prefix for this process."""
+    with _stats_lock:
+        return {
+            prefix: {
+                **counters,
+                "hit_rate": counters["hits"] / (counters["hits"] + counters["misses"])
+                if counters["hits"] + counters["misses"] else 0.0,
+            }
+            for prefix, counters in _stats.items()
+        }
+
+
 def get_redis_client() -> Optional[redis.Redis]:
     """Get Redis client. Returns None if Redis is not configured."""
     if not settings.redis_url:
@@ -33,9 +59,12 @@ def cache_get(key: str) -> Optional[Any]:
     try:
         value = client.get(key)
         if value:
+            _count(key, "hits")
             return json.loads(value)
     except Exception:
-        pass
+        _count(key, "errors")
+        return None
+    _count(key, "misses")
     return None
 
 
@@ -43,9 +43,111 @@ class Settings(BaseSettings):
     openai_api_key: str = Field(default="", description="OpenAI API key for embeddings and LLM")
     rag_chunk_size: int = Field(default=512, ge=100, le=2000, description="Text chunk size for RAG")
     rag_overlap: int = Field(default=50, ge=0, le=200, description="Overlap between text chunks")
+    embedding_model: str = Field(default="text-embedding-ada-002", description="OpenAI embedding model")
+    embedding_cache_path: str = Field(
+        default="vector_indexes/embedding_cache.sqlite3", description="SQLite file backing the embedding cache"
+    )
+    embedding_cache_max_entries: int = Field(
+        default=500_000, ge=0, description="Maximum cached embeddings before LRU eviction (0 = unbounded)"
+    )
+    embedding_batch_max_size: int = Field(
+        default=64, ge=1, le=2048, description="Maximum concurrent query embeddings sent in one API call"
+    )
+    embedding_batch_max_wait_ms: float = Field(
+        default=5.0, ge=0.0, le=1000.0, description="How long to wait for more queries before sending a batch"
+    )
+    embedding_build_batch_size: int = Field(
+        default=512, ge=1, le=2048, description="Texts per embedding API call during index builds"
+    )
+    search_exact_max_candidates: int = Field(
+        default=2048, ge=0, description="Filtered searches with at most this many candidates are searched exactly"
+    )
+    search_recall_target: float = Field(
+        default=0.95, gt=0.0, le=1.0, description="recall@k the search parameter tuner aims for"
+    )
+    search_ef_min: int = Field(default=8, ge=1, description="Lower bound on HNSW efSearch after quality hints")
+    search_ef_max: int = Field(default=512, ge=1, description="Upper bound on HNSW efSearch after quality hints")
+    search_candidate_factor: int = Field(
+        default=3, ge=1, le=20, description="Candidates fetched per retriever, per requested result, for fusion"
+    )
+    search_rrf_k: int = Field(default=60, ge=1, description="Reciprocal rank fusion constant")
+    search_mmr_lambda: float = Field(
+        default=0.7, ge=0.0, le=1.0, description="MMR trade-off between relevance (1) and diversity (0)"
+    )
+    search_duplicate_threshold: float = Field(
+        default=0.92, gt=0.0, le=1.0, description="Similarity at which a chunk is pruned as a near-duplicate"
+    )
+    llm_context_token_budget: int = Field(
+        default=2000, ge=100, le=100_000, description="Prompt tokens of retrieved chunk text sent to the LLM per search"
+    )
+    llm_cache_ttl_seconds: int = Field(
+        default=7 * 24 * 3600, ge=0, description="How long LLM outputs are cached by retrieved chunk set (0 disables)"
+    )
+    llm_summary_timeout_seconds: float = Field(
+        default=20.0, gt=0.0, le=300.0, description="Time allowed for the summary completion before falling back"
+    )
+    task_extraction_batch_size: int = Field(
+        default=50, ge=1, le=1000, description="Notes whose tasks are extracted and stored per transaction"
+    )
+    index_cache_max_bytes: int = Field(
+        default=2 * 1024**3, ge=0, description="Resident-size budget for loaded tenant indexes per worker"
+    )
+    index_cache_idle_ttl_seconds: float = Field(
+        default=3600.0, ge=0.0, description="Evict tenant indexes unused for this long (0 = never)"
+    )
+    index_cache_negative_ttl_seconds: float = Field(
+        default=30.0, ge=0.0, description="How long to remember that a tenant has no index"
+    )
+    index_generations_keep: int = Field(
+        default=2, ge=1, description="Published index generations kept on disk per tenant"
+    )
+    index_poll_interval_seconds: float = Field(
+        default=10.0,
+        ge=0.0,
+        description="How often workers check resident tenants for newly published index generations (0 = never)",
+    )
+    index_rebuild_debounce_seconds: float = Field(
+        default=2.0, ge=0.0, le=300.0, description="Window for coalescing index updates per tenant"
+    )
+    index_retry_base_seconds: float = Field(
+        default=5.0, gt=0.0, description="Delay before retrying a failed index or task update; doubles per failure"
+    )
+    index_retry_max_seconds: float = Field(
+        default=300.0, gt=0.0, description="Longest delay between retries of a failing index or task update"
+    )
+    index_compaction_ratio: float = Field(
+        default=0.2, gt=0.0, le=1.0, description="Fraction of tombstoned vectors that triggers index compaction"
+    )
+    index_mmap: bool = Field(
+        default=True, description="Serve indexes memory-mapped so API workers share one copy per node"
+    )
+    index_type: str = Field(
+        default="auto", description="Index family (auto, flat, hnsw, ivf_sq8, ivf_pq); auto picks by tenant size"
+    )
+    index_flat_max_vectors: int = Field(
+        default=10_000, ge=0, description="Tenants with at most this many vectors get an exact flat index"
+    )
+    index_hnsw_max_vectors: int = Field(
+        default=2_000_000, ge=0, description="Largest tenant served from an HNSW index"
+    )
+    index_memory_target_bytes: int = Field(
+        default=1024**3, ge=0, description="Per-tenant index memory target; larger tenants get quantised IVF indexes"
+    )
+    index_ivf_nprobe: int = Field(default=16, ge=1, description="Inverted lists probed per IVF search")
+    index_rerank_factor: int = Field(
+        default=4, ge=1, le=100, description="IVF candidates re-ranked exactly per requested result"
+    )
     log_level: str = Field(default="info", description="Logging level (debug, info, warning, error, critical)")
     environment: str = Field(default="development", description="Environment (development, staging, production)")
     
+    @field_validator("index_type")
+    @classmethod
+    def validate_index_type(cls, v: str) -> str:
+        valid_types = ["auto", "flat", "hnsw", "ivf_sq8", "ivf_pq"]
+        if v.lower() not in valid_types:
+            raise ValueError(f"index_type must be one of {valid_types}")
+        return v.lower()
+
     @field_validator("log_level")
     @classmethod
     def validate_log_level(cls, v: str) -> str:
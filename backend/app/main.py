@@ -12,6 +12,9 @@ from typing import Callable
 from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from slowapi import Limiter, _rate_limit_exceeded_handler
+from slowapi.errors import RateLimitExceeded
+from slowapi.util import get_remote_address
 
 from .core.config import settings
 from .models.base import Base
@@ -21,6 +24,7 @@ from .api.routers import notes as notes_router
 from .api.routers import search as search_router
 from .api.routers import tasks as tasks_router
 from .api.routers import health as health_router
+from .rag.faiss_index import get_index_watcher
 
 # Configure root logger
 logger = logging.getLogger(__name__)
@@ -181,13 +185,17 @@ def create_app() -> FastAPI:
         except Exception as e:
             logger.error(f"Error creating database tables: {e}", exc_info=True)
             raise
-        
+
+        # Pick up index generations published by other workers and build scripts
+        get_index_watcher().start()
+
         logger.info("Application startup complete")
 
     @app.on_event("shutdown")
     def on_shutdown() -> None:
         """Cleanup on shutdown."""
         logger.info("Shutting down application...")
+        get_index_watcher().stop()
 
     return app
 
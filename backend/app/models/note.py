@@ -4,13 +4,33 @@ SQLAlchemy model for diary notes.
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, ForeignKey, String, Text, JSON
+from sqlalchemy import (
+    DDL,
+    JSON,
+    Column,
+    DateTime,
+    ForeignKey,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+    event,
+    literal_column,
+)
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
 from .base import Base
 
 
+# Weighted full-text document for keyword search; title matches rank above
+# content matches.  Postgres keeps it in a stored generated column.
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(content, '')), 'B')"
+)
+
+
 class Note(Base):
     __tablename__ = "notes"
 
@@ -22,9 +42,58 @@ class Note(Base):
     tags = Column(JSON, nullable=True)
     created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
     updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
+    # `updated_at` of the version whose extracted tasks are stored
+    tasks_updated_at = Column(DateTime(timezone=True), nullable=True)
 
     user = relationship("User", back_populates="notes")
     tasks = relationship("Task", back_populates="note", cascade="all, delete-orphan")
+    chunks = relationship("NoteChunk", cascade="all, delete-orphan", order_by="NoteChunk.ordinal")
+
+    def __repr__(self) -> str:  # pragma: no cover
+        return f"<Note id={self.id} title={self.title} user_id={self.user_id}>"
+
+
+class NoteChunk(Base):
+    """One chunk of a note's content, as indexed and sent to the LLM.
+
+    Rows are written with the note, so index builds, keyword search and task
+    extraction never re-split note text.  `embedding` holds the chunk's
+    float32 vector once the index worker has computed it, and is kept across
+    note edits for chunks whose text (`content_hash`) is unchanged.
+    """
+
+    __tablename__ = "note_chunks"
+
+    note_id = Column(UUID(as_uuid=True), ForeignKey("notes.id", ondelete="CASCADE"), primary_key=True)
+    ordinal = Column(Integer, primary_key=True)
+    content_hash = Column(String(64), nullable=False)
+    text = Column(Text, nullable=False)
+    token_count = Column(Integer, nullable=False)
+    embedding = Column(LargeBinary, nullable=True)
+    # Model the embedding came from; embeddings of any other model are recomputed
+    embedding_model = Column(String(64), nullable=True)
 
     def __repr__(self) -> str:  # pragma: no cover
-        return f"<Note id={self.id} title={self.title} user_id={self.user_id}>"
\ No newline at end of file
+        return f"<NoteChunk note_id={self.note_id} ordinal={self.ordinal}>"
+
+
+# The column is Postgres-only, so it is added with dialect-specific DDL rather
+# than mapped; other databases (SQLite in tests) use ILIKE keyword matching.
+# Existing databases get it from the Alembic migration.
+note_search_vector = literal_column("notes.search_vector")
+
+event.listen(
+    Note.__table__,
+    "after_create",
+    DDL(
+        "ALTER TABLE notes ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({SEARCH_VECTOR_SQL}) STORED"
+    ).execute_if(dialect="postgresql"),
+)
+event.listen(
+    Note.__table__,
+    "after_create",
+    DDL("CREATE INDEX IF NOT EXISTS ix_notes_search_vector ON notes USING gin (search_vector)").execute_if(
+        dialect="postgresql"
+    ),
+)
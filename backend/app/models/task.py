@@ -4,7 +4,7 @@ SQLAlchemy model for tasks extracted from notes.
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, ForeignKey, String
+from sqlalchemy import DDL, Column, DateTime, ForeignKey, String, event
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -19,6 +19,12 @@ class TaskStatus(str, Enum):
     completed = "completed"
 
 
+class TaskSource(str, Enum):
+    # Extracted from its note when the note was written.  Tasks without a
+    # source predate write-time extraction (they were extracted at search time).
+    note = "note"
+
+
 class Task(Base):
     __tablename__ = "tasks"
 
@@ -31,9 +37,25 @@ class Task(Base):
     status = Column(String(16), nullable=False, default=TaskStatus.open.value)
     created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
     completed_at = Column(DateTime(timezone=True), nullable=True)
+    source = Column(String(16), nullable=True)
 
     user = relationship("User", back_populates="tasks")
     note = relationship("Note", back_populates="tasks")
 
     def __repr__(self) -> str:  # pragma: no cover
-        return f"<Task id={self.id} status={self.status} description={self.description[:20]}>"
\ No newline at end of file
+        return f"<Task id={self.id} status={self.status} description={self.description[:20]}>"
+
+
+# At most one open task per note and description, so concurrent searches can
+# insert extracted tasks with ON CONFLICT DO NOTHING.  The description is
+# hashed to keep index entries small, and completed tasks are excluded so
+# completing a task never conflicts with an open one.  Postgres only; existing
+# databases get it from the Alembic migration.
+event.listen(
+    Task.__table__,
+    "after_create",
+    DDL(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_tasks_open_description "
+        "ON tasks (tenant_id, note_id, status, md5(description)) WHERE status = 'open'"
+    ).execute_if(dialect="postgresql"),
+)
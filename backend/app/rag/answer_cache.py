@@ -0,0 +1,97 @@
+"""
+Cache of LLM outputs keyed by the retrieved chunks.
+
+The `/search/` response cache is keyed by the request parameters and is
+cleared for the whole tenant on every note write.  This second layer keys
+each LLM stage's output by what the model actually sees: the model, the
+stage's prompt version, the normalised query (for stages that use it) and
+a hash of the ordered chunk IDs and texts.  Repeated queries that retrieve
+the same chunks reuse the search summary, and write-time task extraction
+reuses the tasks of chunk text it has seen before (an edit that leaves a
+note's text unchanged, or the same text in another note).  Note writes do
+not invalidate anything: a changed chunk has new text and so a new key.
+Entries expire after `LLM_CACHE_TTL_SECONDS`.
+
+Outputs are only cached when an OpenAI key is configured (the heuristic
+fallbacks are cheap), and values that are None, such as an empty summary
+reply, are never stored.
+"""
+import asyncio
+import hashlib
+import json
+import re
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from ..core.cache import cache_get, cache_set, get_cache_key
+from ..core.config import settings
+
+
+T = TypeVar("T")
+
+_WORD = re.compile(r"\w+")
+
+
+def normalise_query(query: str) -> str:
+    """Lower-case the query and drop punctuation and extra whitespace."""
+    return " ".join(_WORD.findall(query.lower()))
+
+
+def answer_key(
+    stage: str,
+    model: str,
+    prompt_version: int,
+    chunks: List[Dict[str, Any]],
+    query: Optional[str] = None,
+) -> str:
+    """Build the cache key for one LLM stage.
+
+    Args:
+        stage: Stage name ("summary" or "tasks").
+        model: Chat model the stage calls.
+        prompt_version: The stage's `PROMPT_VERSION`.
+        chunks: Retrieved chunks, in the order they are sent to the model.
+        query: The user's query, for stages whose prompt includes it.
+    Returns:
+        Cache key string.
+    """
+    digest = hashlib.sha256()
+    for part in (model, str(prompt_version), normalise_query(query) if query else ""):
+        digest.update(part.encode("utf-8") + b"\0")
+    for chunk in chunks:
+        digest.update(json.dumps([chunk.get("chunk_id"), chunk.get("text", "")]).encode("utf-8") + b"\0")
+    return get_cache_key("llm", stage=stage, digest=digest.hexdigest())
+
+
+def _enabled() -> bool:
+    return bool(settings.openai_api_key) and settings.llm_cache_ttl_seconds > 0
+
+
+def lookup(key: str) -> Optional[Any]:
+    """Return the cached output for `key`, or None."""
+    return cache_get(key) if _enabled() else None
+
+
+def store(key: str, value: Any) -> None:
+    """Cache an LLM output under `key` (None is not stored)."""
+    if value is not None and _enabled():
+        cache_set(key, value, ttl=settings.llm_cache_ttl_seconds)
+
+
+def cached(key: str, compute: Callable[[], T]) -> T:
+    """Return the cached output for `key`, or compute and cache it."""
+    hit = lookup(key)
+    if hit is not None:
+        return hit
+    value = compute()
+    store(key, value)
+    return value
+
+
+async def cached_async(key: str, compute: Callable[[], Awaitable[T]]) -> T:
+    """Async `cached`; Redis is called from a worker thread."""
+    hit = await asyncio.to_thread(lookup, key)
+    if hit is not None:
+        return hit
+    value = await compute()
+    await asyncio.to_thread(store, key, value)
+    return value
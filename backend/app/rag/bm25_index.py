@@ -0,0 +1,234 @@
+"""
+Array-backed BM25 index over a tenant's chunk text.
+
+The lexical index is row-aligned with the tenant's `ChunkStore`: document
+`i` is the store's row `i`, so store filters apply to it directly and it is
+rebuilt, appended to and pruned in the same pass as the store.  Postings are
+kept in CSR form:
+
+* `offsets.npy` int64, len = vocabulary + 1; term `t` owns `offsets[t]:offsets[t + 1]`
+* `rows.npy`    int32 store rows, ascending within each term
+* `tf.npy`      uint16 term frequency of the term in that row
+* `lengths.npy` int32 token count of every row
+* `bm25.json`   vocabulary (term ID = list position) and parameters
+
+Files are loaded memory-mapped like the store's columns.  A query only reads
+the postings of its own terms and scores them with one vectorised
+`np.bincount` over the concatenated posting lists.
+"""
+import json
+import os
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+BM25_FORMAT = 1
+K1 = 1.2
+B = 0.75
+
+_TOKEN = re.compile(r"\w+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have i in is it its me my of on or our so that the "
+    "their them they this to was we were will with you your".split()
+)
+_MAX_TF = np.iinfo(np.uint16).max
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case word tokens without stop words."""
+    return [t for t in _TOKEN.findall(text.lower()) if t not in _STOPWORDS]
+
+
+class BM25Index:
+    """BM25 postings for the rows of one chunk store."""
+
+    def __init__(
+        self,
+        terms: List[str],
+        offsets: np.ndarray,
+        rows: np.ndarray,
+        tf: np.ndarray,
+        lengths: np.ndarray,
+        k1: float = K1,
+        b: float = B,
+    ) -> None:
+        self.terms = terms
+        self.offsets = offsets
+        self.rows = rows
+        self.tf = tf
+        self.lengths = lengths
+        self.k1 = k1
+        self.b = b
+        self._term_ids = {t: i for i, t in enumerate(terms)}
+        self._avg_length = float(np.mean(lengths)) if len(lengths) else 0.0
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+    @classmethod
+    def build(cls, texts: Sequence[str]) -> "BM25Index":
+        """Index `texts`; text `i` becomes row `i`."""
+        vocabulary: Dict[str, int] = {}
+        term_ids: List[int] = []
+        counts = np.zeros(len(texts), dtype=np.int64)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            counts[row] = len(tokens)
+            term_ids.extend(vocabulary.setdefault(t, len(vocabulary)) for t in tokens)
+        rows = np.repeat(np.arange(len(texts), dtype=np.int64), counts)
+        return cls._from_postings(
+            list(vocabulary), np.asarray(term_ids, dtype=np.int64), rows, None, counts.astype(np.int32)
+        )
+
+    @classmethod
+    def _from_postings(
+        cls,
+        terms: List[str],
+        term_ids: np.ndarray,
+        rows: np.ndarray,
+        tf: Optional[np.ndarray],
+        lengths: np.ndarray,
+    ) -> "BM25Index":
+        """Sort (term, row[, tf]) postings into CSR form, counting duplicates if `tf` is None."""
+        keys = term_ids.astype(np.int64) * max(1, len(lengths)) + rows
+        if tf is None:
+            keys, tf = np.unique(keys, return_counts=True)
+        else:
+            order = np.argsort(keys, kind="stable")
+            keys, tf = keys[order], tf[order]
+        term_ids, rows = np.divmod(keys, max(1, len(lengths)))
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(term_ids, minlength=len(terms)))
+        return cls(
+            terms,
+            offsets,
+            rows.astype(np.int32),
+            np.minimum(tf, _MAX_TF).astype(np.uint16),
+            np.asarray(lengths, dtype=np.int32),
+        )
+
+    def _postings(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return (term ID, row, tf) for every posting."""
+        term_ids = np.repeat(np.arange(len(self.terms), dtype=np.int64), np.diff(np.asarray(self.offsets)))
+        return term_ids, np.asarray(self.rows, dtype=np.int64), np.asarray(self.tf)
+
+    def take(self, rows: np.ndarray) -> "BM25Index":
+        """Return an index over `rows` only, renumbered in the given order."""
+        rows = np.asarray(rows, dtype=np.int64)
+        renumber = np.full(len(self.lengths), -1, dtype=np.int64)
+        renumber[rows] = np.arange(len(rows))
+        term_ids, old_rows, tf = self._postings()
+        new_rows = renumber[old_rows]
+        keep = new_rows >= 0
+        lengths = np.asarray(self.lengths)[rows]
+        if np.all(np.diff(rows) > 0):
+            # Row order is preserved (the usual drop), so postings stay sorted
+            offsets = np.zeros(len(self.terms) + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum(np.bincount(term_ids[keep], minlength=len(self.terms)))
+            return BM25Index(self.terms, offsets, new_rows[keep].astype(np.int32), tf[keep], lengths)
+        return BM25Index._from_postings(self.terms, term_ids[keep], new_rows[keep], tf[keep], lengths)
+
+    def concat(self, other: "BM25Index") -> "BM25Index":
+        """Return an index with `other`'s rows appended after these.
+
+        Appended rows sort after every existing row, so each term's merged
+        posting list is its old list followed by its new one; postings are
+        placed directly instead of re-sorted.
+        """
+        vocabulary = dict(self._term_ids)
+        mapping = np.asarray([vocabulary.setdefault(t, len(vocabulary)) for t in other.terms], dtype=np.int64)
+        terms = list(vocabulary)
+        term_ids, rows, tf = self._postings()
+        other_terms, other_rows, other_tf = other._postings()
+        mapped = mapping[other_terms]
+
+        old_counts = np.zeros(len(terms), dtype=np.int64)
+        old_counts[:len(self.terms)] = np.diff(np.asarray(self.offsets))
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(old_counts + np.bincount(mapped, minlength=len(terms)))
+
+        old_positions = offsets[term_ids] + np.arange(len(term_ids)) - np.asarray(self.offsets)[term_ids]
+        new_positions = (
+            offsets[mapped] + old_counts[mapped] + np.arange(len(mapped)) - np.asarray(other.offsets)[other_terms]
+        )
+        merged_rows = np.empty(offsets[-1], dtype=np.int32)
+        merged_tf = np.empty(offsets[-1], dtype=np.uint16)
+        merged_rows[old_positions], merged_tf[old_positions] = rows, tf
+        merged_rows[new_positions], merged_tf[new_positions] = other_rows + len(self.lengths), other_tf
+        lengths = np.concatenate([np.asarray(self.lengths), np.asarray(other.lengths)])
+        return BM25Index(terms, offsets, merged_rows, merged_tf, lengths, self.k1, self.b)
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def save(self, path: str) -> None:
+        os.makedirs(path, exist_ok=True)
+        for name in ("offsets", "rows", "tf", "lengths"):
+            target = os.path.join(path, f"{name}.npy")
+            with open(f"{target}.tmp", "wb") as f:
+                np.save(f, np.ascontiguousarray(getattr(self, name)))
+            os.replace(f"{target}.tmp", target)
+        target = os.path.join(path, "bm25.json")
+        with open(f"{target}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"format": BM25_FORMAT, "k1": self.k1, "b": self.b, "terms": self.terms}, f)
+        os.replace(f"{target}.tmp", target)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "BM25Index":
+        mode = "r" if mmap else None
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode)
+            for name in ("offsets", "rows", "tf", "lengths")
+        }
+        with open(os.path.join(path, "bm25.json"), encoding="utf-8") as f:
+            info = json.load(f)
+        return cls(info["terms"], **arrays, k1=info["k1"], b=info["b"])
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(os.path.join(path, "bm25.json"))
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.offsets.nbytes + self.rows.nbytes + self.tf.nbytes + self.lengths.nbytes)
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every row for `query` (0 for rows matching no term)."""
+        count = len(self.lengths)
+        term_ids = sorted({self._term_ids[t] for t in tokenize(query) if t in self._term_ids})
+        if not count or not term_ids:
+            return np.zeros(count, dtype=np.float32)
+        starts = np.asarray(self.offsets[term_ids])
+        ends = np.asarray(self.offsets[[t + 1 for t in term_ids]])
+        df = ends - starts
+        idf = np.log1p((count - df + 0.5) / (df + 0.5))
+        rows = np.concatenate([np.asarray(self.rows[s:e]) for s, e in zip(starts, ends)])
+        tf = np.concatenate([np.asarray(self.tf[s:e]) for s, e in zip(starts, ends)]).astype(np.float32)
+        norm = self.k1 * (1 - self.b + self.b * np.asarray(self.lengths)[rows] / max(self._avg_length, 1e-9))
+        weights = np.repeat(idf, df) * tf * (self.k1 + 1) / (tf + norm)
+        return np.bincount(rows, weights=weights, minlength=count).astype(np.float32)
+
+    def search(self, query: str, top_k: int, mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the rows and scores of the `top_k` best matches, best first.
+
+        Args:
+            query: Free-text query.
+            top_k: Maximum number of rows to return.
+            mask: Optional boolean row mask (e.g. `ChunkStore.filter_mask`).
+        """
+        scores = self.scores(query)
+        if mask is not None:
+            scores[~mask] = 0.0
+        hits = np.flatnonzero(scores > 0)
+        if len(hits) > top_k:
+            hits = hits[np.argpartition(-scores[hits], top_k - 1)[:top_k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return hits, scores[hits]
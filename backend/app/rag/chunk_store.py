@@ -0,0 +1,502 @@
+"""
+Columnar, memory-mapped chunk metadata store.
+
+Each tenant's chunk metadata is kept as a directory of column files rather
+than a pickled list of dicts:
+
+* `ids.npy`          int64 chunk IDs (ascending, matching the FAISS IDs)
+* `note.npy`         int32 codes into the `notes` dictionary
+* `user.npy`         int32 codes into the `users` dictionary
+* `created_at.npy`   int64 epoch seconds (`MISSING_TIME` when unknown)
+* `tags.npy`         uint64 bitsets, one row per chunk, bits index `tags`
+* `text_offsets.npy` int64 offsets into `text.bin` (len = rows + 1)
+* `text.bin`         UTF-8 chunk text, concatenated
+* `vectors.npy`      optional float32 embeddings, one row per chunk, kept for
+                     indexes that only store compressed codes
+* `tokens.npy`       int32 prompt token count of each chunk's text (stores
+                     written before it existed gain it on their next append)
+* `store.json`       dictionaries, tenant ID, next chunk ID and tombstones
+* `bm25/`            row-aligned BM25 postings over the chunk text
+                     (see `bm25_index.py`)
+
+Columns are loaded with `mmap_mode="r"`, so workers share the OS page cache
+and chunk text is only read for the final top_k hits.  Filters run as
+vectorised NumPy operations over the columns.  Stores are immutable once
+built; `append` and `drop` return new stores for the index writer to save,
+with the lexical index updated in the same pass.
+"""
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from .bm25_index import BM25Index
+from .context_packer import count_tokens
+
+
+STORE_FORMAT = 1
+MISSING_TIME = np.iinfo(np.int64).min
+
+_COLUMNS = ("ids", "note", "user", "created_at", "tags", "text_offsets")
+
+
+def _to_epoch(value: Any) -> int:
+    """Convert a datetime or ISO string to epoch seconds; naive values are UTC."""
+    if value is None or value == "":
+        return MISSING_TIME
+    if not isinstance(value, datetime):
+        try:
+            value = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        except (ValueError, AttributeError):
+            return MISSING_TIME
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def _from_epoch(value: int) -> Optional[str]:
+    if value == MISSING_TIME:
+        return None
+    return datetime.fromtimestamp(int(value), tz=timezone.utc).isoformat()
+
+
+class ChunkStore:
+    """Column-oriented chunk metadata for one tenant's index."""
+
+    def __init__(
+        self,
+        tenant_id: str,
+        columns: Dict[str, np.ndarray],
+        text: np.ndarray,
+        notes: List[str],
+        users: List[str],
+        tags: List[str],
+        next_id: int,
+        tombstones: Iterable[int] = (),
+        lexical: Optional[BM25Index] = None,
+    ) -> None:
+        self.tenant_id = tenant_id
+        self.ids = columns["ids"]
+        self.note = columns["note"]
+        self.user = columns["user"]
+        self.created_at = columns["created_at"]
+        self.tags = columns["tags"]
+        self.text_offsets = columns["text_offsets"]
+        self.vectors: Optional[np.ndarray] = columns.get("vectors")
+        self.tokens: Optional[np.ndarray] = columns.get("tokens")
+        self.text = text
+        self.notes = notes
+        self.users = users
+        self.tag_names = tags
+        self.next_id = next_id
+        self.tombstones = set(int(t) for t in tombstones)
+        self.lexical = lexical
+        self._note_codes = {n: i for i, n in enumerate(notes)}
+        self._user_codes = {u: i for i, u in enumerate(users)}
+        self._tag_bits = {t: i for i, t in enumerate(tags)}
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+    @classmethod
+    def empty(cls, tenant_id: str) -> "ChunkStore":
+        return cls.build(tenant_id, [], [])
+
+    @classmethod
+    def build(
+        cls,
+        tenant_id: str,
+        ids: Sequence[int],
+        records: Sequence[Dict[str, Any]],
+        next_id: Optional[int] = None,
+        tombstones: Iterable[int] = (),
+        notes: Optional[List[str]] = None,
+        users: Optional[List[str]] = None,
+        tags: Optional[List[str]] = None,
+        vectors: Optional[np.ndarray] = None,
+    ) -> "ChunkStore":
+        """Encode chunk metadata dicts (as produced by the indexer) into columns.
+
+        `vectors`, if given, are stored row-aligned with `records`.  The BM25
+        index over the chunk text is built in the same pass.
+        """
+        notes, users, tags = list(notes or []), list(users or []), list(tags or [])
+        note_codes = {n: i for i, n in enumerate(notes)}
+        user_codes = {u: i for i, u in enumerate(users)}
+        tag_bits = {t: i for i, t in enumerate(tags)}
+
+        def code(table: Dict[str, int], names: List[str], value: Any) -> int:
+            value = str(value)
+            if value not in table:
+                table[value] = len(names)
+                names.append(value)
+            return table[value]
+
+        note_col = np.array([code(note_codes, notes, r.get("note_id")) for r in records], dtype=np.int32)
+        user_col = np.array([code(user_codes, users, r.get("user_id")) for r in records], dtype=np.int32)
+        created_col = np.array([_to_epoch(r.get("created_at")) for r in records], dtype=np.int64)
+        record_tags = []
+        for r in records:
+            chunk_tags = r.get("tags") if isinstance(r.get("tags"), list) else []
+            record_tags.append([code(tag_bits, tags, t) for t in chunk_tags])
+        words = max(1, (len(tags) + 63) // 64)
+        tag_col = np.zeros((len(records), words), dtype=np.uint64)
+        for row, bits in enumerate(record_tags):
+            for bit in bits:
+                tag_col[row, bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+
+        texts = [str(r.get("text", "")) for r in records]
+        encoded = [t.encode("utf-8") for t in texts]
+        offsets = np.zeros(len(records) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(b) for b in encoded], dtype=np.int64)
+        text = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+        ids_col = np.asarray(ids, dtype=np.int64)
+        order = np.argsort(ids_col, kind="stable")
+        columns = {
+            "ids": ids_col,
+            "note": note_col,
+            "user": user_col,
+            "created_at": created_col,
+            "tags": tag_col,
+            "text_offsets": offsets,
+            "tokens": np.array(
+                [r["tokens"] if r.get("tokens") is not None else count_tokens(t) for r, t in zip(records, texts)],
+                dtype=np.int32,
+            ),
+        }
+        if vectors is not None:
+            columns["vectors"] = np.asarray(vectors, dtype=np.float32)
+        store = cls(
+            tenant_id,
+            columns,
+            text,
+            notes,
+            users,
+            tags,
+            next_id if next_id is not None else (int(ids_col.max()) + 1 if len(ids_col) else 0),
+            tombstones,
+            BM25Index.build(texts),
+        )
+        if len(order) and np.any(order != np.arange(len(order))):
+            store = store._take(order)
+        return store
+
+    @classmethod
+    def from_metadata(cls, tenant_id: str, metadata: Dict[str, Any]) -> "ChunkStore":
+        """Convert the pickled dict metadata format into a chunk store."""
+        chunk_ids = sorted(metadata["chunks"])
+        return cls.build(
+            tenant_id,
+            chunk_ids,
+            [metadata["chunks"][i] for i in chunk_ids],
+            next_id=metadata["next_id"],
+            tombstones=metadata["tombstones"],
+        )
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def save(self, path: str) -> None:
+        """Write the store to `path`.
+
+        Each file is written beside its target and renamed over it, so readers
+        that have the previous files memory-mapped keep a consistent view.
+        """
+        os.makedirs(path, exist_ok=True)
+
+        def replace(name: str, write) -> None:
+            target = os.path.join(path, name)
+            with open(f"{target}.tmp", "wb") as f:
+                write(f)
+            os.replace(f"{target}.tmp", target)
+
+        for name in _COLUMNS:
+            column = np.ascontiguousarray(getattr(self, name))
+            replace(f"{name}.npy", lambda f, column=column: np.save(f, column))
+        for name, dtype in (("vectors", np.float32), ("tokens", np.int32)):
+            column = getattr(self, name)
+            if column is not None:
+                column = np.ascontiguousarray(column, dtype=dtype)
+                replace(f"{name}.npy", lambda f, column=column: np.save(f, column))
+            elif os.path.exists(os.path.join(path, f"{name}.npy")):
+                os.remove(os.path.join(path, f"{name}.npy"))
+        replace("text.bin", lambda f: f.write(np.ascontiguousarray(self.text).tobytes()))
+        if self.lexical is not None:
+            self.lexical.save(os.path.join(path, "bm25"))
+        elif os.path.isdir(os.path.join(path, "bm25")):
+            shutil.rmtree(os.path.join(path, "bm25"))
+        info = {
+            "format": STORE_FORMAT,
+            "tenant_id": self.tenant_id,
+            "next_id": self.next_id,
+            "tombstones": sorted(self.tombstones),
+            "notes": self.notes,
+            "users": self.users,
+            "tags": self.tag_names,
+        }
+        replace("store.json", lambda f: f.write(json.dumps(info).encode("utf-8")))
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "ChunkStore":
+        mode = "r" if mmap else None
+        columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode) for name in _COLUMNS}
+        for name in ("vectors", "tokens"):
+            if os.path.exists(os.path.join(path, f"{name}.npy")):
+                columns[name] = np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode)
+        text_path = os.path.join(path, "text.bin")
+        if mmap and os.path.getsize(text_path) > 0:
+            text = np.memmap(text_path, dtype=np.uint8, mode="r")
+        else:
+            text = np.fromfile(text_path, dtype=np.uint8)
+        with open(os.path.join(path, "store.json"), encoding="utf-8") as f:
+            info = json.load(f)
+        # Stores written before the lexical index existed have none
+        bm25_path = os.path.join(path, "bm25")
+        lexical = BM25Index.load(bm25_path, mmap=mmap) if BM25Index.exists(bm25_path) else None
+        return cls(
+            info["tenant_id"],
+            columns,
+            text,
+            info["notes"],
+            info["users"],
+            info["tags"],
+            info["next_id"],
+            info["tombstones"],
+            lexical,
+        )
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(os.path.join(path, "store.json"))
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the columns, text blob, token counts and lexical index in bytes.
+
+        Stored vectors are excluded: they are memory-mapped and only the rows
+        being re-ranked are paged in.
+        """
+        lexical = self.lexical.nbytes if self.lexical is not None else 0
+        tokens = self.tokens.nbytes if self.tokens is not None else 0
+        return int(sum(getattr(self, name).nbytes for name in _COLUMNS) + self.text.nbytes + lexical + tokens)
+
+    def filter_mask(self, filters: Dict[str, Any]) -> np.ndarray:
+        """Return a boolean row mask for the search filters.
+
+        Supports `tenant_id`/`user_id` exact match, `start_date`/`end_date`
+        (datetimes or ISO strings; chunks without a date always pass) and
+        `tags` (list or comma-separated string; any tag matches).
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if "tenant_id" in filters and str(filters["tenant_id"]) != self.tenant_id:
+            mask[:] = False
+        if "user_id" in filters:
+            code = self._user_codes.get(str(filters["user_id"]))
+            if code is None:
+                mask[:] = False
+            else:
+                mask &= self.user == code
+
+        dated = self.created_at != MISSING_TIME
+        start = _to_epoch(filters.get("start_date"))
+        if start != MISSING_TIME:
+            mask &= ~dated | (self.created_at >= start)
+        end = _to_epoch(filters.get("end_date"))
+        if end != MISSING_TIME:
+            mask &= ~dated | (self.created_at <= end)
+
+        if "tags" in filters:
+            wanted = filters["tags"]
+            if isinstance(wanted, str):
+                wanted = [t.strip() for t in wanted.split(",")]
+            query_bits = np.zeros(self.tags.shape[1], dtype=np.uint64)
+            for tag in wanted:
+                bit = self._tag_bits.get(tag)
+                if bit is not None:
+                    query_bits[bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+            mask &= (self.tags & query_bits).any(axis=1)
+        return mask
+
+    def matching_ids(self, filters: Dict[str, Any]) -> np.ndarray:
+        return np.asarray(self.ids[self.filter_mask(filters)])
+
+    def rows_for_ids(self, chunk_ids: Sequence[int]) -> np.ndarray:
+        """Return row numbers for chunk IDs, or -1 for unknown IDs."""
+        chunk_ids = np.asarray(chunk_ids, dtype=np.int64)
+        if not len(self):
+            return np.full(len(chunk_ids), -1, dtype=np.int64)
+        rows = np.minimum(np.searchsorted(self.ids, chunk_ids), len(self) - 1)
+        return np.where(np.asarray(self.ids[rows]) == chunk_ids, rows, -1)
+
+    def ids_for_notes(self, note_ids: Iterable[str]) -> np.ndarray:
+        codes = [self._note_codes[n] for n in map(str, note_ids) if n in self._note_codes]
+        if not codes:
+            return np.zeros(0, dtype=np.int64)
+        return np.asarray(self.ids[np.isin(self.note, codes)])
+
+    def chunk_text(self, row: int) -> str:
+        start, end = int(self.text_offsets[row]), int(self.text_offsets[row + 1])
+        return bytes(self.text[start:end]).decode("utf-8")
+
+    def record(self, row: int) -> Dict[str, Any]:
+        """Materialise one row as the chunk metadata dict returned by search."""
+        tag_row = self.tags[row]
+        chunk_tags = [t for bit, t in enumerate(self.tag_names) if int(tag_row[bit // 64]) >> (bit % 64) & 1]
+        record = {
+            "chunk_id": int(self.ids[row]),
+            "note_id": self.notes[int(self.note[row])],
+            "user_id": self.users[int(self.user[row])],
+            "tenant_id": self.tenant_id,
+            "text": self.chunk_text(row),
+            "created_at": _from_epoch(int(self.created_at[row])),
+            "tags": chunk_tags,
+        }
+        if self.tokens is not None:
+            record["tokens"] = int(self.tokens[row])
+        return record
+
+    def vectors_for_ids(self, chunk_ids: Sequence[int]) -> np.ndarray:
+        """Return the stored vectors for known chunk IDs, in order."""
+        if self.vectors is None:
+            raise ValueError("Chunk store has no vectors")
+        return np.asarray(self.vectors[self.rows_for_ids(chunk_ids)], dtype=np.float32)
+
+    def records(self, chunk_ids: Sequence[int]) -> List[Optional[Dict[str, Any]]]:
+        """Materialise chunk IDs in order; unknown IDs yield None."""
+        return [self.record(int(row)) if row >= 0 else None for row in self.rows_for_ids(chunk_ids)]
+
+    # ------------------------------------------------------------------
+    # Mutation (returns new stores)
+    # ------------------------------------------------------------------
+    def _take(self, rows: np.ndarray) -> "ChunkStore":
+        rows = np.asarray(rows, dtype=np.int64)
+        starts = np.asarray(self.text_offsets[rows])
+        lengths = np.asarray(self.text_offsets[rows + 1]) - starts
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(lengths)
+        if len(rows):
+            # Kept rows form a few contiguous runs (one per dropped gap); copy
+            # each run's text with one slice instead of indexing every byte
+            breaks = np.flatnonzero(np.diff(rows) != 1) + 1
+            firsts = rows[np.r_[0, breaks]].tolist()
+            lasts = rows[np.r_[breaks - 1, len(rows) - 1]].tolist()
+            text = np.concatenate([
+                np.asarray(self.text[self.text_offsets[first]:self.text_offsets[last + 1]])
+                for first, last in zip(firsts, lasts)
+            ])
+        else:
+            text = np.zeros(0, dtype=np.uint8)
+        columns = {
+            "ids": np.asarray(self.ids[rows]),
+            "note": np.asarray(self.note[rows]),
+            "user": np.asarray(self.user[rows]),
+            "created_at": np.asarray(self.created_at[rows]),
+            "tags": np.asarray(self.tags[rows]),
+            "text_offsets": offsets,
+        }
+        for name in ("vectors", "tokens"):
+            if getattr(self, name) is not None:
+                columns[name] = np.asarray(getattr(self, name)[rows])
+        lexical = self.lexical.take(rows) if self.lexical is not None else None
+        return ChunkStore(
+            self.tenant_id, columns, text, self.notes, self.users, self.tag_names, self.next_id, self.tombstones,
+            lexical,
+        )
+
+    def drop(self, chunk_ids: Iterable[int], tombstone: bool = False) -> "ChunkStore":
+        """Return a store without `chunk_ids`, optionally recording them as tombstones."""
+        chunk_ids = np.asarray(list(chunk_ids), dtype=np.int64)
+        store = self._take(np.flatnonzero(~np.isin(self.ids, chunk_ids)))
+        if tombstone:
+            store.tombstones |= set(chunk_ids.tolist())
+        return store
+
+    def append(
+        self,
+        chunk_ids: Sequence[int],
+        records: Sequence[Dict[str, Any]],
+        vectors: Optional[np.ndarray] = None,
+    ) -> "ChunkStore":
+        """Return a store with new chunks appended; IDs must exceed existing ones.
+
+        `vectors` are required if, and only if, this store keeps vectors.
+        """
+        added = ChunkStore.build(
+            self.tenant_id,
+            chunk_ids,
+            records,
+            notes=self.notes,
+            users=self.users,
+            tags=self.tag_names,
+        )
+        old_tags, new_tags = np.asarray(self.tags), added.tags
+        if old_tags.shape[1] < new_tags.shape[1]:
+            old_tags = np.hstack([old_tags, np.zeros((len(self), new_tags.shape[1] - old_tags.shape[1]), np.uint64)])
+        columns = {
+            "ids": np.concatenate([np.asarray(self.ids), added.ids]),
+            "note": np.concatenate([np.asarray(self.note), added.note]),
+            "user": np.concatenate([np.asarray(self.user), added.user]),
+            "created_at": np.concatenate([np.asarray(self.created_at), added.created_at]),
+            "tags": np.vstack([old_tags, new_tags]),
+            "text_offsets": np.concatenate(
+                [np.asarray(self.text_offsets), added.text_offsets[1:] + self.text_offsets[-1]]
+            ),
+        }
+        if self.vectors is not None:
+            new_vectors = np.asarray(vectors, dtype=np.float32)
+            columns["vectors"] = np.vstack([np.asarray(self.vectors), new_vectors])
+        old_tokens = self.tokens
+        if old_tokens is None:
+            old_tokens = np.array([count_tokens(self.chunk_text(row)) for row in range(len(self))], dtype=np.int32)
+        columns["tokens"] = np.concatenate([np.asarray(old_tokens), added.tokens])
+        text = np.concatenate([np.asarray(self.text), added.text])
+        next_id = max(self.next_id, added.next_id)
+        lexical = self.lexical.concat(added.lexical) if self.lexical is not None else None
+        return ChunkStore(
+            self.tenant_id, columns, text, added.notes, added.users, added.tag_names, next_id, self.tombstones,
+            lexical,
+        )
+
+    def _columns(self) -> Dict[str, np.ndarray]:
+        columns = {name: getattr(self, name) for name in _COLUMNS}
+        for name in ("vectors", "tokens"):
+            if getattr(self, name) is not None:
+                columns[name] = getattr(self, name)
+        return columns
+
+    def with_tombstones(self, tombstones: Iterable[int]) -> "ChunkStore":
+        """Return a store sharing these columns but with a new tombstone set."""
+        return ChunkStore(
+            self.tenant_id, self._columns(), self.text, self.notes, self.users, self.tag_names, self.next_id,
+            tombstones, self.lexical,
+        )
+
+    def with_vectors(self, vectors: Optional[np.ndarray]) -> "ChunkStore":
+        """Return a store sharing these columns but storing `vectors` (or none)."""
+        columns = {name: column for name, column in self._columns().items() if name != "vectors"}
+        if vectors is not None:
+            columns["vectors"] = np.asarray(vectors, dtype=np.float32)
+        return ChunkStore(
+            self.tenant_id, columns, self.text, self.notes, self.users, self.tag_names, self.next_id, self.tombstones,
+            self.lexical,
+        )
+
+    def with_lexical_index(self) -> "ChunkStore":
+        """Return this store with a lexical index, building one if it has none."""
+        if self.lexical is not None:
+            return self
+        lexical = BM25Index.build([self.chunk_text(row) for row in range(len(self))])
+        return ChunkStore(
+            self.tenant_id, self._columns(), self.text, self.notes, self.users, self.tag_names, self.next_id,
+            self.tombstones, lexical,
+        )
@@ -0,0 +1,128 @@
+"""
+Token-budgeted packing of retrieved chunks into the LLM prompt.
+
+The summary and task prompts used to join every retrieved chunk, however
+large.  `pack_context` instead fills `LLM_CONTEXT_TOKEN_BUDGET` with chunks
+in rank order: chunks that fit are sent whole, the first one that does not
+fit is cut at a word boundary to the remaining budget (if enough remains to
+be useful), and everything after it is dropped.  Prompt cost and latency
+are therefore bounded whatever `top_k` and note sizes are.
+
+Token counts come from `tiktoken` when it is installed (the `cl100k_base`
+encoding used by the GPT-4 models) and from a four-characters-per-token
+estimate otherwise.  The chunk store records each chunk's count when the
+index is built, and search results carry it as `tokens`, so the packer
+rarely has to tokenize anything at query time.
+"""
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # optional; counts fall back to an estimate
+    tiktoken = None
+
+
+ENCODING = "cl100k_base"
+# A truncated chunk shorter than this is dropped instead
+MIN_TRUNCATED_TOKENS = 32
+
+
+@lru_cache()
+def _encoding() -> Optional[Any]:
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding(ENCODING)
+    except Exception:
+        # The encoding file could not be loaded (e.g. no network on first use)
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Number of prompt tokens in `text`."""
+    encoding = _encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut `text` to at most `max_tokens` tokens, ending at a word boundary where possible."""
+    if max_tokens <= 0:
+        return ""
+    encoding = _encoding()
+    if encoding is None:
+        cut = text[:max_tokens * 4]
+    else:
+        tokens = encoding.encode(text, disallowed_special=())
+        cut = encoding.decode(tokens[:max_tokens]) if len(tokens) > max_tokens else text
+    if len(cut) < len(text):
+        # Prefer ending on whitespace unless that would discard most of the cut
+        boundary = max(cut.rfind(" "), cut.rfind("\n"))
+        if boundary > len(cut) // 2:
+            cut = cut[:boundary]
+        cut = cut.rstrip()
+    return cut
+
+
+def pack_context(chunks: List[Dict[str, Any]], budget: int) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """Fit ranked chunks into a token budget.
+
+    Args:
+        chunks: Search results, best first.  A `tokens` count is used when
+            present; otherwise the text is counted.
+        budget: Maximum prompt tokens for the joined chunk text, counting one
+            token for each separating newline.
+    Returns:
+        The chunks to send (a truncated chunk is a copy with shortened
+        `text` and `tokens`) and a report with `packed_tokens`,
+        `dropped_tokens`, `dropped_chunks` and `truncated_chunks`.
+    """
+    counts = [c["tokens"] if c.get("tokens") is not None else count_tokens(c.get("text", "")) for c in chunks]
+    packed: List[Dict[str, Any]] = []
+    used = truncated = 0
+    for chunk, tokens in zip(chunks, counts):
+        separator = 1 if packed else 0
+        remaining = budget - used - separator
+        if tokens <= remaining:
+            packed.append(chunk)
+            used += tokens + separator
+            continue
+        if remaining >= MIN_TRUNCATED_TOKENS:
+            cut = truncate_to_tokens(chunk.get("text", ""), remaining)
+            cut_tokens = count_tokens(cut)
+            if cut and cut_tokens <= remaining:
+                packed.append({**chunk, "text": cut, "tokens": cut_tokens})
+                used += cut_tokens + separator
+                truncated = 1
+        # The budget is spent; lower-ranked chunks are dropped
+        break
+    packed_text_tokens = sum(counts[:len(packed) - truncated]) + (packed[-1]["tokens"] if truncated else 0)
+    report = {
+        "packed_tokens": used,
+        "dropped_tokens": sum(counts) - packed_text_tokens,
+        "dropped_chunks": len(chunks) - len(packed),
+        "truncated_chunks": truncated,
+    }
+    record_packing(report)
+    return packed, report
+
+
+# Per-process totals, reported by /health/metrics
+_stats = {"prompts": 0, "packed_tokens": 0, "dropped_tokens": 0, "dropped_chunks": 0, "truncated_chunks": 0}
+_stats_lock = threading.Lock()
+
+
+def record_packing(report: Dict[str, int]) -> None:
+    with _stats_lock:
+        _stats["prompts"] += 1
+        for name in ("packed_tokens", "dropped_tokens", "dropped_chunks", "truncated_chunks"):
+            _stats[name] += report[name]
+
+
+def packing_stats() -> Dict[str, int]:
+    """Return context packing totals for this process."""
+    with _stats_lock:
+        return dict(_stats)
@@ -0,0 +1,175 @@
+"""
+Persistent embedding cache keyed by content hash.
+
+Embeddings are stored in a local SQLite database keyed by
+(model, sha256 of the chunk text) so that index rebuilds and repeated queries
+only call the embedding API for text that has never been embedded before.
+Vectors are stored as raw float32 bytes.  The cache is bounded by
+`settings.embedding_cache_max_entries`; when it grows past that size the
+least recently used rows are evicted.  Lookups never write: hits are batched
+and their `last_used` times flushed every few hundred hits or a minute, and the
+size is only counted every `_EVICTION_CHECK_ROWS` inserts, so recency and the
+bound are approximate.
+
+The database runs in WAL mode so several worker processes and the index build
+scripts can share one file.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+import numpy as np
+
+from ..core.config import settings
+
+
+# Evict down to this fraction of the limit so eviction does not run on every insert
+_EVICTION_TARGET = 0.9
+# Count the rows (and evict) after this many inserts, at most a tenth of the limit
+_EVICTION_CHECK_ROWS = 1000
+# Flush recorded hits once this many are pending or this long after the last flush
+_TOUCH_FLUSH_SIZE = 500
+_TOUCH_FLUSH_SECONDS = 60.0
+
+
+def content_hash(text: str) -> str:
+    """Return the sha256 hex digest used to key a chunk's embedding."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """A size-bounded, process-safe on-disk embedding cache."""
+
+    def __init__(self, path: str, max_entries: int) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # Hashes hit since the last flush of `last_used`, per model
+        self._touched: Dict[str, Set[str]] = {}
+        self._touched_count = 0
+        self._touched_since = time.monotonic()
+        self._unchecked_inserts = 0
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " hash TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (model, hash))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Look up embeddings for `texts`; missing entries are returned as None."""
+        hashes = [content_hash(t) for t in texts]
+        found: Dict[str, List[float]] = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                    [model, *batch],
+                ).fetchall()
+                for h, blob in rows:
+                    found[h] = np.frombuffer(blob, dtype=np.float32).tolist()
+            self._touch(model, found.keys())
+            results = [found.get(h) for h in hashes]
+            hit_count = sum(1 for r in results if r is not None)
+            self.hits += hit_count
+            self.misses += len(results) - hit_count
+        return results
+
+    def put_many(self, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        """Store embeddings for `texts`, evicting old entries if over capacity."""
+        now = time.time()
+        rows = [
+            (model, content_hash(t), np.asarray(v, dtype=np.float32).tobytes(), now)
+            for t, v in zip(texts, vectors)
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+            self._unchecked_inserts += len(rows)
+            if self._unchecked_inserts >= min(_EVICTION_CHECK_ROWS, max(1, self.max_entries // 10)):
+                self._unchecked_inserts = 0
+                # Recent hits must count before choosing what to evict
+                self._flush_touched()
+                self._evict()
+            self._conn.commit()
+
+    def _touch(self, model: str, hashes: Iterable[str]) -> None:
+        # Caller holds self._lock
+        touched = self._touched.setdefault(model, set())
+        before = len(touched)
+        touched.update(hashes)
+        self._touched_count += len(touched) - before
+        if (
+            self._touched_count >= _TOUCH_FLUSH_SIZE
+            or time.monotonic() - self._touched_since >= _TOUCH_FLUSH_SECONDS
+        ):
+            self._flush_touched()
+            self._conn.commit()
+
+    def _flush_touched(self) -> None:
+        # Caller holds self._lock and commits
+        now = time.time()
+        for model, hashes in self._touched.items():
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE model = ? AND hash = ?",
+                [(now, model, h) for h in hashes],
+            )
+        self._touched = {}
+        self._touched_count = 0
+        self._touched_since = time.monotonic()
+
+    def _evict(self) -> None:
+        if self.max_entries <= 0:
+            return
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        if count <= self.max_entries:
+            return
+        excess = count - int(self.max_entries * _EVICTION_TARGET)
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE rowid IN "
+            "(SELECT rowid FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+            (excess,),
+        )
+        self.evictions += excess
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss counters for this process and the current cache size."""
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": entries,
+                "max_entries": self.max_entries,
+            }
+
+
+@lru_cache()
+def get_embedding_cache() -> EmbeddingCache:
+    """Return the process-wide embedding cache."""
+    directory = os.path.dirname(settings.embedding_cache_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return EmbeddingCache(settings.embedding_cache_path, settings.embedding_cache_max_entries)
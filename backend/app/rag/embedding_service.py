@@ -0,0 +1,140 @@
+"""
+Micro-batched embedding service.
+
+Concurrent callers of `EmbeddingService.embed` are coalesced: a background
+thread collects requests for up to `max_wait_ms` (or until `max_batch_size`
+texts are queued), sends them as a single `embeddings.create(input=[...])`
+call and fans the vectors back out to the waiting callers.  Index builds use
+`embed_many`, which sends large lists directly in batches of
+`build_batch_size`.  One OpenAI client is shared by the whole process.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..core.config import settings
+
+
+class EmbeddingService:
+    """Coalesces embedding requests into batched OpenAI calls."""
+
+    def __init__(
+        self,
+        model: str,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        build_batch_size: int = 512,
+        client: Optional[Any] = None,
+    ) -> None:
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.build_batch_size = build_batch_size
+        self._client = client
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_pid: Optional[int] = None
+        self.requests = 0
+        self.batches = 0
+        self.texts_sent = 0
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            if not settings.openai_api_key:
+                raise RuntimeError("OPENAI_API_KEY is not configured")
+            from openai import OpenAI
+            self._client = OpenAI(api_key=settings.openai_api_key)
+        return self._client
+
+    def embed(self, text: str) -> List[float]:
+        """Embed one text, sharing an API call with concurrent callers."""
+        future: Future = Future()
+        self._ensure_worker()
+        self._queue.put((text, future))
+        return future.result()
+
+    def embed_many(self, texts: List[str]) -> List[List[float]]:
+        """Embed a list of texts.
+
+        A single text is coalesced with concurrent callers like `embed`; larger
+        lists are sent directly in batches of `build_batch_size`.
+        """
+        if not texts:
+            return []
+        if len(texts) == 1:
+            return [self.embed(texts[0])]
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), self.build_batch_size):
+            vectors.extend(self._create(texts[start:start + self.build_batch_size]))
+        return vectors
+
+    def stats(self) -> Dict[str, float]:
+        """Return batching counters for this process."""
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "texts_sent": self.texts_sent,
+            "mean_batch_size": self.texts_sent / self.batches if self.batches else 0.0,
+            "queue_depth": self._queue.qsize(),
+        }
+
+    def _create(self, texts: List[str]) -> List[List[float]]:
+        response = self.client.embeddings.create(input=texts, model=self.model)
+        with self._lock:
+            self.batches += 1
+            self.texts_sent += len(texts)
+        # The API may return items out of order; `index` refers to the input position
+        return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            self.requests += 1
+            # Threads do not survive fork, so restart the worker in each process
+            if self._worker is not None and self._worker.is_alive() and self._worker_pid == os.getpid():
+                return
+            self._worker_pid = os.getpid()
+            self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+            self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: List[Tuple[str, Future]]) -> None:
+        # Identical concurrent queries are embedded once
+        unique = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            vectors = dict(zip(unique, self._create(unique)))
+        except Exception as exc:
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+        for text, future in batch:
+            future.set_result(vectors[text])
+
+
+@lru_cache()
+def get_embedding_service() -> EmbeddingService:
+    """Return the process-wide embedding service."""
+    return EmbeddingService(
+        model=settings.embedding_model,
+        max_batch_size=settings.embedding_batch_max_size,
+        max_wait_ms=settings.embedding_batch_max_wait_ms,
+        build_batch_size=settings.embedding_build_batch_size,
+    )
@@ -5,54 +5,695 @@ This module provides functions to load HNSW indexes per tenant, compute query
 embeddings and perform similarity search.  Indexes and metadata are stored in
 the `vector_indexes/` directory and are loaded on demand.  If an index is
 missing, a ValueError is raised.
+
+Each tenant's files are published as immutable, numbered generations under
+`vector_indexes/tenant_<id>/gen-NNNNNNNN/`, with `manifest.json` naming the
+current one.  A new generation is written to a temporary directory, renamed
+into place and only then made current by atomically replacing the manifest,
+so readers never observe a partially written index.  Writers serialise on
+`tenant_write_lock`, which also holds across processes.  Other workers learn
+about it through `index_sync`.  Because generations are never modified after
+publishing, searches serve them memory-mapped: every worker on a node shares
+the same page cache instead of holding its own copy of the vectors, graph and
+chunk columns.
+
+Indexes are wrapped in an `IndexIDMap2` so every chunk has a stable int64 ID.
+Chunk metadata lives in a columnar `ChunkStore` directory next to the index,
+keyed by those IDs, which also tracks tombstoned IDs that are still present in
+the HNSW graph (HNSW does not support removal) until the index is compacted.
+Legacy pickled metadata (a list of dicts, where the FAISS position doubles as
+the ID, or the later dict format) is converted in memory when loaded; run
+`scripts/migrate_chunk_metadata.py` to convert it on disk.
 """
+import json
+import logging
 import os
 import pickle
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
 from functools import lru_cache
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 
 import faiss
 import numpy as np
 import openai
 
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialised within a process
+    fcntl = None
+
 from ..core.config import settings
+from .chunk_store import ChunkStore
+from .embedding_cache import get_embedding_cache
+from .embedding_service import get_embedding_service
+from .index_cache import MISSING, IndexCache, index_nbytes
+from .index_sync import IndexWatcher, notify_generation
+from .index_types import QUANTIZED, apply_search_params, index_type, search_parameters
 
 
-# In‑memory cache for loaded FAISS indexes
-_index_cache: Dict[str, Tuple[faiss.IndexHNSWFlat, List[Dict[str, Any]]]] = {}
+logger = logging.getLogger(__name__)
 
+INDEX_DIR = "vector_indexes"
+METADATA_FORMAT = 2
+MANIFEST_FORMAT = 1
 
-def load_index(tenant_id: str) -> Tuple[faiss.IndexHNSWFlat, List[Dict[str, Any]]]:
-    """Load FAISS index and metadata for a tenant.  Cache the result in memory."""
-    if tenant_id in _index_cache:
-        return _index_cache[tenant_id]
-    idx_path = f"vector_indexes/index_{tenant_id}.faiss"
-    meta_path = f"vector_indexes/metadata_{tenant_id}.pkl"
-    if not os.path.exists(idx_path) or not os.path.exists(meta_path):
-        raise ValueError(f"Index for tenant {tenant_id} not found; run create_faiss_index.py")
-    index = faiss.read_index(idx_path)
+# In‑memory cache for loaded FAISS indexes, bounded by resident size
+_index_cache = IndexCache(
+    max_bytes=settings.index_cache_max_bytes,
+    idle_ttl=settings.index_cache_idle_ttl_seconds,
+    negative_ttl=settings.index_cache_negative_ttl_seconds,
+)
+# Read flags for serving indexes memory-mapped (IO_FLAG_MMAP_IFC maps flat
+# codes and HNSW graphs too; older FAISS builds can only map IVF lists)
+_MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", getattr(faiss, "IO_FLAG_MMAP", 0))
+# Single-flight guards for loading a tenant's index into the cache
+_load_locks: Dict[str, threading.Lock] = {}
+_load_locks_guard = threading.Lock()
+# Reentrant per-tenant write locks; the outermost holder also holds an flock
+# on the tenant's lock file so writers in other processes wait too
+_write_locks: Dict[str, threading.RLock] = {}
+_write_lock_depth: Dict[str, int] = {}
+_write_locks_guard = threading.Lock()
+
+
+def tenant_dir(tenant_id: str) -> str:
+    """Return the directory holding a tenant's published index generations."""
+    return os.path.join(INDEX_DIR, f"tenant_{tenant_id}")
+
+
+def manifest_path(tenant_id: str) -> str:
+    """Return the path of the manifest naming a tenant's current generation."""
+    return os.path.join(tenant_dir(tenant_id), "manifest.json")
+
+
+def generation_dir(tenant_id: str, generation: int) -> str:
+    return os.path.join(tenant_dir(tenant_id), f"gen-{generation:08d}")
+
+
+def write_lock_path(tenant_id: str) -> str:
+    """Return the lock file serialising writers of a tenant's index.
+
+    It lives beside the tenant directory so removing the index keeps it.
+    """
+    return os.path.join(INDEX_DIR, f".tenant_{tenant_id}.lock")
+
+
+@contextmanager
+def tenant_write_lock(tenant_id: str) -> Iterator[None]:
+    """Hold the tenant's index write lock, across threads and processes.
+
+    Wrap every read-modify-publish cycle of a tenant's index in it: API
+    workers, the index scheduler and the maintenance scripts otherwise race
+    and the last publisher silently drops the others' changes.  The lock is
+    reentrant within a thread.
+    """
+    with _write_locks_guard:
+        lock = _write_locks.setdefault(tenant_id, threading.RLock())
+    with lock:
+        depth = _write_lock_depth.get(tenant_id, 0)
+        fd = None
+        if depth == 0 and fcntl is not None:
+            os.makedirs(INDEX_DIR, exist_ok=True)
+            fd = os.open(write_lock_path(tenant_id), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            except BaseException:
+                os.close(fd)
+                raise
+        _write_lock_depth[tenant_id] = depth + 1
+        try:
+            yield
+        finally:
+            _write_lock_depth[tenant_id] = depth
+            if fd is not None:
+                # Closing the descriptor releases the flock
+                os.close(fd)
+
+
+def index_paths(tenant_id: str, generation: int) -> Tuple[str, str]:
+    """Return the (index file, chunk store directory) paths of a generation."""
+    gen_dir = generation_dir(tenant_id, generation)
+    return os.path.join(gen_dir, "index.faiss"), os.path.join(gen_dir, "chunks")
+
+
+def legacy_index_paths(tenant_id: str) -> Tuple[str, str]:
+    """Return the unversioned (index file, chunk store) paths used before generations."""
+    return (
+        os.path.join(INDEX_DIR, f"index_{tenant_id}.faiss"),
+        os.path.join(INDEX_DIR, f"chunks_{tenant_id}"),
+    )
+
+
+def legacy_metadata_path(tenant_id: str) -> str:
+    """Return the path of the pickled metadata used before the chunk store."""
+    return os.path.join(INDEX_DIR, f"metadata_{tenant_id}.pkl")
+
+
+def upgrade_metadata(raw: Any) -> Dict[str, Any]:
+    """Normalise legacy pickled metadata into the ID-keyed dict format.
+
+    Keys of the result:
+        chunks: chunk ID -> chunk metadata dict.
+        tombstones: chunk IDs removed from `chunks` but still in the index.
+        next_id: next chunk ID to allocate.
+    """
+    if isinstance(raw, dict) and raw.get("format") == METADATA_FORMAT:
+        return raw
+    chunks = dict(enumerate(raw or []))
+    return {"format": METADATA_FORMAT, "next_id": len(chunks), "chunks": chunks, "tombstones": set()}
+
+
+def read_legacy_metadata(tenant_id: str) -> Optional[ChunkStore]:
+    """Load a tenant's pickled metadata as a chunk store, if it exists."""
+    meta_path = legacy_metadata_path(tenant_id)
+    if not os.path.exists(meta_path):
+        return None
     with open(meta_path, "rb") as f:
-        metadata = pickle.load(f)
-    _index_cache[tenant_id] = (index, metadata)
-    return index, metadata
+        return ChunkStore.from_metadata(tenant_id, upgrade_metadata(pickle.load(f)))
+
+
+def read_manifest(tenant_id: str) -> Optional[Dict[str, Any]]:
+    """Return a tenant's manifest, or None if no generation has been published."""
+    try:
+        with open(manifest_path(tenant_id), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def read_faiss_index(path: str, mmap: bool = False) -> faiss.Index:
+    """Read a FAISS index file, optionally memory-mapped read-only.
+
+    Memory-mapped indexes share the OS page cache between worker processes
+    instead of each holding a private copy, but must never be modified.  If
+    this FAISS build cannot map the index, it is read into memory instead.
+    """
+    if mmap and settings.index_mmap and _MMAP_FLAGS:
+        try:
+            return faiss.read_index(path, _MMAP_FLAGS)
+        except RuntimeError as e:
+            logger.warning("Could not memory-map %s, reading it into memory: %s", path, e)
+    return faiss.read_index(path)
+
+
+def _read_legacy_files(tenant_id: str, mmap: bool) -> Optional[Tuple[faiss.Index, ChunkStore]]:
+    idx_path, store_path = legacy_index_paths(tenant_id)
+    if not os.path.exists(idx_path):
+        return None
+    if ChunkStore.exists(store_path):
+        store = ChunkStore.load(store_path)
+    else:
+        store = read_legacy_metadata(tenant_id)
+        if store is None:
+            return None
+    return read_faiss_index(idx_path, mmap=mmap), store
+
+
+def _revision(manifest: Optional[Dict[str, Any]]) -> str:
+    """Identify what a manifest serves: its generation plus tuned search parameters."""
+    if manifest is None:
+        return "legacy"
+    params = json.dumps(manifest.get("search_params") or {}, sort_keys=True)
+    return f"{manifest['generation']}:{params}"
+
+
+def _read_current(tenant_id: str, mmap: bool = False) -> Optional[Tuple[faiss.Index, ChunkStore, str]]:
+    """Read the tenant's current generation as (index, store, revision).
+
+    Tuned search parameters from the manifest are applied to the index.
+    Indexes written before generations were introduced have revision "legacy".
+    """
+    for _ in range(3):
+        manifest = read_manifest(tenant_id)
+        if manifest is None:
+            loaded = _read_legacy_files(tenant_id, mmap)
+            return None if loaded is None else (*loaded, _revision(None))
+        generation = manifest["generation"]
+        idx_path, store_path = index_paths(tenant_id, generation)
+        try:
+            index = read_faiss_index(idx_path, mmap=mmap)
+            apply_search_params(index, manifest.get("search_params") or {})
+            return index, ChunkStore.load(store_path), _revision(manifest)
+        except (RuntimeError, OSError):
+            # The generation was garbage-collected after we read the manifest;
+            # a newer manifest is in place, so read it again.
+            if os.path.isdir(generation_dir(tenant_id, generation)):
+                raise
+    raise RuntimeError(f"Index for tenant {tenant_id} changed repeatedly while loading")
+
+
+def read_index_files(tenant_id: str) -> Optional[Tuple[faiss.Index, ChunkStore]]:
+    """Read a tenant's current index and chunk store from disk, bypassing the cache.
+
+    The index is read into private memory so it can be modified and
+    republished.  Returns None if the index or its metadata is missing.
+    """
+    loaded = _read_current(tenant_id)
+    return None if loaded is None else loaded[:2]
+
+
+def _fsync_tree(path: str) -> None:
+    for root, _, files in os.walk(path):
+        for name in files:
+            fd = os.open(os.path.join(root, name), os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+
+def _generations(tenant_id: str) -> List[int]:
+    try:
+        names = os.listdir(tenant_dir(tenant_id))
+    except FileNotFoundError:
+        return []
+    return sorted(int(name[4:]) for name in names if name.startswith("gen-") and name[4:].isdigit())
+
+
+def write_index_files(
+    tenant_id: str, index: faiss.Index, store: ChunkStore, remove_legacy: bool = True
+) -> int:
+    """Publish a tenant's index and chunk store as a new generation.
+
+    The files are written to a temporary directory, which is renamed to the
+    next free `gen-NNNNNNNN` directory; the manifest is then replaced
+    atomically to point at it.  Readers therefore only ever see complete
+    generations.  Older generations beyond `settings.index_generations_keep`
+    are garbage-collected.  Stores loaded from generations written before
+    the lexical index existed get one built here.
+
+    Returns:
+        The published generation number.
+    """
+    store = store.with_lexical_index()
+    base = tenant_dir(tenant_id)
+    os.makedirs(base, exist_ok=True)
+    with tenant_write_lock(tenant_id):
+        tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=base)
+        try:
+            faiss.write_index(index, os.path.join(tmp_dir, "index.faiss"))
+            store.save(os.path.join(tmp_dir, "chunks"))
+            _fsync_tree(tmp_dir)
+
+            generation = max(_generations(tenant_id), default=0) + 1
+            while True:
+                try:
+                    os.rename(tmp_dir, generation_dir(tenant_id, generation))
+                    break
+                except OSError:
+                    # Another writer claimed this number first
+                    if not os.path.isdir(generation_dir(tenant_id, generation)):
+                        raise
+                    generation += 1
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        kind = index_type(index)
+        manifest = {
+            "format": MANIFEST_FORMAT,
+            "generation": generation,
+            "index_type": kind,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "vectors": int(index.ntotal),
+            "chunks": len(store),
+            "tombstones": len(store.tombstones),
+        }
+        previous = read_manifest(tenant_id)
+        if previous and previous.get("index_type") == kind and previous.get("search_params"):
+            # Tuned parameters stay a good starting point across incremental updates
+            manifest["search_params"] = previous["search_params"]
+        _write_manifest(tenant_id, manifest)
+
+        if remove_legacy:
+            _remove_legacy_files(tenant_id)
+        _collect_garbage(tenant_id, generation)
+        notify_generation(tenant_id, generation)
+        return generation
+
+
+def _write_manifest(tenant_id: str, manifest: Dict[str, Any]) -> None:
+    tmp_manifest = f"{manifest_path(tenant_id)}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_manifest, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_manifest, manifest_path(tenant_id))
+
+
+def write_search_params(tenant_id: str, params: Dict[str, Any]) -> None:
+    """Record tuned search parameters in the tenant's manifest.
+
+    Workers pick them up like a new generation (see `index_sync`) and apply
+    them when the index is loaded.
+
+    Args:
+        tenant_id: Tenant whose current generation was tuned.
+        params: `efSearch` or `nprobe`, plus any measurements worth keeping.
+    Raises:
+        ValueError: If the tenant has no published generation.
+    """
+    with tenant_write_lock(tenant_id):
+        manifest = read_manifest(tenant_id)
+        if manifest is None:
+            raise ValueError(f"Index for tenant {tenant_id} not found; run create_faiss_index.py")
+        manifest["search_params"] = params
+        _write_manifest(tenant_id, manifest)
+    notify_generation(tenant_id, manifest["generation"])
+
+
+def _collect_garbage(tenant_id: str, current: int) -> None:
+    """Delete generations older than the ones retained, plus abandoned temp dirs."""
+    keep = settings.index_generations_keep
+    for generation in _generations(tenant_id):
+        if generation <= current - keep:
+            shutil.rmtree(generation_dir(tenant_id, generation), ignore_errors=True)
+    cutoff = time.time() - 3600
+    base = tenant_dir(tenant_id)
+    for name in os.listdir(base):
+        path = os.path.join(base, name)
+        if name.startswith(".tmp-") and os.path.getmtime(path) < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _remove_legacy_files(tenant_id: str) -> None:
+    idx_path, store_path = legacy_index_paths(tenant_id)
+    for path in (idx_path, legacy_metadata_path(tenant_id)):
+        if os.path.exists(path):
+            os.remove(path)
+    shutil.rmtree(store_path, ignore_errors=True)
+
+
+def remove_index_files(tenant_id: str) -> None:
+    """Unpublish and delete every generation of a tenant's index."""
+    with tenant_write_lock(tenant_id):
+        if os.path.exists(manifest_path(tenant_id)):
+            # Readers stop seeing the index as soon as the manifest is gone
+            os.remove(manifest_path(tenant_id))
+        shutil.rmtree(tenant_dir(tenant_id), ignore_errors=True)
+        _remove_legacy_files(tenant_id)
+    notify_generation(tenant_id, None)
+
+
+def _load_lock(tenant_id: str) -> threading.Lock:
+    with _load_locks_guard:
+        return _load_locks.setdefault(tenant_id, threading.Lock())
+
+
+def invalidate_index(tenant_id: str) -> None:
+    """Drop a tenant's index (or cached absence of one) from the in-memory cache."""
+    _index_cache.invalidate(tenant_id)
+
+
+def index_cache_stats() -> Dict[str, Any]:
+    """Return resident-size and eviction statistics for the index cache."""
+    return _index_cache.stats()
+
+
+def _cache_loaded(tenant_id: str) -> Optional[Tuple[faiss.Index, ChunkStore]]:
+    # Caller holds _load_lock(tenant_id).  Cached indexes are only searched,
+    # so they are served memory-mapped from the immutable generation files.
+    loaded = _read_current(tenant_id, mmap=True)
+    if loaded is None:
+        _index_cache.put_missing(tenant_id)
+        return None
+    index, store, revision = loaded
+    _index_cache.put(tenant_id, (index, store), index_nbytes(index) + store.nbytes, version=revision)
+    return index, store
+
+
+def load_index(tenant_id: str) -> Tuple[faiss.Index, ChunkStore]:
+    """Load FAISS index and chunk store for a tenant.  Cache the result in memory.
+
+    Concurrent misses for the same tenant wait for a single load instead of
+    all reading the files.  Tenants without an index are remembered for a
+    short while so repeated searches do not stat the filesystem.
+    """
+    cached = _index_cache.get(tenant_id)
+    if cached is None:
+        with _load_lock(tenant_id):
+            # Another request may have loaded it while we waited
+            cached = _index_cache.get(tenant_id)
+            if cached is None:
+                cached = _cache_loaded(tenant_id) or MISSING
+    if cached is MISSING:
+        raise ValueError(f"Index for tenant {tenant_id} not found; run create_faiss_index.py")
+    return cached
+
+
+@lru_cache()
+def get_index_watcher() -> IndexWatcher:
+    """Return this process's watcher for generations published elsewhere."""
+    return IndexWatcher(
+        refresh=refresh_index,
+        resident=_index_cache.keys,
+        manifest_path=manifest_path,
+        poll_interval=settings.index_poll_interval_seconds,
+    )
+
+
+def refresh_index(tenant_id: str) -> None:
+    """Swap a tenant's latest published generation (or tuning) into the cache.
+
+    Searches keep using the cached generation until the new one has been
+    loaded, so publishing never causes a burst of reloads.  Tenants that are
+    not resident are only invalidated and load lazily on their next search.
+    """
+    if _index_cache.version(tenant_id) is None:
+        _index_cache.invalidate(tenant_id)
+        return
+    with _load_lock(tenant_id):
+        manifest = read_manifest(tenant_id)
+        if manifest is None:
+            _index_cache.invalidate(tenant_id)
+        elif _revision(manifest) != _index_cache.version(tenant_id):
+            _cache_loaded(tenant_id)
+
+
+def compute_embeddings(texts: List[str]) -> List[List[float]]:
+    """Compute embedding vectors for `texts`, consulting the embedding cache first.
+
+    Only texts missing from the cache go to the embedding service, which
+    coalesces single queries with concurrent callers and sends larger lists in
+    big batches.  Fresh embeddings are written back to the cache.  The cache
+    is best-effort: if it cannot be read or written (a locked or corrupt
+    file, a full disk), the texts are simply embedded.
+    """
+    if not texts:
+        return []
+    service = get_embedding_service()
+    try:
+        cache = get_embedding_cache()
+        vectors = cache.get_many(service.model, texts)
+    except Exception as e:
+        logger.warning("Embedding cache lookup failed, embedding without it: %s", e)
+        cache, vectors = None, [None] * len(texts)
+    missing = [i for i, v in enumerate(vectors) if v is None]
+    if not missing:
+        return vectors
+
+    miss_texts = [texts[i] for i in missing]
+    fresh = service.embed_many(miss_texts)
+    if cache is not None:
+        try:
+            cache.put_many(service.model, miss_texts, fresh)
+        except Exception as e:
+            logger.warning("Could not store %d embeddings in the cache: %s", len(fresh), e)
+    for i, vector in zip(missing, fresh):
+        vectors[i] = vector
+    return vectors
 
 
 def compute_query_embedding(query: str) -> List[float]:
     """Compute an embedding vector for the query using OpenAI."""
-    if not settings.openai_api_key:
-        raise RuntimeError("OPENAI_API_KEY is not configured")
-    
-    # Use newer OpenAI client API (required for openai>=1.0.0)
-    from openai import OpenAI
-    client = OpenAI(api_key=settings.openai_api_key)
-    response = client.embeddings.create(
-        input=query,
-        model="text-embedding-ada-002"
-    )
-    return response.data[0].embedding
+    return compute_embeddings([query])[0]
+
+
+def _vectors_for_ids(index: faiss.Index, store: ChunkStore, ids: np.ndarray) -> np.ndarray:
+    """Full-precision vectors of live chunk IDs.
+
+    Uses the store's vectors when it has them (quantised indexes cannot
+    reconstruct vectors exactly).
+    """
+    if store.vectors is not None:
+        return store.vectors_for_ids(ids)
+    return index.reconstruct_batch(np.asarray(ids, dtype=np.int64))
+
+
+def chunk_vectors(tenant_id: str, chunk_ids: Sequence[Optional[int]]) -> List[Optional[np.ndarray]]:
+    """Return the embedding of each chunk ID, or None for IDs the index does not hold."""
+    try:
+        index, store = load_index(tenant_id)
+    except ValueError:
+        return [None] * len(chunk_ids)
+    ids = np.asarray([-1 if i is None else i for i in chunk_ids], dtype=np.int64)
+    known = store.rows_for_ids(ids) >= 0
+    vectors: List[Optional[np.ndarray]] = [None] * len(chunk_ids)
+    if known.any():
+        for position, vector in zip(np.flatnonzero(known), _vectors_for_ids(index, store, ids[known])):
+            vectors[position] = vector
+    return vectors
+
+
+def live_vectors(index: faiss.Index, store: ChunkStore) -> np.ndarray:
+    """Full-precision vectors of every live chunk, in the store's row order."""
+    if store.vectors is not None:
+        return np.asarray(store.vectors, dtype=np.float32)
+    if not len(store):
+        return np.zeros((0, index.d), dtype=np.float32)
+    return index.reconstruct_batch(np.asarray(store.ids, dtype=np.int64)).astype(np.float32)
 
 
-def semantic_search(tenant_id: str, query: str, top_k: int = 5, filters: Dict[str, Any] | None = None) -> List[Dict[str, Any]]:
+def reranks(index: faiss.Index, store: ChunkStore) -> bool:
+    """Whether searches fetch `settings.index_rerank_factor` times as many hits and re-rank them.
+
+    Quantised indexes only estimate distances; the exact ones come from the
+    full vectors their chunk store keeps.
+    """
+    return index_type(index) in QUANTIZED and store.vectors is not None
+
+
+def exact_search(
+    index: faiss.Index, store: ChunkStore, query_vector: np.ndarray, ids: np.ndarray, k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Brute-force L2 search restricted to `ids`."""
+    vectors = _vectors_for_ids(index, store, ids)
+    distances = ((vectors - query_vector[0]) ** 2).sum(axis=1)
+    k = min(k, len(ids))
+    order = np.argpartition(distances, k - 1)[:k]
+    order = order[np.argsort(distances[order])]
+    return distances[order], ids[order]
+
+
+# Selectivity bucket upper bounds used to aggregate search latency
+_SELECTIVITY_BUCKETS = (0.01, 0.1, 0.5, 1.0)
+_search_stats: Dict[str, Dict[str, float]] = {}
+_search_stats_lock = threading.Lock()
+
+
+def _record_search(selectivity: float, strategy: str, seconds: float) -> None:
+    bucket = next(f"<={b:g}" for b in _SELECTIVITY_BUCKETS if selectivity <= b)
+    with _search_stats_lock:
+        stats = _search_stats.setdefault(bucket, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        stats["count"] += 1
+        stats["total_ms"] += seconds * 1000
+        stats["max_ms"] = max(stats["max_ms"], seconds * 1000)
+        stats[strategy] = stats.get(strategy, 0) + 1
+
+
+def search_stats() -> Dict[str, Dict[str, float]]:
+    """Return search latency aggregated by filter selectivity for this process."""
+    with _search_stats_lock:
+        return {
+            bucket: {**stats, "mean_ms": stats["total_ms"] / stats["count"]}
+            for bucket, stats in _search_stats.items()
+        }
+
+
+def id_bitmap(ids: np.ndarray, size: int) -> np.ndarray:
+    """Pack chunk IDs into the little-endian bitmap used by IDSelectorBitmap."""
+    mask = np.zeros(size, dtype=bool)
+    mask[ids] = True
+    return np.packbits(mask, bitorder="little")
+
+
+def search_vectors(
+    tenant_id: str,
+    query_vector: np.ndarray,
+    top_k: int = 5,
+    filters: Dict[str, Any] | None = None,
+    quality: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Search the tenant's index with an already-computed query vector.
+
+    Filters are evaluated as vectorised column operations on the chunk store
+    and compiled into an ID bitmap before searching.  Small candidate sets are
+    searched exactly; larger ones are pushed into the index search as an ID
+    selector, falling back to an exact search over the candidates if the
+    index returns fewer than `top_k` hits.  Either way, `top_k` results are
+    returned whenever that many chunks match.  Chunk text is only read for the
+    returned hits.
+
+    Quantised (IVF) indexes fetch `settings.index_rerank_factor` times as many
+    candidates and re-rank them exactly against the stored vectors; their
+    results carry the index's estimate as `approx_score` next to the exact
+    `score`.  Every result reports the tenant's `index_type`.
+
+    `quality` ("fast", "balanced" or "accurate") scales the tenant's tuned
+    `efSearch`/`nprobe` within the configured bounds.
+    """
+    started = time.perf_counter()
+    index, store = load_index(tenant_id)
+    kind = index_type(index)
+    query_vector = np.asarray(query_vector, dtype=np.float32).reshape(1, -1)
+
+    # Bitmaps must outlive the search; selectors only hold raw pointers
+    if filters:
+        candidates = store.matching_ids(filters)
+        bitmap = id_bitmap(candidates, store.next_id)
+        selector = faiss.IDSelectorBitmap(bitmap)
+    elif store.tombstones:
+        candidates = None
+        bitmap = id_bitmap(np.asarray(store.ids), store.next_id)
+        selector = faiss.IDSelectorBitmap(bitmap)
+    else:
+        candidates = None
+        selector = None
+
+    live = len(store)
+    expected = min(top_k, live if candidates is None else len(candidates))
+    selectivity = 1.0 if candidates is None else (len(candidates) / live if live else 0.0)
+    if expected == 0:
+        _record_search(selectivity, "empty", time.perf_counter() - started)
+        return []
+
+    approx: Dict[int, float] = {}
+    if candidates is not None and len(candidates) <= settings.search_exact_max_candidates:
+        strategy = "exact"
+        D, I = exact_search(index, store, query_vector, candidates, top_k)
+    else:
+        strategy = kind
+        rerank = reranks(index, store)
+        fetch = top_k * settings.index_rerank_factor if rerank else top_k
+        D, I = index.search(query_vector, fetch, params=search_parameters(index, selector, quality))
+        D, I = D[0], I[0]
+        found = I >= 0
+        if int(found.sum()) < expected:
+            # The filtered index search dead-ended; scan the candidates instead
+            strategy = f"{kind}+exact"
+            ids = candidates if candidates is not None else np.asarray(store.ids)
+            D, I = exact_search(index, store, query_vector, ids, top_k)
+        elif rerank:
+            strategy = f"{kind}+rerank"
+            approx = dict(zip(I[found].tolist(), D[found].tolist()))
+            D, I = exact_search(index, store, query_vector, I[found], top_k)
+
+    results: List[Dict[str, Any]] = []
+    for chunk_id, score, meta in zip(I, D, store.records(I)):
+        if meta is None:
+            continue
+        meta["score"] = float(score)
+        if approx:
+            meta["approx_score"] = approx.get(int(chunk_id))
+        meta["index_type"] = kind
+        results.append(meta)
+
+    _record_search(selectivity, strategy, time.perf_counter() - started)
+    return results
+
+
+def semantic_search(
+    tenant_id: str,
+    query: str,
+    top_k: int = 5,
+    filters: Dict[str, Any] | None = None,
+    quality: Optional[str] = None,
+) -> List[Dict[str, Any]]:
     """Perform a similarity search over the tenant's FAISS index.
 
     Args:
@@ -64,76 +705,40 @@ def semantic_search(tenant_id: str, query: str, top_k: int = 5, filters: Dict[st
                  - user_id: exact match
                  - start_date/end_date: date range filtering (ISO format strings)
                  - tags: list of tags (chunk matches if any tag in list)
+        quality: Optional speed/recall hint: "fast", "balanced" or "accurate".
     Returns:
         A list of metadata dictionaries for the top matching chunks, each with
-        additional fields `score` and `chunk_text`.
+        an additional `score` field.
     """
-    from datetime import datetime
-    
-    index, metadata = load_index(tenant_id)
     query_vector = np.array([compute_query_embedding(query)], dtype=np.float32)
-    # Search more results initially to account for filtering
-    search_k = top_k * 3 if filters else top_k
-    D, I = index.search(query_vector, min(search_k, len(metadata)))
+    return search_vectors(tenant_id, query_vector, top_k=top_k, filters=filters, quality=quality)
+
+
+def keyword_search(
+    tenant_id: str,
+    query: str,
+    top_k: int = 5,
+    filters: Dict[str, Any] | None = None,
+) -> List[Dict[str, Any]]:
+    """BM25 search over the chunk text stored with the tenant's index.
+
+    Uses the same chunk store (and filters) as `search_vectors`, so no
+    database round trip is needed and results line up with semantic hits by
+    `chunk_id`.
+
+    Returns:
+        Chunk metadata dictionaries, best first, each with its BM25 `score`.
+    Raises:
+        ValueError: If the tenant has no index or its store has no lexical index.
+    """
+    _, store = load_index(tenant_id)
+    if store.lexical is None:
+        raise ValueError(f"Index for tenant {tenant_id} has no lexical index; republish it")
+    mask = store.filter_mask(filters) if filters else None
+    rows, scores = store.lexical.search(query, top_k, mask)
     results: List[Dict[str, Any]] = []
-    
-    for score, idx in zip(D[0], I[0]):
-        if idx >= len(metadata):
-            continue
-        meta = metadata[idx].copy()
-        
-        # Apply filters
-        if filters:
-            match = True
-            
-            # Exact match filters
-            for key in ["user_id", "tenant_id"]:
-                if key in filters and meta.get(key) != filters[key]:
-                    match = False
-                    break
-            
-            # Date range filtering
-            if match and ("start_date" in filters or "end_date" in filters):
-                created_at_str = meta.get("created_at")
-                if created_at_str:
-                    try:
-                        created_at = datetime.fromisoformat(created_at_str.replace('Z', '+00:00'))
-                        if "start_date" in filters:
-                            start_date = filters["start_date"]
-                            if isinstance(start_date, str):
-                                start_date = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-                            if created_at < start_date:
-                                match = False
-                        if match and "end_date" in filters:
-                            end_date = filters["end_date"]
-                            if isinstance(end_date, str):
-                                end_date = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
-                            if created_at > end_date:
-                                match = False
-                    except (ValueError, AttributeError):
-                        # If date parsing fails, skip date filtering for this chunk
-                        pass
-            
-            # Tag filtering (chunk matches if any tag in filter list is in note tags)
-            if match and "tags" in filters:
-                filter_tags = filters["tags"]
-                if isinstance(filter_tags, str):
-                    filter_tags = [t.strip() for t in filter_tags.split(",")]
-                note_tags = meta.get("tags", [])
-                if not isinstance(note_tags, list):
-                    note_tags = []
-                # Check if any filter tag is in note tags
-                if not any(tag in note_tags for tag in filter_tags):
-                    match = False
-            
-            if not match:
-                continue
-        
+    for row, score in zip(rows, scores):
+        meta = store.record(int(row))
         meta["score"] = float(score)
         results.append(meta)
-        
-        # Stop when we have enough results
-        if len(results) >= top_k:
-            break
-    
-    return results
\ No newline at end of file
+    return results
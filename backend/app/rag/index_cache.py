@@ -0,0 +1,181 @@
+"""
+Memory-budgeted cache for loaded tenant indexes.
+
+Entries are kept in least-recently-used order and each carries an estimate
+of its resident size.  Inserting an entry evicts the least recently used ones
+until the total fits in `max_bytes`, and entries idle for longer than
+`idle_ttl` seconds are dropped when next touched or swept.  Tenants without an
+index are cached as negative results for `negative_ttl` seconds so that
+requests for them do not hit the filesystem every time.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List
+
+import faiss
+
+
+# Returned by `IndexCache.get` for tenants cached as having no index
+MISSING = object()
+
+
+def index_nbytes(index: faiss.Index) -> int:
+    """Estimate the resident size of a FAISS index in bytes."""
+    index = faiss.downcast_index(index)
+    total = 0
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        # id_map vector, plus the reverse hash map kept by IndexIDMap2
+        total += index.id_map.size() * (24 if isinstance(index, faiss.IndexIDMap2) else 8)
+        index = faiss.downcast_index(index.index)
+    if isinstance(index, faiss.IndexIVF):
+        # Coarse centroids plus the ID stored beside every code
+        total += index.nlist * index.d * 4 + index.ntotal * 8
+    if isinstance(index, faiss.IndexHNSW):
+        hnsw = index.hnsw
+        total += hnsw.neighbors.size() * 4 + hnsw.levels.size() * 4 + hnsw.offsets.size() * 8
+        index = faiss.downcast_index(index.storage)
+    try:
+        total += index.ntotal * index.sa_code_size()
+    except RuntimeError:
+        total += index.ntotal * index.d * 4
+    return total
+
+
+class _Entry:
+    __slots__ = ("value", "nbytes", "version", "last_access")
+
+    def __init__(self, value: Any, nbytes: int, version: Any, now: float) -> None:
+        self.value = value
+        self.nbytes = nbytes
+        self.version = version
+        self.last_access = now
+
+
+class IndexCache:
+    """LRU + idle-TTL cache bounded by total entry size."""
+
+    def __init__(
+        self,
+        max_bytes: int,
+        idle_ttl: float,
+        negative_ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.negative_ttl = negative_ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._missing: Dict[str, float] = {}
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Any:
+        """Return the cached value, `MISSING` for a cached negative, or None."""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self.idle_ttl and now - entry.last_access > self.idle_ttl:
+                    self._drop(key)
+                    self.expirations += 1
+                else:
+                    entry.last_access = now
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry.value
+            expires = self._missing.get(key)
+            if expires is not None:
+                if now < expires:
+                    self.negative_hits += 1
+                    return MISSING
+                del self._missing[key]
+            self.misses += 1
+            return None
+
+    def version(self, key: str) -> Any:
+        """Return the version stored with `key`, without counting an access."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else entry.version
+
+    def keys(self) -> List[str]:
+        """Return the keys of resident entries, least recently used first."""
+        with self._lock:
+            return list(self._entries)
+
+    def put(self, key: str, value: Any, nbytes: int, version: Any = None) -> None:
+        """Insert a value, evicting idle and least recently used entries to fit.
+
+        Replacing an existing entry swaps it atomically: concurrent `get`
+        calls see either the old value or the new one.
+        """
+        now = self._clock()
+        with self._lock:
+            self._missing.pop(key, None)
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = _Entry(value, nbytes, version, now)
+            self.resident_bytes += nbytes
+            self._sweep(now)
+            # Never evict the entry just inserted, even if it alone exceeds the budget
+            while self.resident_bytes > self.max_bytes and len(self._entries) > 1:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def put_missing(self, key: str) -> None:
+        """Remember that `key` has no index for `negative_ttl` seconds."""
+        if self.negative_ttl <= 0:
+            return
+        with self._lock:
+            self._missing[key] = self._clock() + self.negative_ttl
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._missing.pop(key, None)
+            if key in self._entries:
+                self._drop(key)
+
+    def sweep(self) -> None:
+        """Drop entries idle for longer than the TTL."""
+        with self._lock:
+            self._sweep(self._clock())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "resident_bytes": self.resident_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "negative_entries": len(self._missing),
+                "negative_hits": self.negative_hits,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "tenants": {
+                    key: {"bytes": entry.nbytes, "version": entry.version}
+                    for key, entry in self._entries.items()
+                },
+            }
+
+    def _drop(self, key: str) -> None:
+        # Caller holds self._lock
+        entry = self._entries.pop(key)
+        self.resident_bytes -= entry.nbytes
+
+    def _sweep(self, now: float) -> None:
+        # Caller holds self._lock
+        if not self.idle_ttl:
+            return
+        expired = [k for k, e in self._entries.items() if now - e.last_access > self.idle_ttl]
+        for key in expired:
+            self._drop(key)
+            self.expirations += 1
@@ -0,0 +1,159 @@
+"""
+Cross-worker propagation of newly published index generations.
+
+Every API worker keeps its own in-memory index cache, so a generation
+published by another worker (or by a build script) has to be announced.
+`notify_generation` publishes the tenant and generation on a Redis pub/sub
+channel, and each worker's `IndexWatcher` subscribes to it and swaps the new
+generation in as soon as the message arrives.
+
+Pub/sub delivery is best-effort (messages sent while a subscriber reconnects
+are lost, and Redis may not be configured at all), so the watcher also polls
+the manifest mtime of each resident tenant every
+`settings.index_poll_interval_seconds`.  That bounds how long a worker can
+serve a superseded generation without adding any filesystem work to queries.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from ..core.cache import get_redis_client
+
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "index:generations"
+
+
+def notify_generation(tenant_id: str, generation: Optional[int]) -> bool:
+    """Announce that a tenant's index changed (`generation` None = removed).
+
+    Returns:
+        True if the message was published, False if Redis is unavailable.
+    """
+    client = get_redis_client()
+    if not client:
+        return False
+    try:
+        client.publish(CHANNEL, json.dumps({"tenant_id": tenant_id, "generation": generation}))
+        return True
+    except Exception as e:
+        logger.warning("Could not announce index generation for tenant %s: %s", tenant_id, e)
+        return False
+
+
+class IndexWatcher:
+    """Refreshes resident tenant indexes when a new generation is published.
+
+    Args:
+        refresh: Called with a tenant ID to swap in its current generation.
+        resident: Returns the tenant IDs currently held in the cache.
+        manifest_path: Maps a tenant ID to its manifest file.
+        poll_interval: Seconds between manifest polls (0 disables polling).
+    """
+
+    def __init__(
+        self,
+        refresh: Callable[[str], None],
+        resident: Callable[[], Iterable[str]],
+        manifest_path: Callable[[str], str],
+        poll_interval: float,
+    ) -> None:
+        self._refresh = refresh
+        self._resident = resident
+        self._manifest_path = manifest_path
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads: list = []
+        self._pid: Optional[int] = None
+        self._mtimes: Dict[str, Optional[int]] = {}
+        self._poll_lock = threading.Lock()
+        self.subscribed = False
+        self.messages = 0
+        self.polls = 0
+        self.refreshes = 0
+        self.last_poll: Optional[float] = None
+
+    def start(self) -> None:
+        """Start the subscriber and poller threads in this process."""
+        # Threads do not survive fork, so each worker starts its own
+        if self._pid == os.getpid() and any(t.is_alive() for t in self._threads):
+            return
+        self._pid = os.getpid()
+        self._stop.clear()
+        self._threads = [threading.Thread(target=self._listen, name="index-subscriber", daemon=True)]
+        if self.poll_interval > 0:
+            self._threads.append(threading.Thread(target=self._poll, name="index-poller", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribed": self.subscribed,
+            "messages": self.messages,
+            "polls": self.polls,
+            "refreshes": self.refreshes,
+            "poll_interval_seconds": self.poll_interval,
+            "last_poll": self.last_poll,
+        }
+
+    def poll_once(self) -> None:
+        """Refresh every resident tenant whose manifest changed since the last poll."""
+        with self._poll_lock:
+            seen: Dict[str, Optional[int]] = {}
+            for tenant_id in list(self._resident()):
+                try:
+                    mtime: Optional[int] = os.stat(self._manifest_path(tenant_id)).st_mtime_ns
+                except FileNotFoundError:
+                    mtime = None
+                seen[tenant_id] = mtime
+                # A tenant seen for the first time is checked too: it may have
+                # been loaded just before a newer generation was published.
+                if tenant_id not in self._mtimes or self._mtimes[tenant_id] != mtime:
+                    self._apply(tenant_id)
+            self._mtimes = seen
+            self.polls += 1
+            self.last_poll = time.time()
+
+    def _apply(self, tenant_id: str) -> None:
+        try:
+            self._refresh(tenant_id)
+            self.refreshes += 1
+        except Exception:
+            logger.exception("Refreshing index for tenant %s failed", tenant_id)
+
+    def _poll(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll_once()
+            except Exception:
+                logger.exception("Index manifest poll failed")
+
+    def _listen(self) -> None:
+        while not self._stop.is_set():
+            client = get_redis_client()
+            if not client:
+                return  # Polling alone keeps the cache fresh
+            try:
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(CHANNEL)
+                self.subscribed = True
+                # Catch up on anything announced while we were not subscribed
+                self.poll_once()
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message.get("type") == "message":
+                        self.messages += 1
+                        self._apply(json.loads(message["data"])["tenant_id"])
+                pubsub.close()
+            except Exception as e:
+                logger.warning("Index pub/sub subscription lost, retrying: %s", e)
+                self._stop.wait(5.0)
+            finally:
+                self.subscribed = False
@@ -0,0 +1,202 @@
+"""
+Size-tiered FAISS index families.
+
+Tenants range from a handful of chunks to millions, so the index family is
+chosen per tenant from its vector count and `settings.index_memory_target_bytes`:
+
+* `flat`    exact search; used up to `settings.index_flat_max_vectors`.
+* `hnsw`    HNSW graph over full float32 vectors, while it fits the target.
+* `ivf_sq8` IVF with 8-bit scalar quantisation, when float32 vectors do not fit.
+* `ivf_pq`  IVF with product quantisation, when even SQ8 codes do not fit.
+
+Flat and HNSW indexes are wrapped in an `IndexIDMap2`.  IVF indexes store
+chunk IDs in their inverted lists natively (and support `remove_ids`), so they
+are used unwrapped.  The IVF families only keep compressed codes, so their
+full vectors are kept in the chunk store's memory-mapped `vectors.npy` and the
+approximate candidates are re-ranked exactly against it.
+"""
+import math
+from typing import Any, Dict, Optional
+
+import faiss
+import numpy as np
+
+from ..core.config import settings
+
+
+FLAT = "flat"
+HNSW = "hnsw"
+IVF_SQ8 = "ivf_sq8"
+IVF_PQ = "ivf_pq"
+
+# Ordered from smallest to largest tenants
+TIERS = (FLAT, HNSW, IVF_SQ8, IVF_PQ)
+QUANTIZED = (IVF_SQ8, IVF_PQ)
+
+HNSW_M = 32
+# Training points faiss wants per IVF centroid
+_POINTS_PER_CENTROID = 39
+# PQ codebooks have 256 centroids per sub-quantiser
+_PQ_MIN_TRAINING = 1000
+
+# Search effort multipliers for the search API's quality hint
+QUALITY_FACTORS = {"fast": 0.5, "balanced": 1.0, "accurate": 2.0}
+
+
+def estimate_bytes(kind: str, count: int, dim: int) -> int:
+    """Rough resident size of an index of `kind` holding `count` vectors."""
+    if kind == FLAT:
+        return count * (dim * 4 + 24)
+    if kind == HNSW:
+        return count * (dim * 4 + HNSW_M * 2 * 4 + 40)
+    if kind == IVF_SQ8:
+        return count * (dim + 8)
+    return count * (_pq_subquantizers(dim) + 8)
+
+
+def choose_index_type(count: int, dim: int) -> str:
+    """Pick the index family for a tenant with `count` vectors of size `dim`."""
+    if settings.index_type != "auto":
+        return settings.index_type
+    if count <= settings.index_flat_max_vectors:
+        return FLAT
+    target = settings.index_memory_target_bytes
+    if count <= settings.index_hnsw_max_vectors and estimate_bytes(HNSW, count, dim) <= target:
+        return HNSW
+    if estimate_bytes(IVF_SQ8, count, dim) <= target:
+        return IVF_SQ8
+    return IVF_PQ
+
+
+def _inner(index: faiss.Index) -> faiss.Index:
+    index = faiss.downcast_index(index)
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        index = faiss.downcast_index(index.index)
+    return index
+
+
+def index_type(index: faiss.Index) -> str:
+    """Return the family name of an index built by `build_index`."""
+    index = _inner(index)
+    if isinstance(index, faiss.IndexHNSW):
+        return HNSW
+    if isinstance(index, faiss.IndexIVFPQ):
+        return IVF_PQ
+    if isinstance(index, faiss.IndexIVF):
+        return IVF_SQ8
+    return FLAT
+
+
+def needs_vector_store(kind: str) -> bool:
+    """Whether full vectors must be stored beside the index for re-ranking."""
+    return kind in QUANTIZED
+
+
+def should_retier(kind: str, count: int, dim: int) -> bool:
+    """Whether an index of `kind` should be rebuilt as another family.
+
+    Tenants move up a tier as soon as they outgrow theirs, but only move down
+    once they have shrunk well below the boundary, so a tenant hovering near a
+    threshold is not rebuilt on every write.
+    """
+    target = choose_index_type(count, dim)
+    if target == kind:
+        return False
+    if TIERS.index(target) > TIERS.index(kind):
+        return True
+    return choose_index_type(int(count * 1.5), dim) != kind
+
+
+def _pq_subquantizers(dim: int) -> int:
+    """Largest divisor of `dim` giving at least 8 dimensions per sub-quantiser."""
+    for m in range(max(1, dim // 8), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def build_index(vectors: np.ndarray, ids: np.ndarray, kind: Optional[str] = None) -> faiss.Index:
+    """Build an index over `vectors` keyed by chunk `ids`.
+
+    Args:
+        vectors: float32 array of shape (n, dim).
+        ids: int64 chunk IDs, one per vector.
+        kind: Index family; chosen from the vector count when omitted.
+    Returns:
+        An index searchable by chunk ID.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    ids = np.asarray(ids, dtype=np.int64)
+    count, dim = vectors.shape
+    kind = kind or choose_index_type(count, dim)
+
+    if kind in QUANTIZED:
+        # Too few points to train the coarse quantiser; search exactly instead
+        if count < _POINTS_PER_CENTROID * 2 or (kind == IVF_PQ and count < _PQ_MIN_TRAINING):
+            kind = FLAT
+    if kind == FLAT:
+        index = faiss.IndexIDMap2(faiss.IndexFlatL2(dim))
+    elif kind == HNSW:
+        hnsw = faiss.IndexHNSWFlat(dim, HNSW_M)
+        hnsw.hnsw.efConstruction = 200
+        index = faiss.IndexIDMap2(hnsw)
+    else:
+        nlist = max(1, min(int(4 * math.sqrt(count)), count // _POINTS_PER_CENTROID))
+        quantizer = faiss.IndexFlatL2(dim)
+        if kind == IVF_PQ:
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, _pq_subquantizers(dim), 8)
+        else:
+            index = faiss.IndexIVFScalarQuantizer(quantizer, dim, nlist, faiss.ScalarQuantizer.QT_8bit)
+        # Keep the quantizer alive as long as the index
+        index.own_fields = True
+        quantizer.this.disown()
+        index.train(vectors)
+        index.nprobe = settings.index_ivf_nprobe
+    if count:
+        index.add_with_ids(vectors, ids)
+    return index
+
+
+def tuned_parameter(kind: str) -> Optional[str]:
+    """Name of the search-time knob trading recall for latency, if any."""
+    if kind == HNSW:
+        return "efSearch"
+    if kind in QUANTIZED:
+        return "nprobe"
+    return None
+
+
+def apply_search_params(index: faiss.Index, params: Dict[str, Any]) -> None:
+    """Set tuned search parameters (`efSearch`, `nprobe`) on a loaded index."""
+    inner = _inner(index)
+    if "efSearch" in params and isinstance(inner, faiss.IndexHNSW):
+        inner.hnsw.efSearch = int(params["efSearch"])
+    if "nprobe" in params and isinstance(inner, faiss.IndexIVF):
+        inner.nprobe = max(1, min(int(params["nprobe"]), inner.nlist))
+
+
+def _scaled(value: int, factor: float, low: int, high: int) -> int:
+    return max(low, min(high, int(round(value * factor))))
+
+
+def search_parameters(
+    index: faiss.Index, selector: Optional[faiss.IDSelector], quality: Optional[str] = None
+) -> faiss.SearchParameters:
+    """Return search parameters for `index` restricted to `selector`.
+
+    The index's own (tuned) `efSearch` or `nprobe` is used, scaled by the
+    `quality` hint ("fast", "balanced" or "accurate") and clamped to
+    `settings.search_ef_min`..`settings.search_ef_max` (or the IVF list count).
+    """
+    inner = _inner(index)
+    factor = QUALITY_FACTORS.get(quality or "balanced", 1.0)
+    if isinstance(inner, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW()
+        params.efSearch = _scaled(inner.hnsw.efSearch, factor, settings.search_ef_min, settings.search_ef_max)
+    elif isinstance(inner, faiss.IndexIVF):
+        params = faiss.SearchParametersIVF()
+        params.nprobe = _scaled(inner.nprobe, factor, 1, inner.nlist)
+    else:
+        params = faiss.SearchParameters()
+    params.sel = selector
+    return params
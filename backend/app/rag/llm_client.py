@@ -0,0 +1,32 @@
+"""
+Asynchronous OpenAI client for chat completions.
+
+The async search pipeline sends its LLM calls through `AsyncOpenAI`, so a
+slow completion holds a coroutine rather than a threadpool worker.  The
+client's connection pool belongs to the event loop it was first used on,
+so one client is kept per running loop (normally just the server's).
+"""
+import asyncio
+import weakref
+from typing import Any
+
+from ..core.config import settings
+
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+
+
+def get_async_openai_client() -> Any:
+    """Return the `AsyncOpenAI` client for the running event loop.
+
+    Raises:
+        RuntimeError: If no OpenAI API key is configured.
+    """
+    if not settings.openai_api_key:
+        raise RuntimeError("OPENAI_API_KEY is not configured")
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        from openai import AsyncOpenAI
+        client = _clients[loop] = AsyncOpenAI(api_key=settings.openai_api_key)
+    return client
@@ -0,0 +1,109 @@
+"""
+Result fusion and near-duplicate pruning ahead of summarisation.
+
+Semantic and keyword retrievers score chunks on incomparable scales (L2
+distance vs. BM25), so their lists are merged with reciprocal rank fusion,
+which only uses ranks.  The fused list is then re-selected with maximal
+marginal relevance: each step takes the candidate with the best trade-off
+between fused relevance and dissimilarity to what is already selected, and
+candidates at least `duplicate_threshold` similar to a selected chunk are
+pruned outright.  Similarity is the cosine of the chunk embeddings, or the
+Jaccard overlap of their tokens when a chunk has no stored vector (keyword
+hits on notes that are not indexed yet).
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .bm25_index import tokenize
+
+
+def reciprocal_rank_fusion(
+    result_lists: Sequence[Sequence[Dict[str, Any]]],
+    key: Callable[[Dict[str, Any]], Hashable],
+    k: int = 60,
+) -> List[Dict[str, Any]]:
+    """Merge ranked result lists by summing 1 / (k + rank) per result.
+
+    Results sharing a `key` are merged (the first list's dict wins); each
+    returned dict gets an `rrf_score`, and the list is sorted by it.
+    """
+    fused: Dict[Hashable, Dict[str, Any]] = {}
+    for results in result_lists:
+        for rank, result in enumerate(results, 1):
+            entry = fused.setdefault(key(result), {**result, "rrf_score": 0.0})
+            entry["rrf_score"] += 1.0 / (k + rank)
+    return sorted(fused.values(), key=lambda r: r["rrf_score"], reverse=True)
+
+
+def similarity_matrix(vectors: Sequence[Optional[np.ndarray]], texts: Sequence[str]) -> np.ndarray:
+    """Pairwise similarity: embedding cosine where both vectors exist, else token Jaccard."""
+    n = len(texts)
+    sims = np.zeros((n, n), dtype=np.float32)
+    have = np.array([v is not None for v in vectors], dtype=bool)
+    if have.any():
+        matrix = np.vstack([vectors[i] for i in np.flatnonzero(have)]).astype(np.float32)
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        sims[np.ix_(have, have)] = matrix @ matrix.T
+    if not have.all():
+        tokens = [set(tokenize(t)) for t in texts]
+        for i in range(n):
+            for j in range(i + 1, n):
+                if not (have[i] and have[j]):
+                    union = tokens[i] | tokens[j]
+                    sims[i, j] = sims[j, i] = len(tokens[i] & tokens[j]) / len(union) if union else 1.0
+    return sims
+
+
+def mmr_select(
+    relevance: np.ndarray,
+    similarity: np.ndarray,
+    top_k: int,
+    lambda_: float = 0.7,
+    duplicate_threshold: float = 0.92,
+) -> Tuple[List[int], List[int]]:
+    """Select up to `top_k` candidates by maximal marginal relevance.
+
+    Args:
+        relevance: Relevance of each candidate, scaled to [0, 1].
+        similarity: Pairwise candidate similarity matrix.
+        top_k: Number of candidates to select.
+        lambda_: Weight of relevance against diversity.
+        duplicate_threshold: Candidates at least this similar to a selected
+            one are pruned instead of ever being selected.
+    Returns:
+        (selected indices in selection order, pruned near-duplicate indices).
+    """
+    remaining = np.ones(len(relevance), dtype=bool)
+    max_sim = np.zeros(len(relevance), dtype=np.float32)
+    selected: List[int] = []
+    pruned: List[int] = []
+    while remaining.any() and len(selected) < top_k:
+        gain = np.where(remaining, lambda_ * relevance - (1 - lambda_) * max_sim, -np.inf)
+        best = int(np.argmax(gain))
+        selected.append(best)
+        remaining[best] = False
+        max_sim = np.maximum(max_sim, similarity[best])
+        duplicates = remaining & (similarity[best] >= duplicate_threshold)
+        pruned.extend(np.flatnonzero(duplicates).tolist())
+        remaining &= ~duplicates
+    return selected, pruned
+
+
+# Per-process totals, reported by /health/metrics
+_stats = {"queries": 0, "candidates": 0, "selected": 0, "duplicates_pruned": 0, "context_tokens": 0, "tokens_saved": 0}
+_stats_lock = threading.Lock()
+
+
+def record_ranking(report: Dict[str, int]) -> None:
+    with _stats_lock:
+        _stats["queries"] += 1
+        for name in ("candidates", "selected", "duplicates_pruned", "context_tokens", "tokens_saved"):
+            _stats[name] += report[name]
+
+
+def ranking_stats() -> Dict[str, int]:
+    """Return fusion and de-duplication totals for this process."""
+    with _stats_lock:
+        return dict(_stats)
@@ -0,0 +1,83 @@
+"""
+Schema-validated JSON replies for task extraction.
+
+Task extraction asks the model for one JSON object using the API's JSON
+output mode instead of a free-form array that has to be dug out of prose
+and code fences with regexes.  The reply is validated against
+`ExtractedTasks`; a reply that does not parse or validate returns None,
+and `task_extraction` falls back to its regex parser for that reply only.
+
+Searches no longer extract tasks (they read the tasks stored when notes are
+written, see `services.task_service`), so the single search-time call that
+returned both the summary and the tasks is gone; its JSON mode and schema
+live on here for write-time extraction.
+"""
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field, ValidationError
+
+
+logger = logging.getLogger(__name__)
+
+Tasks = List[Dict[str, str | None]]
+
+
+class ExtractedTask(BaseModel):
+    description: str = Field(min_length=1)
+    due_date: Optional[str] = None
+
+
+class ExtractedTasks(BaseModel):
+    """Schema the task extraction reply must match."""
+
+    tasks: List[ExtractedTask] = Field(default_factory=list)
+
+
+SYSTEM_PROMPT = (
+    "You extract actionable tasks from meeting notes or diary entries. "
+    "Reply with a JSON object with one key, 'tasks': an array where each item has 'description' "
+    "and optional 'due_date' (ISO format). If no due date is specified, set it to null. "
+    "If there are no tasks, use an empty array."
+)
+
+RESPONSE_FORMAT = {"type": "json_object"}
+
+# Per-process totals, reported by /health/metrics
+_stats = {"calls": 0, "invalid": 0, "prompt_tokens": 0, "completion_tokens": 0}
+_stats_lock = threading.Lock()
+
+
+def parse_tasks(response) -> Optional[Tasks]:
+    """Validate a completion against `ExtractedTasks` and record its usage.
+
+    Returns:
+        Task dicts with keys description and due_date, or None if the reply
+        is not a valid `ExtractedTasks` object.
+    """
+    content = response.choices[0].message.content or ""
+    try:
+        parsed = ExtractedTasks.model_validate_json(content)
+    except ValidationError as exc:
+        logger.warning("Task extraction reply did not match the schema: %s", exc.errors()[:3])
+        parsed = None
+    with _stats_lock:
+        _stats["calls"] += 1
+        _stats["invalid"] += parsed is None
+        if response.usage is not None:
+            _stats["prompt_tokens"] += response.usage.prompt_tokens
+            _stats["completion_tokens"] += response.usage.completion_tokens or 0
+    if parsed is None:
+        return None
+    return [
+        {"description": task.description.strip(), "due_date": task.due_date}
+        for task in parsed.tasks
+        if task.description.strip()
+    ]
+
+
+def structured_answer_stats() -> Dict[str, int]:
+    """Return JSON-mode call totals for this process."""
+    with _stats_lock:
+        return dict(_stats)
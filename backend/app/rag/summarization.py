@@ -4,47 +4,117 @@ Summarisation utilities using LLMs.
 This module wraps the OpenAI ChatCompletion API to summarise one or more
 documents.  It accepts a list of text chunks and an optional query and returns
 a concise summary.  If an OpenAI API key is not configured, a fallback
-summarisation is performed by truncating the input.
+summarisation is performed by truncating the input; callers use the same
+fallback when the model returns no text.  `summarise_stream` yields the
+summary as the model produces it, for streaming endpoints, and
+`summarise_async` makes the same call through the async client.
 """
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional
 
 import openai
 
 from ..core.config import settings
+from .llm_client import get_async_openai_client
 
 
-def summarise(chunks: List[str], query: Optional[str] = None) -> str:
+MODEL = "gpt-4-turbo"
+# Bump when the prompt changes so cached answers are not reused
+PROMPT_VERSION = 1
+
+
+def _messages(combined: str, query: Optional[str]) -> List[Dict[str, str]]:
+    system_prompt = "You are a helpful assistant that summarises diary entries."
+    if query:
+        user_prompt = f"Summarise the following text with respect to the question: '{query}'."\
+                      f"\n\nText:\n{combined}"
+    else:
+        user_prompt = f"Summarise the following diary entries in a concise paragraph.\n\nText:\n{combined}"
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+
+
+def fallback_summary(chunks: List[str]) -> str:
+    """Pseudo-summary used when no LLM answer is available: the first 200 characters."""
+    combined = "\n".join(chunks)
+    return (combined[:200] + "...") if len(combined) > 200 else combined
+
+
+def summarise(chunks: List[str], query: Optional[str] = None) -> Optional[str]:
     """Generate a summary from a list of text chunks.
 
     Args:
         chunks: List of text segments to summarise.
         query: Optional question or focus for the summary.
     Returns:
-        A summary string.
+        A summary string, or None if the model returned no text.
     """
     # Concatenate chunks; we may truncate long inputs for token limits
     combined = "\n".join(chunks)
     if not settings.openai_api_key:
-        # Fallback: return first 200 characters as a pseudo‑summary
-        return (combined[:200] + "...") if len(combined) > 200 else combined
+        return fallback_summary(chunks)
     
     # Use newer OpenAI client API
     from openai import OpenAI
     client = OpenAI(api_key=settings.openai_api_key)
-    system_prompt = "You are a helpful assistant that summarises diary entries."
-    if query:
-        user_prompt = f"Summarise the following text with respect to the question: '{query}'."\
-                      f"\n\nText:\n{combined}"
-    else:
-        user_prompt = f"Summarise the following diary entries in a concise paragraph.\n\nText:\n{combined}"
     response = client.chat.completions.create(
-        model="gpt-4-turbo",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
+        model=MODEL,
+        messages=_messages(combined, query),
         temperature=0.3,
         max_tokens=200,
     )
     summary = response.choices[0].message.content
-    return summary.strip() if summary else combined[:200]
\ No newline at end of file
+    return (summary or "").strip() or None
+
+
+async def summarise_async(chunks: List[str], query: Optional[str] = None) -> Optional[str]:
+    """Generate a summary like `summarise`, using the async OpenAI client.
+
+    Args:
+        chunks: List of text segments to summarise.
+        query: Optional question or focus for the summary.
+    Returns:
+        A summary string, or None if the model returned no text.
+    """
+    combined = "\n".join(chunks)
+    if not settings.openai_api_key:
+        return fallback_summary(chunks)
+
+    response = await get_async_openai_client().chat.completions.create(
+        model=MODEL,
+        messages=_messages(combined, query),
+        temperature=0.3,
+        max_tokens=200,
+    )
+    summary = response.choices[0].message.content
+    return (summary or "").strip() or None
+
+
+def summarise_stream(chunks: List[str], query: Optional[str] = None) -> Iterator[str]:
+    """Generate a summary like `summarise`, yielding text as it is produced.
+
+    Args:
+        chunks: List of text segments to summarise.
+        query: Optional question or focus for the summary.
+    Yields:
+        Pieces of the summary, in order.  Without an API key the fallback
+        summary is yielded in one piece.
+    """
+    combined = "\n".join(chunks)
+    if not settings.openai_api_key:
+        yield fallback_summary(chunks)
+        return
+
+    from openai import OpenAI
+    client = OpenAI(api_key=settings.openai_api_key)
+    stream = client.chat.completions.create(
+        model=MODEL,
+        messages=_messages(combined, query),
+        temperature=0.3,
+        max_tokens=200,
+        stream=True,
+    )
+    for event in stream:
+        if event.choices and event.choices[0].delta.content:
+            yield event.choices[0].delta.content
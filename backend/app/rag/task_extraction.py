@@ -3,9 +3,13 @@ Task extraction using LLMs or heuristics.
 
 This module provides a function to extract actionable tasks from a set of
 strings (e.g. diary entry chunks).  The default implementation uses OpenAI
-ChatCompletion to identify tasks and due dates.  If no API key is configured,
-a simple heuristic is used to extract lines that appear to be tasks.
+ChatCompletion in JSON output mode to identify tasks and due dates, and
+validates the reply against a schema (see `structured_answer`); only a reply
+that fails validation is parsed with the regex fallback.  If no API key is
+configured, a simple heuristic is used to extract lines that appear to be
+tasks.
 """
+import json
 import re
 from datetime import datetime
 from typing import Dict, List
@@ -13,45 +17,33 @@ from typing import Dict, List
 import openai
 
 from ..core.config import settings
+from . import structured_answer
 
 
-def extract_tasks(chunks: List[str]) -> List[Dict[str, str | None]]:
-    """Extract tasks from text chunks.
+MODEL = "gpt-4-turbo"
+# Bump when the prompt changes so cached answers are not reused
+PROMPT_VERSION = 2
 
-    Args:
-        chunks: A list of text segments.
-    Returns:
-        A list of dicts with keys: description, due_date (ISO format or None).
-    """
-    text = "\n".join(chunks)
-    tasks: List[Dict[str, str | None]] = []
-    if not settings.openai_api_key:
-        # Heuristic: extract lines beginning with common prefixes
-        pattern = re.compile(r"^(?:TODO|Action item|Task)[:\-]\s*(.+)$", re.IGNORECASE | re.MULTILINE)
-        for match in pattern.finditer(text):
-            tasks.append({"description": match.group(1).strip(), "due_date": None})
-        return tasks
-    # Use newer OpenAI client API
-    from openai import OpenAI
-    client = OpenAI(api_key=settings.openai_api_key)
-    system_prompt = "You extract actionable tasks from meeting notes or diary entries. " \
-                    "Return a JSON array where each item has 'description' and optional 'due_date' (ISO format)." \
-                    "If no due date is specified, set it to null."
+
+def _heuristic_tasks(text: str) -> List[Dict[str, str | None]]:
+    # Heuristic: extract lines beginning with common prefixes
+    pattern = re.compile(r"^(?:TODO|Action item|Task)[:\-]\s*(.+)$", re.IGNORECASE | re.MULTILINE)
+    return [{"description": match.group(1).strip(), "due_date": None} for match in pattern.finditer(text)]
+
+
+def _messages(text: str) -> List[Dict[str, str]]:
     user_prompt = f"Extract tasks from the following text:\n\n{text}\n\nReturn JSON only."
-    response = client.chat.completions.create(
-        model="gpt-4-turbo",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
-        temperature=0.0,
-        max_tokens=200,
-    )
-    content = response.choices[0].message.content or ""
+    return [
+        {"role": "system", "content": structured_answer.SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt},
+    ]
+
+
+def _parse_tasks(content: str) -> List[Dict[str, str | None]]:
+    """Parse a reply that is not a valid JSON-mode object into task dicts."""
+    tasks: List[Dict[str, str | None]] = []
     # The model returns JSON; we attempt to parse it
     # Sometimes the response includes markdown code blocks, so we extract JSON from them
-    import json
-    import re
     
     # Try to extract JSON from markdown code blocks
     json_match = re.search(r'```(?:json)?\s*(\[.*?\])\s*```', content, re.DOTALL)
@@ -93,4 +85,31 @@ def extract_tasks(chunks: List[str]) -> List[Dict[str, str | None]]:
         # If still no tasks, treat entire content as one task
         if not tasks:
             tasks.append({"description": content.strip(), "due_date": None})
-    return tasks
\ No newline at end of file
+    return tasks
+
+
+def extract_tasks(chunks: List[str]) -> List[Dict[str, str | None]]:
+    """Extract tasks from text chunks.
+
+    Args:
+        chunks: A list of text segments.
+    Returns:
+        A list of dicts with keys: description, due_date (ISO format or None).
+    """
+    text = "\n".join(chunks)
+    if not settings.openai_api_key:
+        return _heuristic_tasks(text)
+    # Use newer OpenAI client API
+    from openai import OpenAI
+    client = OpenAI(api_key=settings.openai_api_key)
+    response = client.chat.completions.create(
+        model=MODEL,
+        messages=_messages(text),
+        response_format=structured_answer.RESPONSE_FORMAT,
+        temperature=0.0,
+        max_tokens=400,
+    )
+    tasks = structured_answer.parse_tasks(response)
+    if tasks is None:
+        return _parse_tasks(response.choices[0].message.content or "")
+    return tasks
@@ -1,6 +1,7 @@
 """
 Utility functions for the RAG pipeline.
 """
+from functools import lru_cache
 from typing import List
 
 from langchain.text_splitter import RecursiveCharacterTextSplitter
@@ -8,6 +9,11 @@ from langchain.text_splitter import RecursiveCharacterTextSplitter
 from ..core.config import settings
 
 
+@lru_cache(maxsize=8)
+def _splitter(chunk_size: int, overlap: int) -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=overlap)
+
+
 def split_text(text: str, chunk_size: int | None = None, overlap: int | None = None) -> List[str]:
     """Split a text into overlapping chunks.
 
@@ -20,5 +26,4 @@ def split_text(text: str, chunk_size: int | None = None, overlap: int | None = N
     """
     size = chunk_size or settings.rag_chunk_size
     ov = overlap or settings.rag_overlap
-    splitter = RecursiveCharacterTextSplitter(chunk_size=size, chunk_overlap=ov)
-    return splitter.split_text(text or "")
\ No newline at end of file
+    return _splitter(size, ov).split_text(text or "")
\ No newline at end of file
@@ -0,0 +1,173 @@
+"""
+Debounced, single-flight scheduler for per-tenant index updates.
+
+Note writes call `schedule_note` instead of touching the index directly.  The
+first request for a tenant opens a debounce window of
+`settings.index_rebuild_debounce_seconds`; every note changed within that
+window is applied in one incremental index update when it closes.  At most
+one update runs per tenant at a time: writes that arrive while an update is
+in flight mark the tenant dirty, and a follow-up update is scheduled as soon
+as the current one finishes.  If an update fails, the next one for that tenant
+is promoted to a full rebuild so no changes are lost, and it is scheduled
+even if no further writes arrive: after `settings.index_retry_base_seconds`,
+doubling with each consecutive failure up to `settings.index_retry_max_seconds`.
+"""
+import logging
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Set
+
+from ..core.config import settings
+from . import index_service
+
+
+logger = logging.getLogger(__name__)
+
+# runner(tenant_id, upserts, deletes, full_rebuild) -> success
+IndexJobRunner = Callable[[str, Set[str], Set[str], bool], bool]
+
+
+def _run_index_job(tenant_id: str, upserts: Set[str], deletes: Set[str], full_rebuild: bool) -> bool:
+    if full_rebuild:
+        return index_service.rebuild_index_for_tenant(tenant_id)
+    return index_service.apply_note_changes(tenant_id, upserts=upserts, deletes=deletes)
+
+
+class _TenantState:
+    def __init__(self) -> None:
+        self.upserts: Set[str] = set()
+        self.deletes: Set[str] = set()
+        self.full_rebuild = False
+        self.timer: Optional[threading.Timer] = None
+        self.building = False
+        self.dirty = False
+        self.requests = 0
+        self.builds = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_duration: Optional[float] = None
+        self.last_finished: Optional[float] = None
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self.upserts) + len(self.deletes) + (1 if self.full_rebuild else 0)
+
+
+class IndexScheduler:
+    """Coalesces index updates per tenant and runs at most one at a time."""
+
+    def __init__(
+        self,
+        debounce_seconds: float,
+        runner: IndexJobRunner = _run_index_job,
+        retry_base_seconds: float = 5.0,
+        retry_max_seconds: float = 300.0,
+    ) -> None:
+        self.debounce_seconds = debounce_seconds
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self._runner = runner
+        self._lock = threading.Lock()
+        self._tenants: Dict[str, _TenantState] = {}
+
+    def schedule_note(self, tenant_id: str, note_id: str, deleted: bool = False) -> None:
+        """Queue a created/updated (or deleted) note for indexing."""
+        note_id = str(note_id)
+        with self._lock:
+            state = self._tenants.setdefault(tenant_id, _TenantState())
+            if deleted:
+                state.upserts.discard(note_id)
+                state.deletes.add(note_id)
+            else:
+                state.deletes.discard(note_id)
+                state.upserts.add(note_id)
+            self._request(tenant_id, state)
+
+    def schedule_rebuild(self, tenant_id: str) -> None:
+        """Queue a full rebuild of the tenant's index."""
+        with self._lock:
+            state = self._tenants.setdefault(tenant_id, _TenantState())
+            state.full_rebuild = True
+            self._request(tenant_id, state)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return queue depth and build timings for each known tenant."""
+        with self._lock:
+            return {
+                tenant_id: {
+                    "queue_depth": state.queue_depth,
+                    "building": state.building,
+                    "dirty": state.dirty,
+                    "requests": state.requests,
+                    "builds": state.builds,
+                    "failures": state.failures,
+                    "consecutive_failures": state.consecutive_failures,
+                    "last_build_seconds": state.last_duration,
+                    "last_finished": state.last_finished,
+                }
+                for tenant_id, state in self._tenants.items()
+            }
+
+    def _request(self, tenant_id: str, state: _TenantState) -> None:
+        # Caller holds self._lock
+        state.requests += 1
+        if state.building:
+            state.dirty = True
+        elif state.timer is None:
+            self._start_timer(tenant_id, state)
+
+    def _start_timer(self, tenant_id: str, state: _TenantState) -> None:
+        # Caller holds self._lock.  The window is not extended by later writes,
+        # so a steady stream of edits cannot postpone indexing indefinitely.
+        delay = self.debounce_seconds
+        if state.consecutive_failures:
+            # Back off while updates keep failing, whether or not writes arrive
+            backoff = self.retry_base_seconds * 2 ** (state.consecutive_failures - 1)
+            delay = max(delay, min(backoff, self.retry_max_seconds))
+        state.timer = threading.Timer(delay, self._run, args=(tenant_id,))
+        state.timer.daemon = True
+        state.timer.start()
+
+    def _run(self, tenant_id: str) -> None:
+        with self._lock:
+            state = self._tenants[tenant_id]
+            state.timer = None
+            upserts, deletes, full_rebuild = state.upserts, state.deletes, state.full_rebuild
+            state.upserts, state.deletes, state.full_rebuild = set(), set(), False
+            state.building = True
+            state.dirty = False
+
+        started = time.monotonic()
+        try:
+            ok = self._runner(tenant_id, upserts, deletes, full_rebuild)
+        except Exception:
+            logger.exception("Index update for tenant %s failed", tenant_id)
+            ok = False
+        duration = time.monotonic() - started
+
+        with self._lock:
+            state.building = False
+            state.builds += 1
+            state.last_duration = duration
+            state.last_finished = time.time()
+            if ok:
+                state.consecutive_failures = 0
+            else:
+                state.failures += 1
+                state.consecutive_failures += 1
+                # The next update catches up on everything this one dropped
+                state.full_rebuild = True
+            if state.dirty or not ok:
+                state.dirty = False
+                self._start_timer(tenant_id, state)
+
+
+@lru_cache()
+def get_index_scheduler() -> IndexScheduler:
+    """Return the process-wide index scheduler."""
+    return IndexScheduler(
+        settings.index_rebuild_debounce_seconds,
+        retry_base_seconds=settings.index_retry_base_seconds,
+        retry_max_seconds=settings.index_retry_max_seconds,
+    )
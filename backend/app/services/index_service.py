@@ -2,122 +2,354 @@
 Service for managing FAISS index updates.
 
 This service handles automatic index rebuilding when notes are created, updated, or deleted.
-It uses background tasks to avoid blocking API responses.
+API writes are queued through `index_scheduler` so they never block responses.
+
+Note writes are applied incrementally: only the chunks belonging to the changed
+note are removed from and added to the tenant's ID-mapped index, and only
+those rows of the chunk store change.  Index types that cannot remove vectors (HNSW)
+tombstone the old chunk IDs instead; once tombstones exceed
+`settings.index_compaction_ratio` of the index, the live vectors are
+reconstructed into a fresh index without any new embedding calls.  The same
+happens when a tenant grows or shrinks into another index family (see
+`rag.index_types`).
+
+Chunk text and embeddings come from the `note_chunks` table: notes are split
+when they are written (`refresh_note_chunks`), and updates embed only the
+chunks that have no stored embedding yet, so a full rebuild of an
+up-to-date tenant makes no embedding calls.
 """
-import os
-import pickle
-from typing import List
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
 
 import faiss
 import numpy as np
-from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session, selectinload
 
 from ..core.config import settings
 from ..core.database import SessionLocal
-from ..models.note import Note
-from ..rag.faiss_index import compute_query_embedding
+from ..models.note import Note, NoteChunk
+from ..rag.chunk_store import ChunkStore
+from ..rag.context_packer import count_tokens
+from ..rag.embedding_cache import content_hash, get_embedding_cache
+from ..rag.embedding_service import get_embedding_service
+from ..rag.faiss_index import (
+    compute_embeddings,
+    invalidate_index,
+    live_vectors,
+    read_index_files,
+    refresh_index,
+    remove_index_files,
+    tenant_write_lock,
+    write_index_files,
+)
+from ..rag.index_types import build_index, index_type, needs_vector_store, should_retier
 from ..rag.utils import split_text
 
 
+def refresh_note_chunks(note: Note) -> None:
+    """Split a note's content into its `chunks` rows.
+
+    Call when a note is created or its content changes, before committing.
+    Chunks whose text is unchanged keep their stored embedding; the others
+    are embedded by the next index update.
+    """
+    previous = {chunk.content_hash: chunk for chunk in note.chunks}
+    chunks = []
+    for ordinal, text in enumerate(chunk for chunk in split_text(note.content or "") if chunk.strip()):
+        digest = content_hash(text)
+        kept = previous.get(digest)
+        chunks.append(NoteChunk(
+            ordinal=ordinal,
+            content_hash=digest,
+            text=text,
+            token_count=count_tokens(text),
+            embedding=kept.embedding if kept is not None else None,
+            embedding_model=kept.embedding_model if kept is not None else None,
+        ))
+    note.chunks = chunks
+
+
+def _embed_chunks(chunks: List[NoteChunk]) -> Dict[Tuple[UUID, int], bytes]:
+    """Embed `chunks`, keyed by (note ID, ordinal).
+
+    If the batch call fails, chunks are embedded one at a time and those that
+    still fail are skipped: they stay unembedded and are retried by the next
+    index update instead of failing the whole tenant.
+    """
+    try:
+        vectors = compute_embeddings([chunk.text for chunk in chunks])
+    except Exception as e:
+        print(f"Error generating embeddings for {len(chunks)} chunks, retrying one at a time: {e}")
+        vectors = []
+        for chunk in chunks:
+            try:
+                vectors.append(compute_embeddings([chunk.text])[0])
+            except Exception as e:
+                # Log error but continue with other chunks
+                print(f"Error generating embedding for chunk: {e}")
+                vectors.append(None)
+    return {
+        (chunk.note_id, chunk.ordinal): np.asarray(vector, dtype=np.float32).tobytes()
+        for chunk, vector in zip(chunks, vectors)
+        if vector is not None
+    }
+
+
+def load_note_chunks(
+    db: Session, tenant_id: str, note_ids: Optional[Iterable[str]] = None
+) -> Tuple[List[np.ndarray], List[Dict[str, Any]]]:
+    """Return the vectors and chunk metadata of a tenant's notes.
+
+    Chunks without an embedding from the current model are embedded in one
+    batch and their embeddings stored; chunks whose embedding fails are left
+    out.  Notes written before chunks were stored are split first.  Commits
+    the session.
+
+    Args:
+        db: Database session.
+        tenant_id: Tenant UUID as string.
+        note_ids: Only these notes (all of the tenant's notes if None).
+    Returns:
+        (vectors, chunk metadata), in note and chunk order.
+    """
+    query = db.query(Note).filter(Note.tenant_id == UUID(tenant_id)).options(selectinload(Note.chunks))
+    if note_ids is not None:
+        query = query.filter(Note.id.in_([UUID(str(n)) for n in note_ids]))
+    notes = query.all()
+    for note in notes:
+        if note.content and not note.chunks:
+            refresh_note_chunks(note)
+    db.flush()
+
+    model = get_embedding_service().model
+    chunks = [(note, chunk) for note in notes for chunk in note.chunks]
+    missing = [chunk for _, chunk in chunks if chunk.embedding is None or chunk.embedding_model != model]
+    fresh = _embed_chunks(missing) if missing else {}
+    failed = {(chunk.note_id, chunk.ordinal) for chunk in missing} - set(fresh)
+
+    vectors: List[np.ndarray] = []
+    # Include date and tags in metadata for filtering
+    metas: List[Dict[str, Any]] = []
+    for note, chunk in chunks:
+        if (chunk.note_id, chunk.ordinal) in failed:
+            continue
+        embedding = fresh.get((chunk.note_id, chunk.ordinal), chunk.embedding)
+        vectors.append(np.frombuffer(embedding, dtype=np.float32))
+        metas.append({
+            "note_id": str(note.id),
+            "user_id": str(note.user_id),
+            "tenant_id": tenant_id,
+            "text": chunk.text,
+            "tokens": chunk.token_count,
+            "created_at": note.created_at.isoformat() if note.created_at else None,
+            "tags": note.tags if note.tags else [],
+        })
+
+    if fresh:
+        # Matching on the hash skips chunks whose note was edited meanwhile;
+        # the edit queued another update that embeds the new text
+        table = NoteChunk.__table__
+        db.execute(
+            update(table)
+            .where(
+                table.c.note_id == bindparam("b_note_id"),
+                table.c.ordinal == bindparam("b_ordinal"),
+                table.c.content_hash == bindparam("b_hash"),
+            )
+            .values(embedding=bindparam("b_embedding"), embedding_model=model),
+            [
+                {
+                    "b_note_id": chunk.note_id,
+                    "b_ordinal": chunk.ordinal,
+                    "b_hash": chunk.content_hash,
+                    "b_embedding": fresh[chunk.note_id, chunk.ordinal],
+                }
+                for chunk in missing
+                if (chunk.note_id, chunk.ordinal) in fresh
+            ],
+        )
+    db.commit()
+    return vectors, metas
+
+
+def build_tenant_index(
+    tenant_id: str, vectors: List[np.ndarray], metas: List[Dict[str, Any]]
+) -> Tuple[faiss.Index, ChunkStore]:
+    """Build a fresh index of the family suited to its size, plus its chunk store."""
+    ids = np.arange(len(vectors), dtype=np.int64)
+    matrix = np.array(vectors, dtype=np.float32)
+    index = build_index(matrix, ids)
+    keep_vectors = matrix if needs_vector_store(index_type(index)) else None
+    return index, ChunkStore.build(tenant_id, ids, metas, vectors=keep_vectors)
+
+
+def _add_chunks(
+    index: faiss.Index,
+    store: ChunkStore,
+    vectors: List[np.ndarray],
+    metas: List[Dict[str, Any]],
+) -> ChunkStore:
+    """Allocate chunk IDs, add vectors to the index and record their metadata."""
+    if not vectors:
+        return store
+    ids = np.arange(store.next_id, store.next_id + len(vectors), dtype=np.int64)
+    matrix = np.array(vectors, dtype=np.float32)
+    index.add_with_ids(matrix, ids)
+    return store.append(ids, metas, vectors=matrix if store.vectors is not None else None)
+
+
+def _drop_note_chunks(index: faiss.Index, store: ChunkStore, note_ids: Iterable[str]) -> ChunkStore:
+    """Remove the notes' chunks, tombstoning them if the index cannot delete."""
+    chunk_ids = store.ids_for_notes(note_ids)
+    if not len(chunk_ids):
+        return store
+    try:
+        index.remove_ids(chunk_ids)
+        return store.drop(chunk_ids)
+    except RuntimeError:
+        # HNSW graphs do not support removal
+        return store.drop(chunk_ids, tombstone=True)
+
+
+def _compact(index: faiss.Index, store: ChunkStore) -> Tuple[faiss.Index, ChunkStore]:
+    """Rebuild the index from its live vectors, discarding tombstones.
+
+    The new index uses the family suited to the tenant's current size.
+    """
+    live_ids = np.asarray(store.ids, dtype=np.int64)
+    vectors = live_vectors(index, store)
+    compacted = build_index(vectors, live_ids)
+    keep_vectors = vectors if needs_vector_store(index_type(compacted)) else None
+    return compacted, store.with_tombstones(()).with_vectors(keep_vectors)
+
+
+def _needs_compaction(index: faiss.Index, store: ChunkStore) -> bool:
+    tombstones = len(store.tombstones)
+    if tombstones > 0 and tombstones >= settings.index_compaction_ratio * index.ntotal:
+        return True
+    return should_retier(index_type(index), len(store), index.d)
+
+
+def _supports_incremental(index: faiss.Index) -> bool:
+    return isinstance(index, (faiss.IndexIDMap2, faiss.IndexIVF))
+
+
+def apply_note_changes(tenant_id: str, upserts: Iterable[str], deletes: Iterable[str]) -> bool:
+    """Patch the tenant's index for the given note IDs.
+
+    Falls back to a full rebuild if the tenant has no index yet or its index
+    predates ID mapping.
+    """
+    upserts = {str(n) for n in upserts}
+    deletes = {str(n) for n in deletes} - upserts
+    with tenant_write_lock(tenant_id):
+        loaded = read_index_files(tenant_id)
+        if loaded is None or not _supports_incremental(loaded[0]):
+            return rebuild_index_for_tenant(tenant_id)
+        index, store = loaded
+
+        db = SessionLocal()
+        try:
+            store = _drop_note_chunks(index, store, upserts | deletes)
+            if upserts:
+                vectors, metas = load_note_chunks(db, tenant_id, upserts)
+                store = _add_chunks(index, store, vectors, metas)
+
+            if not len(store):
+                _remove_index(tenant_id)
+                return True
+            if _needs_compaction(index, store):
+                index, store = _compact(index, store)
+
+            write_index_files(tenant_id, index, store)
+            refresh_index(tenant_id)
+            return True
+        except Exception as e:
+            print(f"Error updating index for tenant {tenant_id}: {e}")
+            return False
+        finally:
+            db.close()
+
+
+def update_note_in_index(tenant_id: str, note_id: str) -> bool:
+    """Embed a created or updated note's new chunks and swap its chunks in the index.
+
+    Opens its own database session.  API writes go through the index
+    scheduler, which batches several notes into one `apply_note_changes` call.
+    """
+    return apply_note_changes(tenant_id, upserts=[str(note_id)], deletes=[])
+
+
+def remove_note_from_index(tenant_id: str, note_id: str) -> bool:
+    """Remove a deleted note's chunks from the index."""
+    return apply_note_changes(tenant_id, upserts=[], deletes=[str(note_id)])
+
+
+def compact_index(tenant_id: str) -> bool:
+    """Compact a tenant's index if it carries any tombstones or has outgrown its family.
+
+    Suitable for a periodic job; no embedding calls are made.
+    """
+    with tenant_write_lock(tenant_id):
+        loaded = read_index_files(tenant_id)
+        if loaded is None or not _supports_incremental(loaded[0]):
+            return False
+        index, store = loaded
+        if not store.tombstones and not should_retier(index_type(index), len(store), index.d):
+            return True
+        write_index_files(tenant_id, *_compact(index, store))
+        refresh_index(tenant_id)
+        return True
+
+
 def rebuild_index_for_tenant(tenant_id: str) -> bool:
     """Rebuild the FAISS index for a specific tenant.
-    
+
     This function creates its own database session for use in background tasks.
     It should be called from FastAPI BackgroundTasks, not directly with a db session.
-    
+
     Args:
         tenant_id: Tenant UUID as string.
     Returns:
         True if successful, False otherwise.
     """
-    db = SessionLocal()
-    try:
-        # Get all notes for this tenant
-        notes = db.query(Note).filter(Note.tenant_id == tenant_id).all()
-        
-        if not notes:
-            # No notes, but we should still create an empty index or remove old one
-            _remove_index(tenant_id)
-            return True
-        
-        vectors = []
-        metadata = []
-        
-        for note in notes:
-            if not note.content:
-                continue
-            
-            chunks = split_text(note.content)
-            for chunk in chunks:
-                if not chunk.strip():
-                    continue
-                
-                try:
-                    emb = compute_query_embedding(chunk)
-                    vectors.append(emb)
-                    # Include date and tags in metadata for filtering
-                    metadata.append({
-                        "note_id": str(note.id),
-                        "user_id": str(note.user_id),
-                        "tenant_id": tenant_id,
-                        "text": chunk,
-                        "created_at": note.created_at.isoformat() if note.created_at else None,
-                        "tags": note.tags if note.tags else [],
-                    })
-                except Exception as e:
-                    # Log error but continue with other chunks
-                    print(f"Error generating embedding for chunk: {e}")
-                    continue
-        
-        if not vectors:
-            _remove_index(tenant_id)
+    with tenant_write_lock(tenant_id):
+        db = SessionLocal()
+        cache = get_embedding_cache()
+        hits_before, misses_before = cache.hits, cache.misses
+        try:
+            # Stored chunks of all the tenant's notes; only new text is embedded
+            vectors, metas = load_note_chunks(db, tenant_id)
+
+            if not vectors:
+                # No notes or no embeddable content; drop any old index
+                _remove_index(tenant_id)
+                return True
+
+            index, store = build_tenant_index(tenant_id, vectors, metas)
+            write_index_files(tenant_id, index, store)
+            # Searches keep using the old generation until the new one is loaded
+            refresh_index(tenant_id)
+
+            hits, misses = cache.hits - hits_before, cache.misses - misses_before
+            print(
+                f"Rebuilt {index_type(index)} index for tenant {tenant_id}: {len(vectors)} vectors, "
+                f"embedding cache {hits} hits / {misses} misses"
+            )
             return True
-        
-        # Build HNSW index
-        dim = len(vectors[0])
-        vectors_np = np.array(vectors, dtype=np.float32)
-        index = faiss.IndexHNSWFlat(dim, 32)  # M=32
-        index.hnsw.efConstruction = 200
-        index.add(vectors_np)
-        
-        # Save index and metadata
-        os.makedirs("vector_indexes", exist_ok=True)
-        idx_path = f"vector_indexes/index_{tenant_id}.faiss"
-        meta_path = f"vector_indexes/metadata_{tenant_id}.pkl"
-        
-        faiss.write_index(index, idx_path)
-        with open(meta_path, "wb") as f:
-            pickle.dump(metadata, f)
-        
-        # Clear cache so new index is loaded
-        from ..rag.faiss_index import _index_cache
-        if tenant_id in _index_cache:
-            del _index_cache[tenant_id]
-        
-        return True
-        
-    except Exception as e:
-        print(f"Error rebuilding index for tenant {tenant_id}: {e}")
-        return False
-    finally:
-        db.close()
+
+        except Exception as e:
+            print(f"Error rebuilding index for tenant {tenant_id}: {e}")
+            return False
+        finally:
+            db.close()
 
 
 def _remove_index(tenant_id: str) -> None:
     """Remove index files for a tenant."""
-    idx_path = f"vector_indexes/index_{tenant_id}.faiss"
-    meta_path = f"vector_indexes/metadata_{tenant_id}.pkl"
-    
     try:
-        if os.path.exists(idx_path):
-            os.remove(idx_path)
-        if os.path.exists(meta_path):
-            os.remove(meta_path)
-        
-        # Clear cache
-        from ..rag.faiss_index import _index_cache
-        if tenant_id in _index_cache:
-            del _index_cache[tenant_id]
+        remove_index_files(tenant_id)
+        invalidate_index(tenant_id)
     except Exception:
         pass  # Ignore errors when removing
-
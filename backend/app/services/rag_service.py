@@ -1,19 +1,35 @@
 """
-High‑level service wrapping semantic search, summarisation and task extraction.
+High‑level service wrapping semantic search, summarisation and the tasks of
+the retrieved notes.
+
+Tasks are extracted when notes are written (see `task_service`); searches
+only read the stored tasks of the notes they retrieve.
 """
+import asyncio
+import logging
+import re
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Dict, Iterator, List, Optional, Tuple, TypeVar
 from uuid import UUID
 
-from sqlalchemy import or_
+import numpy as np
+from sqlalchemy import func, or_
 from sqlalchemy.orm import Session
 
-from ..models.note import Note
-from ..models.task import Task, TaskStatus
-from ..rag import faiss_index
-from ..rag.summarization import summarise
-from ..rag.task_extraction import extract_tasks
+from ..models.note import Note, NoteChunk, note_search_vector
+from ..core.config import settings
+from ..rag import faiss_index, summarization
+from ..rag.answer_cache import answer_key, cached, cached_async, lookup, store
+from ..rag.context_packer import count_tokens, pack_context
+from ..rag.ranking import mmr_select, record_ranking, reciprocal_rank_fusion, similarity_matrix
+from ..rag.summarization import fallback_summary, summarise, summarise_async, summarise_stream
 from ..rag.utils import split_text
+from .task_service import note_tasks
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
 
 
 def query_assistant(
@@ -26,9 +42,12 @@ def query_assistant(
     end_date: Optional[str] = None,
     tags: Optional[str] = None,
     keyword_search: bool = False,
+    quality: Optional[str] = None,
 ) -> Dict[str, any]:
     """Perform semantic search and generate a summarised answer with tasks.
 
+    The tasks are the stored open tasks of the notes the answer is based on.
+
     Args:
         db: Database session.
         tenant_id: Current tenant ID.
@@ -39,172 +58,237 @@ def query_assistant(
         end_date: Optional end date filter (ISO format string).
         tags: Optional comma-separated tags to filter by.
         keyword_search: If True, also perform keyword search and combine results.
+        quality: Optional vector search effort hint ("fast", "balanced", "accurate").
     Returns:
         A dictionary with keys: `answer` (summary string),
-        `chunks` (list of chunk texts with metadata) and `tasks` (extracted tasks).
+        `chunks` (list of chunk texts with metadata), `tasks` (the notes' tasks)
+        and `ranking` (fusion, near-duplicate pruning and context packing
+        counts, including the tokens saved and dropped).
     """
-    # Build filters
-    filters: Dict[str, Any] = {}
-    if user_id:
-        filters["user_id"] = user_id
-    if start_date:
-        filters["start_date"] = start_date
-    if end_date:
-        filters["end_date"] = end_date
-    if tags:
-        filters["tags"] = tags
-    
-    # Perform semantic search
-    try:
-        semantic_results = faiss_index.semantic_search(tenant_id, query, top_k=top_k, filters=filters if filters else None)
-    except ValueError:
-        # Index does not exist; no search results
-        semantic_results = []
-    
-    # Optionally perform keyword search and combine
-    keyword_results = []
-    if keyword_search:
-        keyword_results = _keyword_search(db, tenant_id, query, user_id, start_date, end_date, tags, top_k)
-    
-    # Combine and deduplicate results
-    search_results = _combine_search_results(semantic_results, keyword_results, top_k)
-    
-    chunk_texts: List[str] = []
-    # Track note_ids from search results to link tasks
-    note_ids_seen = set()
-    for res in search_results:
-        chunk_texts.append(res.get("text", ""))
-        note_id = res.get("note_id")
-        if note_id:
-            note_ids_seen.add(note_id)
+    search_results, ranking = retrieve_chunks(
+        db, tenant_id, query, user_id, top_k, start_date, end_date, tags, keyword_search, quality
+    )
+    context, chunk_texts, note_ids = _context(search_results, ranking)
     
     if not chunk_texts:
         answer = "No relevant notes found."
         tasks: List[Dict[str, str | None]] = []
     else:
-        answer = summarise(chunk_texts, query)
-        extracted_tasks = extract_tasks(chunk_texts)
-        
-        # Save extracted tasks to database
-        tasks = _save_tasks_to_db(db, tenant_id, user_id, extracted_tasks, note_ids_seen)
+        # An empty answer is not cached and falls back to the chunks' text
+        answer = cached(_summary_key(context, query), lambda: summarise(chunk_texts, query))
+        answer = answer or fallback_summary(chunk_texts)
+        tasks = note_tasks(db, tenant_id, note_ids)
     
     return {
         "answer": answer,
         "chunks": search_results,
         "tasks": tasks,
+        "ranking": ranking,
     }
 
 
-def _save_tasks_to_db(
+async def query_assistant_async(
     db: Session,
     tenant_id: str,
+    query: str,
+    user_id: Optional[str] = None,
+    top_k: int = 5,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    tags: Optional[str] = None,
+    keyword_search: bool = False,
+    quality: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Async `query_assistant`: the summary is awaited on the async client.
+
+    Retrieval and reading tasks use the synchronous index and database code,
+    so they run in worker threads; the tasks are read while the summary is
+    generated.  The summary is bounded by a timeout, after which the
+    fallback summary is used (and not cached) instead of failing the search.
+
+    Takes the same arguments and returns the same result as `query_assistant`.
+    """
+    search_results, ranking = await asyncio.to_thread(
+        retrieve_chunks, db, tenant_id, query, user_id, top_k, start_date, end_date, tags, keyword_search, quality
+    )
+    context, chunk_texts, note_ids = _context(search_results, ranking)
+
+    if not chunk_texts:
+        answer = "No relevant notes found."
+        tasks: List[Dict[str, str | None]] = []
+    else:
+        answer, tasks = await asyncio.gather(
+            _with_timeout(
+                cached_async(_summary_key(context, query), lambda: summarise_async(chunk_texts, query)),
+                settings.llm_summary_timeout_seconds,
+                "summary",
+                None,
+            ),
+            asyncio.to_thread(note_tasks, db, tenant_id, note_ids),
+        )
+        answer = answer or fallback_summary(chunk_texts)
+
+    return {
+        "answer": answer,
+        "chunks": search_results,
+        "tasks": tasks,
+        "ranking": ranking,
+    }
+
+
+def _summary_key(context: List[Dict[str, Any]], query: str) -> str:
+    """Answer cache key for the summary of the packed context chunks."""
+    return answer_key("summary", summarization.MODEL, summarization.PROMPT_VERSION, context, query)
+
+
+async def _with_timeout(stage: Awaitable[T], timeout: float, name: str, fallback: T) -> T:
+    """Await an LLM stage, returning `fallback` if it takes longer than `timeout` seconds."""
+    try:
+        return await asyncio.wait_for(stage, timeout)
+    except asyncio.TimeoutError:
+        logger.warning("Search %s timed out after %.1fs", name, timeout)
+        return fallback
+
+
+def stream_assistant(
+    db: Session,
+    tenant_id: str,
+    query: str,
     user_id: Optional[str],
-    extracted_tasks: List[Dict[str, str | None]],
-    note_ids: set,
-) -> List[Dict[str, str | None]]:
-    """Save extracted tasks to the database and return them.
-    
+    search_results: List[Dict[str, Any]],
+    ranking: Dict[str, int],
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Produce the assistant's answer for retrieved chunks as a series of events.
+
+    The retrieved chunks are yielded first, then the summary as the model
+    generates it (in one piece from the answer cache), then the stored
+    tasks of the notes the answer is based on.
+
     Args:
         db: Database session.
-        tenant_id: Tenant ID.
-        user_id: User ID (optional, for filtering).
-        extracted_tasks: List of extracted task dictionaries.
-        note_ids: Set of note IDs from search results.
+        tenant_id: Current tenant ID.
+        query: Natural language question from the user.
+        user_id: Optional user ID the results were filtered by.
+        search_results: Chunks from `retrieve_chunks`.
+        ranking: Ranking report from `retrieve_chunks`.
+    Yields:
+        `(event, data)` pairs: `("chunks", {"chunks", "ranking"})`, one or more
+        `("answer", {"delta"})`, `("tasks", {"tasks"})` and finally
+        `("done", result)` with the same result `query_assistant` returns.
+    """
+    context, chunk_texts, note_ids = _context(search_results, ranking)
+    yield "chunks", {"chunks": search_results, "ranking": ranking}
+
+    if not chunk_texts:
+        answer = "No relevant notes found."
+        yield "answer", {"delta": answer}
+        tasks: List[Dict[str, str | None]] = []
+    else:
+        summary_key = _summary_key(context, query)
+        answer = lookup(summary_key)
+        if answer is not None:
+            yield "answer", {"delta": answer}
+        else:
+            pieces: List[str] = []
+            for piece in summarise_stream(chunk_texts, query):
+                pieces.append(piece)
+                yield "answer", {"delta": piece}
+            answer = "".join(pieces).strip()
+            if answer:
+                store(summary_key, answer)
+            else:
+                # Nothing was generated; the fallback is sent but not cached
+                answer = fallback_summary(chunk_texts)
+                yield "answer", {"delta": answer}
+        tasks = note_tasks(db, tenant_id, note_ids)
+
+    yield "tasks", {"tasks": tasks}
+    yield "done", {"answer": answer, "chunks": search_results, "tasks": tasks, "ranking": ranking}
+
+
+def retrieve_chunks(
+    db: Session,
+    tenant_id: str,
+    query: str,
+    user_id: Optional[str] = None,
+    top_k: int = 5,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    tags: Optional[str] = None,
+    keyword_search: bool = False,
+    quality: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """Retrieve the chunks that answer `query`, fused and de-duplicated.
+
+    Takes the same arguments as `query_assistant`.
+
     Returns:
-        List of task dictionaries (same format as extracted_tasks).
+        The selected chunks, best first, and the ranking report.
     """
-    saved_tasks = []
-    
-    if not extracted_tasks or not note_ids:
-        return extracted_tasks
-    
-    # Convert note_ids to UUIDs
-    note_uuids = []
-    for note_id_str in note_ids:
-        try:
-            note_uuids.append(UUID(note_id_str))
-        except (ValueError, TypeError):
-            continue
-    
-    if not note_uuids:
-        return extracted_tasks
-    
-    # Get the first note_id to link tasks (or distribute across notes)
-    primary_note_id = note_uuids[0]
+    # Build filters
+    filters: Dict[str, Any] = {}
+    if user_id:
+        filters["user_id"] = user_id
+    if start_date:
+        filters["start_date"] = start_date
+    if end_date:
+        filters["end_date"] = end_date
+    if tags:
+        filters["tags"] = tags
     
-    for task_data in extracted_tasks:
-        description = task_data.get("description", "").strip()
-        if not description:
-            continue
-        
-        # Parse due_date if provided
-        due_date = None
-        due_date_str = task_data.get("due_date")
-        if due_date_str:
-            try:
-                # Try parsing ISO format
-                due_date = datetime.fromisoformat(due_date_str.replace('Z', '+00:00'))
-            except (ValueError, AttributeError):
-                try:
-                    # Try parsing other common formats
-                    due_date = datetime.strptime(due_date_str, "%Y-%m-%d")
-                except (ValueError, AttributeError):
-                    due_date = None
-        
-        # Check if task already exists (avoid duplicates)
-        existing = db.query(Task).filter(
-            Task.tenant_id == UUID(tenant_id),
-            Task.note_id == primary_note_id,
-            Task.description == description,
-            Task.status == TaskStatus.open.value
-        ).first()
-        
-        if existing:
-            # Task already exists, skip
-            saved_tasks.append({
-                "description": description,
-                "due_date": due_date_str if due_date_str else None,
-            })
-            continue
-        
-        # Determine user_id for the task
-        task_user_id = UUID(user_id) if user_id else None
-        if not task_user_id:
-            # If no user_id provided, get from note
-            note = db.query(Note).filter(Note.id == primary_note_id).first()
-            if note:
-                task_user_id = note.user_id
-            else:
-                # Skip if we can't determine user_id
-                saved_tasks.append({
-                    "description": description,
-                    "due_date": due_date_str if due_date_str else None,
-                })
-                continue
-        
-        # Create new task
-        new_task = Task(
-            tenant_id=UUID(tenant_id),
-            user_id=task_user_id,
-            note_id=primary_note_id,
-            description=description,
-            due_date=due_date,
-            status=TaskStatus.open.value,
+    # Fetch extra candidates so near-duplicates can be pruned without
+    # leaving fewer than top_k chunks
+    candidates = top_k * settings.search_candidate_factor
+
+    # Perform semantic search
+    try:
+        semantic_results = faiss_index.semantic_search(
+            tenant_id, query, top_k=candidates, filters=filters if filters else None, quality=quality
         )
-        db.add(new_task)
-        saved_tasks.append({
-            "description": description,
-            "due_date": due_date_str if due_date_str else None,
-        })
+    except ValueError:
+        # Index does not exist; no search results
+        semantic_results = []
     
-    try:
-        db.commit()
-    except Exception as e:
-        db.rollback()
-        # Return extracted tasks even if save fails
-        return extracted_tasks
+    # Optionally perform keyword search and combine.  The BM25 index stored
+    # with the tenant's vectors needs no database round trip; tenants without
+    # one fall back to searching the notes table.
+    keyword_results = []
+    if keyword_search:
+        try:
+            keyword_results = faiss_index.keyword_search(
+                tenant_id, query, top_k=candidates, filters=filters if filters else None
+            )
+        except ValueError:
+            keyword_results = _keyword_search(
+                db, tenant_id, query, user_id, start_date, end_date, tags, candidates
+            )
     
-    return saved_tasks
+    # Fuse the rankings and prune near-duplicates before summarisation
+    return _rank_results(tenant_id, semantic_results, keyword_results, top_k)
+
+
+def _context(
+    search_results: List[Dict[str, Any]], ranking: Dict[str, int]
+) -> Tuple[List[Dict[str, Any]], List[str], List[str]]:
+    """Pack the results into the LLM context budget.
+
+    The packing counts are added to `ranking`.
+
+    Returns:
+        The packed chunks, their texts and the IDs of the notes they came
+        from, in rank order.
+    """
+    context, packing = pack_context(search_results, settings.llm_context_token_budget)
+    ranking.update(packing)
+    chunk_texts: List[str] = []
+    # Track note_ids from search results to look up their tasks
+    note_ids: List[str] = []
+    for res in context:
+        chunk_texts.append(res.get("text", ""))
+        note_id = res.get("note_id")
+        if note_id and note_id not in note_ids:
+            note_ids.append(note_id)
+    return context, chunk_texts, note_ids
 
 
 def _keyword_search(
@@ -218,7 +302,15 @@ def _keyword_search(
     top_k: int,
 ) -> List[Dict[str, Any]]:
     """Perform keyword-based search on notes.
-    
+
+    On Postgres, notes are matched against the GIN-indexed `search_vector`
+    column and ranked with `ts_rank_cd` in SQL, so only the best `top_k * 2`
+    notes are read.  Other databases fall back to ILIKE matching.  The chunks
+    of those notes are then scored by how many query terms they contain,
+    using the chunks stored with the tenant's index, or the notes'
+    `note_chunks` rows for notes not indexed yet, rather than re-splitting
+    the notes.
+
     Args:
         db: Database session.
         tenant_id: Tenant ID.
@@ -231,6 +323,10 @@ def _keyword_search(
     Returns:
         List of chunk dictionaries with metadata.
     """
+    query_terms = re.findall(r"\w+", query.lower())
+    if not query_terms:
+        return []
+
     # Build database query
     db_query = db.query(Note).filter(Note.tenant_id == UUID(tenant_id))
     
@@ -255,85 +351,136 @@ def _keyword_search(
         tag_list = [t.strip() for t in tags.split(",")]
         db_query = db_query.filter(Note.tags.contains(tag_list))
     
-    # Search in title and content
-    query_terms = query.lower().split()
-    conditions = []
-    for term in query_terms:
-        conditions.append(Note.title.ilike(f"%{term}%"))
-        conditions.append(Note.content.ilike(f"%{term}%"))
-    
-    if conditions:
-        db_query = db_query.filter(or_(*conditions))
-    
-    notes = db_query.limit(top_k * 2).all()  # Get more notes to chunk
-    
-    # Convert notes to chunks
+    if db.get_bind().dialect.name == "postgresql":
+        # Any term may match; notes matching more (and rarer) terms rank higher.
+        # Normalisation 32 scales the rank into [0, 1).
+        ts_query = func.to_tsquery("english", " | ".join(query_terms))
+        rank = func.ts_rank_cd(note_search_vector, ts_query, 32)
+        ranked_notes = (
+            db_query.add_columns(rank)
+            .filter(note_search_vector.op("@@")(ts_query))
+            .order_by(rank.desc())
+            .limit(top_k * 2)
+            .all()
+        )
+    else:
+        conditions = []
+        for term in query_terms:
+            conditions.append(Note.title.ilike(f"%{term}%"))
+            conditions.append(Note.content.ilike(f"%{term}%"))
+        ranked_notes = [(note, 1.0) for note in db_query.filter(or_(*conditions)).limit(top_k * 2).all()]
+
+    stored = _stored_chunks(tenant_id, [note.id for note, _ in ranked_notes])
+    unindexed = [note.id for note, _ in ranked_notes if str(note.id) not in stored]
+    rows: Dict[str, List[Any]] = {}
+    if unindexed:
+        # Text only; the stored embeddings are not needed here
+        chunk_rows = db.query(NoteChunk.note_id, NoteChunk.text, NoteChunk.token_count).filter(
+            NoteChunk.note_id.in_(unindexed)
+        ).order_by(NoteChunk.ordinal)
+        for row in chunk_rows:
+            rows.setdefault(str(row.note_id), []).append(row)
+
     results = []
-    for note in notes:
-        if not note.content:
-            continue
-        
-        chunks = split_text(note.content)
-        for chunk in chunks:
-            if not chunk.strip():
-                continue
-            
-            # Simple relevance scoring based on term matches
-            chunk_lower = chunk.lower()
-            score = sum(1 for term in query_terms if term in chunk_lower) / len(query_terms) if query_terms else 0
-            
-            results.append({
-                "note_id": str(note.id),
-                "user_id": str(note.user_id),
-                "tenant_id": tenant_id,
-                "text": chunk,
-                "score": score,
-                "created_at": note.created_at.isoformat() if note.created_at else None,
-                "tags": note.tags if note.tags else [],
-            })
+    for note, rank in ranked_notes:
+        chunks = stored.get(str(note.id))
+        if not chunks:
+            texts = [(row.text, row.token_count) for row in rows.get(str(note.id), [])]
+            if not texts and note.content:
+                # Written before chunks were stored with notes
+                texts = [(chunk, None) for chunk in split_text(note.content) if chunk.strip()]
+            chunks = [
+                {
+                    "note_id": str(note.id),
+                    "user_id": str(note.user_id),
+                    "tenant_id": tenant_id,
+                    "text": text,
+                    "tokens": tokens,
+                    "created_at": note.created_at.isoformat() if note.created_at else None,
+                    "tags": note.tags if note.tags else [],
+                }
+                for text, tokens in texts
+            ]
+        scored = [(sum(1 for term in query_terms if term in c["text"].lower()) / len(query_terms), c) for c in chunks]
+        # A note may match only through stemming; keep its first chunk then
+        matched = [item for item in scored if item[0] > 0] or scored[:1]
+        for coverage, chunk in matched:
+            chunk["score"] = float(rank) * max(coverage, 0.5 / len(query_terms))
+            results.append(chunk)
     
     # Sort by score and return top_k
     results.sort(key=lambda x: x.get("score", 0), reverse=True)
     return results[:top_k]
 
 
-def _combine_search_results(
+def _chunk_key(result: Dict[str, Any]) -> Any:
+    if result.get("chunk_id") is not None:
+        return result["chunk_id"]
+    return (result.get("note_id"), hash(result.get("text", "")))
+
+
+def _chunk_tokens(result: Dict[str, Any]) -> int:
+    if result.get("tokens") is not None:
+        return result["tokens"]
+    return count_tokens(result.get("text", ""))
+
+
+def _rank_results(
+    tenant_id: str,
     semantic_results: List[Dict[str, Any]],
     keyword_results: List[Dict[str, Any]],
     top_k: int,
-) -> List[Dict[str, Any]]:
-    """Combine semantic and keyword search results, deduplicating by note_id+text.
-    
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """Fuse semantic and keyword results and drop near-duplicate chunks.
+
+    The two rankings are merged with reciprocal rank fusion, then up to
+    `top_k` chunks are chosen by maximal marginal relevance; chunks nearly
+    identical to a chosen one (by embedding, or by tokens when a chunk has
+    no stored vector) never reach summarisation.
+
     Args:
-        semantic_results: Results from semantic search.
-        keyword_results: Results from keyword search.
+        tenant_id: Tenant ID (for looking up chunk embeddings).
+        semantic_results: Results from semantic search, best first.
+        keyword_results: Results from keyword search, best first.
         top_k: Maximum number of results to return.
     Returns:
-        Combined and deduplicated results.
+        The selected results, best first, and a report with the candidate,
+        selected and pruned counts, the context tokens sent on and the tokens
+        saved by pruning.
     """
-    if not keyword_results:
-        return semantic_results[:top_k]
-    
-    # Create a set of seen chunks (by note_id + text hash)
-    seen = set()
-    combined = []
-    
-    # Add semantic results first (they're already sorted by relevance)
-    for result in semantic_results:
-        chunk_key = (result.get("note_id"), hash(result.get("text", "")))
-        if chunk_key not in seen:
-            seen.add(chunk_key)
-            combined.append(result)
-            if len(combined) >= top_k:
-                return combined
-    
-    # Add keyword results that aren't duplicates
-    for result in keyword_results:
-        chunk_key = (result.get("note_id"), hash(result.get("text", "")))
-        if chunk_key not in seen:
-            seen.add(chunk_key)
-            combined.append(result)
-            if len(combined) >= top_k:
-                return combined
-    
-    return combined
\ No newline at end of file
+    fused = reciprocal_rank_fusion([semantic_results, keyword_results], key=_chunk_key, k=settings.search_rrf_k)
+    selected: List[int] = []
+    pruned: List[int] = []
+    if fused:
+        texts = [r.get("text", "") for r in fused]
+        vectors = faiss_index.chunk_vectors(tenant_id, [r.get("chunk_id") for r in fused])
+        relevance = np.array([r["rrf_score"] for r in fused], dtype=np.float32)
+        selected, pruned = mmr_select(
+            relevance / relevance.max(),
+            similarity_matrix(vectors, texts),
+            top_k,
+            lambda_=settings.search_mmr_lambda,
+            duplicate_threshold=settings.search_duplicate_threshold,
+        )
+    results = [fused[i] for i in selected]
+    report = {
+        "candidates": len(fused),
+        "selected": len(results),
+        "duplicates_pruned": len(pruned),
+        "context_tokens": sum(_chunk_tokens(r) for r in results),
+        "tokens_saved": sum(_chunk_tokens(fused[i]) for i in pruned),
+    }
+    record_ranking(report)
+    return results, report
+
+
+def _stored_chunks(tenant_id: str, note_ids: List[UUID]) -> Dict[str, List[Dict[str, Any]]]:
+    """Return the chunks stored with the tenant's index, grouped by note ID."""
+    try:
+        _, store = faiss_index.load_index(tenant_id)
+    except ValueError:
+        return {}
+    chunks: Dict[str, List[Dict[str, Any]]] = {}
+    for record in store.records(store.ids_for_notes(note_ids)):
+        chunks.setdefault(record["note_id"], []).append(record)
+    return chunks
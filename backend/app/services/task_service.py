@@ -0,0 +1,284 @@
+"""
+Task extraction at note-write time.
+
+Note writes queue the note with the task scheduler, a second
+`IndexScheduler` whose runner extracts tasks instead of updating the vector
+index, so extraction is debounced and batched per tenant off the request
+path.  Each note's tasks are extracted from that note alone and stored
+against it; searches read the stored open tasks of the notes they retrieve
+and make no extraction call.
+
+A note's `tasks_updated_at` records the `updated_at` of the version whose
+tasks are stored, so a note is extracted once per version: runs skip notes
+that have not changed since.  When a note changes, open tasks that an
+earlier extraction stored and its new version no longer yields are removed.
+Tasks that already exist for the note in any status, including completed
+ones and tasks stored before write-time extraction, are not added again.
+
+Notes whose extraction fails are retried by the task scheduler with capped
+backoff, without waiting for another write.  The retry also picks up edited
+notes whose extraction failed in another worker or before a restart.  Notes
+that have never been extracted (written before write-time extraction, or
+new notes whose first extraction failed in a worker that has since exited)
+are left to `scripts/extract_note_tasks.py`.
+"""
+import logging
+import threading
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID, uuid4
+
+from sqlalchemy import bindparam, delete, insert, or_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session, selectinload
+
+from ..core.cache import cache_delete_pattern
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.note import Note
+from ..models.task import Task, TaskSource, TaskStatus
+from ..rag import task_extraction
+from ..rag.answer_cache import answer_key, cached
+from ..rag.task_extraction import extract_tasks
+from ..rag.utils import split_text
+from .index_scheduler import IndexScheduler
+
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_due_date(due_date_str: Optional[str]) -> Optional[datetime]:
+    """Parse an extracted due date (ISO format or YYYY-MM-DD), or return None."""
+    if not due_date_str:
+        return None
+    try:
+        return datetime.fromisoformat(due_date_str.replace('Z', '+00:00'))
+    except (ValueError, AttributeError):
+        try:
+            return datetime.strptime(due_date_str, "%Y-%m-%d")
+        except (ValueError, AttributeError):
+            return None
+
+
+def _extract(note: Note) -> List[Dict[str, str | None]]:
+    """Extract the tasks of one note's stored chunks, through the LLM answer cache."""
+    chunks = [chunk.text for chunk in note.chunks]
+    if not chunks and note.content:
+        # Written before chunks were stored with notes
+        chunks = [chunk for chunk in split_text(note.content) if chunk.strip()]
+    if not chunks:
+        return []
+    key = answer_key(
+        "tasks", task_extraction.MODEL, task_extraction.PROMPT_VERSION, [{"text": chunk} for chunk in chunks]
+    )
+    return cached(key, lambda: extract_tasks(chunks))
+
+
+def extract_note_tasks(db: Session, notes: List[Note]) -> Tuple[int, Set[str]]:
+    """Extract and store the tasks of `notes`.
+
+    Notes whose stored tasks are already for their current version are
+    skipped, and notes whose extraction fails are left out and stay out of
+    date.  Storing costs a fixed number of round trips however many notes
+    and tasks there are: one query for the notes' tasks, one delete of the
+    stale ones, one bulk insert and one bulk update of the notes.
+
+    Args:
+        db: Database session.
+        notes: Notes to extract tasks from.
+    Returns:
+        (number of notes extracted, IDs of the notes whose extraction failed).
+    """
+    notes = [note for note in notes if note.tasks_updated_at is None or note.tasks_updated_at != note.updated_at]
+    extracted: Dict[UUID, Dict[str, Optional[datetime]]] = {}
+    failed: Set[str] = set()
+    for note in notes:
+        try:
+            found = _extract(note)
+        except Exception:
+            logger.exception("Task extraction failed for note %s", note.id)
+            failed.add(str(note.id))
+            continue
+        tasks = extracted[note.id] = {}
+        for task_data in found:
+            description = (task_data.get("description") or "").strip()
+            if description:
+                tasks.setdefault(description, _parse_due_date(task_data.get("due_date")))
+    notes = [note for note in notes if note.id in extracted]
+    if not notes:
+        return 0, failed
+
+    try:
+        existing = db.query(Task.id, Task.note_id, Task.description, Task.status, Task.source).filter(
+            Task.note_id.in_(list(extracted)),
+        ).all()
+        # Only open tasks an earlier extraction stored are replaced
+        stale = [
+            task.id for task in existing
+            if task.status == TaskStatus.open.value
+            and task.source == TaskSource.note.value
+            and task.description not in extracted[task.note_id]
+        ]
+        if stale:
+            db.execute(delete(Task).where(Task.id.in_(stale)))
+        kept = {(task.note_id, task.description) for task in existing}
+        rows = [
+            {
+                "id": uuid4(),
+                "tenant_id": note.tenant_id,
+                "user_id": note.user_id,
+                "note_id": note.id,
+                "description": description,
+                "due_date": due_date,
+                "status": TaskStatus.open.value,
+                "source": TaskSource.note.value,
+                "created_at": datetime.utcnow(),
+            }
+            for note in notes
+            for description, due_date in extracted[note.id].items()
+            if (note.id, description) not in kept
+        ]
+        if rows:
+            if db.get_bind().dialect.name == "postgresql":
+                # Skip tasks a concurrent run inserted first
+                statement = pg_insert(Task).on_conflict_do_nothing()
+            else:
+                statement = insert(Task)
+            db.execute(statement, rows)
+        # Record the version the tasks came from.  `updated_at` is set to
+        # itself so its onupdate default does not fire, and a note edited
+        # meanwhile is left stale for the run its edit queued.
+        notes_table = Note.__table__
+        db.execute(
+            update(notes_table)
+            .where(notes_table.c.id == bindparam("note_id"), notes_table.c.updated_at == bindparam("version"))
+            .values(tasks_updated_at=bindparam("version"), updated_at=bindparam("version")),
+            [{"note_id": note.id, "version": note.updated_at} for note in notes],
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(notes), failed
+
+
+def _stale(tenant_id: str) -> Tuple[Any, ...]:
+    """Filter criteria for the tenant's notes whose stored tasks are out of date."""
+    return (
+        Note.tenant_id == UUID(tenant_id),
+        or_(Note.tasks_updated_at.is_(None), Note.tasks_updated_at != Note.updated_at),
+    )
+
+
+def extract_stale_notes(
+    db: Session, tenant_id: str, note_ids: Optional[Iterable[str]] = None
+) -> Tuple[int, Set[str]]:
+    """Extract the tasks of the tenant's out-of-date notes (optionally only `note_ids`).
+
+    Notes are extracted and stored `settings.task_extraction_batch_size` at
+    a time, each batch in its own transaction, so a failing batch does not
+    roll back the others.
+
+    Returns:
+        (number of notes extracted, IDs of the notes whose extraction failed).
+    """
+    if note_ids is None:
+        note_ids = [str(note_id) for (note_id,) in db.query(Note.id).filter(*_stale(tenant_id))]
+    note_ids = sorted({str(note_id) for note_id in note_ids})
+    batch_size = settings.task_extraction_batch_size
+    extracted, failed = 0, set()
+    for start in range(0, len(note_ids), batch_size):
+        batch = set(note_ids[start:start + batch_size])
+        try:
+            count, batch_failed = extract_note_tasks(db, stale_notes(db, tenant_id, batch))
+        except Exception:
+            logger.exception("Storing tasks failed for %d notes of tenant %s", len(batch), tenant_id)
+            count, batch_failed = 0, batch
+        extracted += count
+        failed |= batch_failed
+    return extracted, failed
+
+
+def stale_notes(db: Session, tenant_id: str, note_ids: Optional[Set[str]] = None) -> List[Note]:
+    """Return the tenant's notes (optionally only `note_ids`) whose stored tasks are out of date."""
+    query = db.query(Note).filter(*_stale(tenant_id)).options(selectinload(Note.chunks))
+    if note_ids is not None:
+        query = query.filter(Note.id.in_([UUID(note_id) for note_id in note_ids]))
+    return query.all()
+
+
+def note_tasks(db: Session, tenant_id: str, note_ids: List[str]) -> List[Dict[str, str | None]]:
+    """Return the stored open tasks of `note_ids`, in the order the notes are given.
+
+    Args:
+        db: Database session.
+        tenant_id: Tenant ID.
+        note_ids: Note IDs, e.g. of retrieved chunks, best first.
+    Returns:
+        List of dicts with keys: description, due_date (ISO format or None).
+    """
+    rank = {}
+    for note_id in note_ids:
+        try:
+            rank.setdefault(UUID(note_id), len(rank))
+        except (ValueError, TypeError):
+            continue
+    if not rank:
+        return []
+    rows = db.query(Task.note_id, Task.description, Task.due_date).filter(
+        Task.tenant_id == UUID(tenant_id),
+        Task.note_id.in_(list(rank)),
+        Task.status == TaskStatus.open.value,
+    ).order_by(Task.created_at).all()
+    rows.sort(key=lambda row: rank[row.note_id])
+    return [
+        {"description": row.description, "due_date": row.due_date.isoformat() if row.due_date else None}
+        for row in rows
+    ]
+
+
+# Notes whose extraction failed, retried by the next run for their tenant
+_retry: Dict[str, Set[str]] = {}
+_retry_lock = threading.Lock()
+
+
+def _run_task_job(tenant_id: str, upserts: Set[str], deletes: Set[str], full_rebuild: bool) -> bool:
+    # Deleted notes' tasks are removed by the foreign key cascade.  The
+    # scheduler asks for a full run after a failure; only the notes that
+    # failed are retried, never every note that has no stored tasks.
+    with _retry_lock:
+        note_ids = upserts | _retry.pop(tenant_id, set())
+    db = SessionLocal()
+    try:
+        if full_rebuild:
+            # Edited notes whose extraction failed in another worker, or
+            # before a restart emptied `_retry`: extracted once, stale now
+            note_ids |= {
+                str(note_id)
+                for (note_id,) in db.query(Note.id).filter(*_stale(tenant_id), Note.tasks_updated_at.isnot(None))
+            }
+        if not note_ids:
+            return True
+        extracted, failed = extract_stale_notes(db, tenant_id, note_ids)
+    finally:
+        db.close()
+    if failed:
+        with _retry_lock:
+            _retry.setdefault(tenant_id, set()).update(failed)
+    if extracted:
+        # Cached search results list the notes' previous tasks
+        cache_delete_pattern(f"search:tenant_id:{tenant_id}:*")
+        logger.info("Extracted tasks from %d notes for tenant %s", extracted, tenant_id)
+    return not failed
+
+
+@lru_cache()
+def get_task_scheduler() -> IndexScheduler:
+    """Return the process-wide task extraction scheduler."""
+    return IndexScheduler(
+        settings.index_rebuild_debounce_seconds,
+        runner=_run_task_job,
+        retry_base_seconds=settings.index_retry_base_seconds,
+        retry_max_seconds=settings.index_retry_max_seconds,
+    )
@@ -4,16 +4,9 @@ This script can be run directly in the container.
 """
 import os
 import sys
-import pickle
-from typing import Dict, List
-
-import openai
 import sqlalchemy as sa
 from sqlalchemy.orm import Session
 
-import faiss
-import numpy as np
-
 # Add app to path
 sys.path.insert(0, '/app')
 
@@ -24,81 +17,37 @@ from app.models import user as user_model  # Import User to fix relationship
 from app.models import note as note_model
 from app.models import task as task_model  # Import Task to fix relationship
 from app.core.config import settings
-from app.rag.utils import split_text
-
-
-def get_embedding(text: str) -> List[float]:
-    """Get embedding from OpenAI."""
-    if not settings.openai_api_key:
-        raise RuntimeError("OPENAI_API_KEY not configured")
-    
-    # Use OpenAI client (newer API)
-    try:
-        from openai import OpenAI
-        client = OpenAI(api_key=settings.openai_api_key)
-        response = client.embeddings.create(
-            input=text,
-            model="text-embedding-ada-002"
-        )
-        return response.data[0].embedding
-    except ImportError:
-        # Fallback to old API
-        openai.api_key = settings.openai_api_key
-        response = openai.Embedding.create(input=text, model="text-embedding-ada-002")
-        return response["data"][0]["embedding"]
+from app.rag.embedding_cache import get_embedding_cache
+from app.rag.faiss_index import generation_dir, tenant_write_lock, write_index_files
+from app.rag.index_types import index_type
+from app.services.index_service import build_tenant_index, load_note_chunks
 
 
-def build_index_for_tenant(session: Session, tenant_id: str, notes: List[note_model.Note]) -> None:
-    """Build FAISS index for a tenant's notes."""
-    vectors = []
-    metadata = []
+def build_index_for_tenant(session: Session, tenant_id: str, note_count: int) -> None:
+    """Build FAISS index for a tenant's notes from their stored chunks."""
+    print(f"Processing {note_count} notes for tenant {tenant_id}...")
     
-    print(f"Processing {len(notes)} notes for tenant {tenant_id}...")
-    
-    for note in notes:
-        if not note.content:
-            continue
-        chunks = split_text(note.content)
-        for chunk in chunks:
-            if not chunk.strip():
-                continue
-            try:
-                emb = get_embedding(chunk)
-                vectors.append(emb)
-                metadata.append({
-                    "note_id": str(note.id),
-                    "user_id": str(note.user_id),
-                    "tenant_id": tenant_id,
-                    "text": chunk,
-                })
-            except Exception as e:
-                print(f"Error getting embedding: {e}")
-                continue
+    # Held from reading the chunks to publishing, so running API workers'
+    # incremental updates are not overwritten by an older build
+    with tenant_write_lock(tenant_id):
+        # Only chunks without a stored embedding are embedded
+        try:
+            vectors, metadata = load_note_chunks(session, tenant_id)
+        except Exception as e:
+            session.rollback()
+            print(f"Error getting embeddings: {e}")
+            return
 
-    if not vectors:
-        print(f"No vectors generated for tenant {tenant_id}")
-        return
+        if not vectors:
+            print(f"No vectors generated for tenant {tenant_id}")
+            return
 
-    dim = len(vectors[0])
-    vectors_np = np.array(vectors, dtype=np.float32)
-    
-    # Build HNSW index
-    index = faiss.IndexHNSWFlat(dim, 32)  # M=32
-    index.hnsw.efConstruction = 200
-    index.add(vectors_np)
+        # Build an index of the family suited to the tenant's size and publish it
+        index, store = build_tenant_index(tenant_id, vectors, metadata)
+        generation = write_index_files(tenant_id, index, store)
 
-    # Save index and metadata
-    os.makedirs("vector_indexes", exist_ok=True)
-    idx_path = f"vector_indexes/index_{tenant_id}.faiss"
-    meta_path = f"vector_indexes/metadata_{tenant_id}.pkl"
-    
-    faiss.write_index(index, idx_path)
-    with open(meta_path, "wb") as f:
-        pickle.dump(metadata, f)
-    
-    print(f"✅ Built index for tenant {tenant_id}: {len(vectors)} vectors")
-    print(f"   Index saved: {idx_path}")
-    print(f"   Metadata saved: {meta_path}")
+    print(f"✅ Built {index_type(index)} index for tenant {tenant_id}: {len(vectors)} vectors")
+    print(f"   Published generation {generation}: {generation_dir(tenant_id, generation)}")
 
 
 def main():
@@ -125,18 +74,20 @@ def main():
     print()
     
     for tenant in tenants:
-        notes = session.query(note_model.Note).filter(
+        note_count = session.query(note_model.Note).filter(
             note_model.Note.tenant_id == tenant.id
-        ).all()
+        ).count()
         
-        if not notes:
+        if not note_count:
             print(f"⚠️  Tenant {tenant.name} ({tenant.id}) has no notes. Skipping.")
             continue
         
-        build_index_for_tenant(session, str(tenant.id), notes)
+        build_index_for_tenant(session, str(tenant.id), note_count)
         print()
 
     session.close()
+    stats = get_embedding_cache().stats()
+    print(f"Embedding cache: {stats['hits']} hits, {stats['misses']} misses (hit rate {stats['hit_rate']:.1%})")
     print("=" * 60)
     print("✅ Index building complete!")
     print("=" * 60)
@@ -8,7 +8,7 @@ Streamlit’s session state to persist authentication tokens between requests.
 import json
 import os
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import pandas as pd
 import requests
@@ -174,19 +174,14 @@ def delete_note(token: str, note_id: str) -> None:
         st.error("❌ Connection error: Unable to delete note. Please try again.")
 
 
-def search_notes(
-    token: str, 
-    query: str, 
+def _search_params(
+    query: str,
     top_k: int,
-    start_date: Optional[str] = None,
-    end_date: Optional[str] = None,
-    tags: Optional[str] = None,
-    keyword_search: bool = False,
-) -> Dict[str, any]:
-    """Perform semantic search with optional filters. Returns empty dict on error."""
-    if not query.strip():
-        return {}
-    
+    start_date: Optional[str],
+    end_date: Optional[str],
+    tags: Optional[str],
+    keyword_search: bool,
+) -> dict:
     params = {"q": query, "top_k": top_k}
     if start_date:
         params["start_date"] = start_date
@@ -196,26 +191,58 @@ def search_notes(
         params["tags"] = tags
     if keyword_search:
         params["keyword_search"] = "true"
+    return params
+
+
+def _search_error(resp: requests.Response) -> None:
+    """Report a failed search response to the user."""
+    if resp.status_code == 401:
+        st.error("Session expired. Please log in again.")
+        st.session_state["auth"] = {}
+        st.rerun()
+    elif resp.status_code == 429:
+        st.error("⚠️ Rate limit exceeded. Please wait a moment and try again.")
+    else:
+        error_msg = resp.json().get('detail', 'Search failed') if resp.status_code != 500 else 'Server error'
+        st.warning(f"⚠️ Search error: {error_msg}")
+
+
+def stream_search_notes(
+    token: str,
+    query: str,
+    top_k: int,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    tags: Optional[str] = None,
+    keyword_search: bool = False,
+) -> Iterator[Tuple[str, dict]]:
+    """Perform semantic search via `/search/stream`, yielding (event, data) pairs.
+
+    Yields `chunks` first, then `answer` deltas, `tasks` and `done`, or an
+    `error` event.  Nothing is yielded if the request fails.
+    """
+    if not query.strip():
+        return
+    
+    params = _search_params(query, top_k, start_date, end_date, tags, keyword_search)
+    headers = {"Authorization": f"Bearer {token}"}
     
     try:
-        resp = api_get("/search/", params=params, token=token)
-        if resp.status_code == 200:
-            return resp.json()
-        elif resp.status_code == 401:
-            st.error("Session expired. Please log in again.")
-            st.session_state["auth"] = {}
-            st.rerun()
-            return {}
-        elif resp.status_code == 429:
-            st.error("⚠️ Rate limit exceeded. Please wait a moment and try again.")
-            return {}
-        else:
-            error_msg = resp.json().get('detail', 'Search failed') if resp.status_code != 500 else 'Server error'
-            st.warning(f"⚠️ Search error: {error_msg}")
-            return {}
-    except Exception:
+        with requests.get(
+            f"{API_BASE_URL}/search/stream", params=params, headers=headers, stream=True, timeout=(5, 120)
+        ) as resp:
+            if resp.status_code != 200:
+                _search_error(resp)
+                return
+            event = "message"
+            for line in resp.iter_lines(decode_unicode=True):
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    yield event, json.loads(line[len("data:"):])
+                    event = "message"
+    except requests.exceptions.RequestException:
         st.error("❌ Connection error: Unable to perform search. Please try again.")
-        return {}
 
 
 def load_tasks(token: str, status_filter: Optional[str] = None) -> List[dict]:
@@ -555,41 +582,56 @@ def main() -> None:
         top_k = st.slider("Number of results", 1, 20, 5)
         
         if st.button("🔍 Search", type="primary") and query:
-            with st.spinner("Searching your notes..."):
-                result = search_notes(
-                    access_token, 
-                    query, 
-                    top_k,
-                    start_date=start_date.isoformat() if start_date else None,
-                    end_date=end_date.isoformat() if end_date else None,
-                    tags=tags_input if tags_input else None,
-                    keyword_search=keyword_search,
-                )
+            # Results are rendered as the stream arrives: retrieved notes
+            # first, then the answer as it is written, then the tasks
+            answer_slot = st.empty()
+            chunks_slot = st.container()
+            tasks_slot = st.container()
+            answer_slot.caption("🔍 Searching your notes...")
+            answer = ""
+            chunks: List[dict] = []
+            received = False
             
-            if result:
-                answer = result.get("answer", "")
-                chunks = result.get("chunks", [])
-                tasks = result.get("tasks", [])
-                
-                if answer and answer != "No relevant notes found.":
-                    st.subheader("💡 Answer")
-                    st.info(answer)
-                
-                if chunks:
-                    st.subheader(f"📄 Top Results ({len(chunks)} found)")
-                    for idx, item in enumerate(chunks, 1):
-                        with st.expander(f"Result {idx} (Relevance: {item.get('score', 0):.2%})"):
-                            st.write(item.get('text', ''))
-                elif not answer or answer == "No relevant notes found.":
-                    st.info("No relevant notes found. Try different keywords or create more notes!")
-                
-                if tasks:
-                    st.subheader("✅ Extracted Tasks")
-                    for task in tasks:
-                        due_date = f" (due {task['due_date']})" if task.get('due_date') else ""
-                        st.write(f"• {task['description']}{due_date}")
-            else:
-                st.warning("No results found. Try a different search query.")
+            for event, data in stream_search_notes(
+                access_token, 
+                query, 
+                top_k,
+                start_date=start_date.isoformat() if start_date else None,
+                end_date=end_date.isoformat() if end_date else None,
+                tags=tags_input if tags_input else None,
+                keyword_search=keyword_search,
+            ):
+                received = True
+                if event == "chunks":
+                    chunks = data.get("chunks", [])
+                    if chunks:
+                        answer_slot.caption("💡 Writing answer...")
+                        with chunks_slot:
+                            st.subheader(f"📄 Top Results ({len(chunks)} found)")
+                            for idx, item in enumerate(chunks, 1):
+                                with st.expander(f"Result {idx} (Relevance: {item.get('score', 0):.2%})"):
+                                    st.write(item.get('text', ''))
+                elif event == "answer":
+                    answer += data.get("delta", "")
+                    if answer != "No relevant notes found.":
+                        with answer_slot.container():
+                            st.subheader("💡 Answer")
+                            st.info(answer)
+                elif event == "tasks":
+                    tasks = data.get("tasks", [])
+                    if tasks:
+                        with tasks_slot:
+                            st.subheader("✅ Extracted Tasks")
+                            for task in tasks:
+                                due_date = f" (due {task['due_date']})" if task.get('due_date') else ""
+                                st.write(f"• {task['description']}{due_date}")
+                elif event == "error":
+                    st.warning(f"⚠️ Search error: {data.get('detail', 'Search failed')}")
+            
+            if not received:
+                answer_slot.warning("No results found. Try a different search query.")
+            elif not chunks and answer in ("", "No relevant notes found."):
+                answer_slot.info("No relevant notes found. Try different keywords or create more notes!")
 
     elif page == "Tasks":
         st.header("✅ Tasks")
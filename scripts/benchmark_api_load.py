@@ -0,0 +1,560 @@
+"""
+End-to-end API load benchmark.
+
+Starts the FastAPI app from `backend/app/main.py` under uvicorn against a
+local database, with a local stand-in for the OpenAI API.  It then drives
+mixed read/write traffic at a target request rate and reports latency
+histograms, error rates and cache hit ratios for each route.
+
+* The fake OpenAI server answers `/v1/embeddings` and `/v1/chat/completions`
+  after a configurable latency.  Embeddings are deterministic bag-of-words
+  vectors, so queries that share words with notes retrieve them.  Streamed
+  completions send their first token after the latency and the rest at once.
+  JSON-mode requests get an object with `answer` and `tasks`.  The app
+  finds the server through `OPENAI_BASE_URL`, which the OpenAI client reads.
+* Redis is optional.  `--redis=fake` starts an in-process stand-in (needs
+  `fakeredis`), `--redis=<url>` uses a real server and `--redis=none` runs
+  without a cache.
+* Traffic is open-loop: requests are sent on schedule whether or not earlier
+  ones have finished.  Latency is measured from the scheduled send time, so
+  queueing in an overloaded server shows up instead of lowering the request
+  rate.
+
+Cache counters come from `/health/metrics`.  They are per worker process, so
+use `--workers=1` (the default) when the hit ratios matter.
+
+Usage:
+
+```
+python scripts/benchmark_api_load.py [--rps=50] [--duration=60] [--tenants=2] \
+    [--users-per-tenant=3] [--seed-notes=200] [--distinct-queries=50] \
+    [--mix=search:50,list_notes:20,get_note:10,create_note:10,update_note:5,list_tasks:5] \
+    [--embedding-latency-ms=50] [--chat-latency-ms=800] [--redis=fake] \
+    [--database-url=sqlite:///...] [--workers=1] [--output=benchmark_api_load.json]
+```
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTOGRAM_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+DEFAULT_MIX = "search:50,list_notes:20,get_note:10,create_note:10,update_note:5,list_tasks:5"
+WORDS = (
+    "meeting project budget review launch design customer report deadline team roadmap hiring "
+    "travel doctor gym family dinner book idea release bug migration invoice contract feedback "
+    "interview workshop garden weekend vacation training presentation research"
+).split()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load-test the API with local OpenAI and Redis stand-ins")
+    parser.add_argument("--rps", type=float, default=50.0, help="Target requests per second")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds of measured traffic")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Seconds of unmeasured traffic first")
+    parser.add_argument(
+        "--mix",
+        default=DEFAULT_MIX,
+        help="Comma-separated route:weight pairs (routes: search, search_stream, list_notes, "
+             "get_note, create_note, update_note, list_tasks)",
+    )
+    parser.add_argument("--tenants", type=int, default=2, help="Tenants to create")
+    parser.add_argument("--users-per-tenant", type=int, default=3, help="Users per tenant, including the admin")
+    parser.add_argument("--seed-notes", type=int, default=200, help="Notes created per tenant before the run")
+    parser.add_argument("--distinct-queries", type=int, default=50, help="Size of the (Zipf-weighted) query pool")
+    parser.add_argument("--embedding-latency-ms", type=float, default=50.0, help="Fake embeddings latency")
+    parser.add_argument("--chat-latency-ms", type=float, default=800.0, help="Fake chat completion latency")
+    parser.add_argument("--embedding-dim", type=int, default=1536, help="Fake embedding dimension")
+    parser.add_argument("--redis", default="fake", help="'fake' (in-process stand-in), 'none' or a Redis URL")
+    parser.add_argument("--database-url", help="Database URL (default: a fresh SQLite file)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--max-connections", type=int, default=200, help="Client connection pool size")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--output", default="benchmark_api_load.json", help="Where to write the JSON results")
+    return parser.parse_args()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# ---------------------------------------------------------------------------
+# Fake OpenAI server
+# ---------------------------------------------------------------------------
+
+
+class FakeOpenAI:
+    """Minimal OpenAI-compatible HTTP server with configurable latency."""
+
+    def __init__(self, dim: int, embedding_latency_ms: float, chat_latency_ms: float) -> None:
+        self.dim = dim
+        self.embedding_latency = embedding_latency_ms / 1000.0
+        self.chat_latency = chat_latency_ms / 1000.0
+        self.calls = {"embeddings": 0, "embedded_texts": 0, "chat": 0}
+        self._lock = threading.Lock()
+        self._word_vectors: Dict[str, np.ndarray] = {}
+        self._server = ThreadingHTTPServer(("127.0.0.1", free_port()), self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def start(self) -> None:
+        threading.Thread(target=self._server.serve_forever, name="fake-openai", daemon=True).start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+
+    def embed(self, text: str) -> np.ndarray:
+        """Sum of fixed random vectors for each word, normalised."""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in text.lower().split():
+            word = word.strip(".,:;!?'\"")
+            with self._lock:
+                if word not in self._word_vectors:
+                    seed = int.from_bytes(hashlib.sha256(word.encode()).digest()[:8], "little")
+                    self._word_vectors[word] = np.random.default_rng(seed).normal(size=self.dim).astype(np.float32)
+                vector += self._word_vectors[word]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _embeddings(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        with self._lock:
+            self.calls["embeddings"] += 1
+            self.calls["embedded_texts"] += len(texts)
+        time.sleep(self.embedding_latency)
+        data = []
+        for i, text in enumerate(texts):
+            vector = self.embed(text)
+            if body.get("encoding_format") == "base64":
+                embedding: Any = base64.b64encode(vector.astype("<f4").tobytes()).decode()
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        tokens = sum(len(t.split()) for t in texts)
+        return {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", ""),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    def _chat(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self.calls["chat"] += 1
+        time.sleep(self.chat_latency)
+        prompt = " ".join(m.get("content") or "" for m in body.get("messages", []))
+        if "JSON" in prompt:
+            words = [w for w in prompt.split() if w in WORDS][:2] or ["notes"]
+            content = json.dumps([{"description": f"Follow up on {w}", "due_date": None} for w in words])
+        else:
+            content = "Summary: " + " ".join(prompt.split()[-40:])
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", ""),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": len(prompt.split()),
+                "completion_tokens": 20,
+                "total_tokens": len(prompt.split()) + 20,
+            },
+        }
+
+    @staticmethod
+    def _chat_stream(completion: Dict[str, Any]) -> bytes:
+        """Re-encode a completion as `chat.completion.chunk` server-sent events, one per word."""
+        words = completion["choices"][0]["message"]["content"].split(" ")
+        deltas = [{"role": "assistant", "content": ""}] + [
+            {"content": word if i == 0 else " " + word} for i, word in enumerate(words)
+        ]
+        events = []
+        for i, delta in enumerate(deltas + [{}]):
+            chunk = {
+                "id": completion["id"],
+                "object": "chat.completion.chunk",
+                "created": completion["created"],
+                "model": completion["model"],
+                "choices": [{"index": 0, "delta": delta, "finish_reason": "stop" if i == len(deltas) else None}],
+            }
+            events.append(f"data: {json.dumps(chunk)}\n\n")
+        events.append("data: [DONE]\n\n")
+        return "".join(events).encode()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if self.path.endswith("/embeddings"):
+                    payload = fake._embeddings(body)
+                elif self.path.endswith("/chat/completions"):
+                    payload = fake._chat(body)
+                else:
+                    self.send_error(404)
+                    return
+                if body.get("stream"):
+                    data, content_type = fake._chat_stream(payload), "text/event-stream"
+                else:
+                    data, content_type = json.dumps(payload).encode(), "application/json"
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+# ---------------------------------------------------------------------------
+# App and Redis processes
+# ---------------------------------------------------------------------------
+
+
+def start_fake_redis() -> Tuple[Any, str]:
+    try:
+        from fakeredis import TcpFakeServer
+    except ImportError:
+        sys.exit("--redis=fake needs the fakeredis package (pip install fakeredis), or pass --redis=none/<url>")
+    port = free_port()
+    server = TcpFakeServer(("127.0.0.1", port), server_type="redis")
+    threading.Thread(target=server.serve_forever, name="fake-redis", daemon=True).start()
+    return server, f"redis://127.0.0.1:{port}/0"
+
+
+def start_app(workdir: str, env: Dict[str, str], workers: int) -> Tuple[subprocess.Popen, str]:
+    port = free_port()
+    env = {**os.environ, **env, "PYTHONPATH": os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get("PYTHONPATH")]))}
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "backend.app.main:app",
+            "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning",
+        ],
+        cwd=workdir,  # index files and the embedding cache are written relative to it
+        env=env,
+        stdout=open(os.path.join(workdir, "app.log"), "w"),
+        stderr=subprocess.STDOUT,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            sys.exit(f"App exited during startup; see {os.path.join(workdir, 'app.log')}")
+        try:
+            if httpx.get(f"{base_url}/health/", timeout=1).status_code == 200:
+                return proc, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    sys.exit("App did not become healthy within 60 seconds")
+
+
+# ---------------------------------------------------------------------------
+# Traffic
+# ---------------------------------------------------------------------------
+
+
+def sentence(rng: random.Random, length: int = 12) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(length)).capitalize() + "."
+
+
+def note_body(rng: random.Random) -> Dict[str, Any]:
+    lines = [sentence(rng) for _ in range(rng.randint(3, 12))]
+    if rng.random() < 0.3:
+        lines.append(f"TODO: {sentence(rng, 5)}")
+    return {
+        "title": sentence(rng, 4),
+        "content": "\n".join(lines),
+        "tags": rng.sample(["work", "personal", "health", "ideas", "travel"], rng.randint(0, 2)),
+    }
+
+
+class LoadState:
+    """Users and their note IDs the traffic generator picks from."""
+
+    def __init__(self, rng: random.Random, distinct_queries: int) -> None:
+        self.rng = rng
+        self.users: List[Dict[str, Any]] = []
+        self.notes: Dict[str, List[str]] = {}
+        # A tenant admin's headers, for /health/metrics
+        self.admin_headers: Dict[str, str] = {}
+        self.queries = [sentence(rng, rng.randint(2, 5)) for _ in range(distinct_queries)]
+        weights = [1.0 / (i + 1) for i in range(distinct_queries)]
+        total = sum(weights)
+        self.query_weights = [w / total for w in weights]
+
+    def user(self) -> Dict[str, Any]:
+        return self.rng.choice(self.users)
+
+    def query(self) -> str:
+        return self.rng.choices(self.queries, weights=self.query_weights)[0]
+
+
+async def setup_tenants(client: httpx.AsyncClient, state: LoadState, args) -> None:
+    """Create tenants, users and seed notes through the API."""
+    for t in range(args.tenants):
+        tenant_id = str(uuid.uuid4())
+        for u in range(args.users_per_tenant):
+            user = {
+                "username": f"load-{t}-{u}",
+                "email": f"load-{t}-{u}@loadtest.example.com",
+                "password": "load-test-password",
+                "tenant_id": tenant_id,
+            }
+            path = "/auth/register-tenant" if u == 0 else "/auth/signup"
+            created = (await client.post(path, json=user)).raise_for_status().json()
+            token = (await client.post("/auth/login", json={
+                "username": user["username"], "password": user["password"], "tenant_id": tenant_id,
+            })).raise_for_status().json()["access_token"]
+            state.users.append({
+                "id": created["id"],
+                "tenant_id": tenant_id,
+                "headers": {"Authorization": f"Bearer {token}"},
+            })
+            state.notes[created["id"]] = []
+            if u == 0 and not state.admin_headers:
+                state.admin_headers = state.users[-1]["headers"]
+
+    sem = asyncio.Semaphore(32)
+
+    async def seed(user: Dict[str, Any]) -> None:
+        async with sem:
+            body = {**note_body(state.rng), "tenant_id": user["tenant_id"], "user_id": user["id"]}
+            note = (await client.post("/notes/", json=body, headers=user["headers"])).raise_for_status().json()
+            state.notes[user["id"]].append(note["id"])
+
+    per_user = max(1, args.seed_notes // args.users_per_tenant)
+    await asyncio.gather(*(seed(user) for user in state.users for _ in range(per_user)))
+
+
+async def wait_for_indexes(client: httpx.AsyncClient, state: LoadState, timeout: float = 300.0) -> None:
+    """Wait until the index scheduler has no queued or running builds."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        scheduler = (await client.get("/health/metrics", headers=state.admin_headers)).json().get("index_scheduler", {})
+        if all(not s["queue_depth"] and not s["building"] and not s["dirty"] for s in scheduler.values()):
+            return
+        await asyncio.sleep(1.0)
+    print("Index builds still pending; continuing", file=sys.stderr)
+
+
+def build_request(route: str, state: LoadState) -> Tuple[str, str, Dict[str, Any]]:
+    user = state.user()
+    notes = state.notes[user["id"]]
+    kwargs: Dict[str, Any] = {"headers": user["headers"]}
+    if route == "search":
+        kwargs["params"] = {"q": state.query(), "top_k": 5}
+        return "GET", "/search/", kwargs
+    if route == "search_stream":
+        kwargs["params"] = {"q": state.query(), "top_k": 5}
+        return "GET", "/search/stream", kwargs
+    if route == "list_notes":
+        return "GET", "/notes/", kwargs
+    if route == "list_tasks":
+        return "GET", "/tasks/", kwargs
+    if route == "create_note":
+        kwargs["json"] = {**note_body(state.rng), "tenant_id": user["tenant_id"], "user_id": user["id"]}
+        return "POST", "/notes/", kwargs
+    note_id = state.rng.choice(notes) if notes else str(uuid.uuid4())
+    if route == "update_note":
+        kwargs["json"] = note_body(state.rng)
+        return "PUT", f"/notes/{note_id}", kwargs
+    return "GET", f"/notes/{note_id}", kwargs
+
+
+async def drive(client: httpx.AsyncClient, state: LoadState, mix: Dict[str, float], rps: float, duration: float,
+                record: bool, results: Dict[str, List[Tuple[float, Optional[int]]]]) -> float:
+    """Send requests on an open-loop Poisson schedule for `duration` seconds."""
+    routes, weights = list(mix), list(mix.values())
+    loop = asyncio.get_running_loop()
+    tasks = []
+
+    async def one(route: str, scheduled: float) -> None:
+        method, path, kwargs = build_request(route, state)
+        status: Optional[int] = None
+        try:
+            response = await client.request(method, path, **kwargs)
+            status = response.status_code
+            if route == "create_note" and status == 201:
+                state.notes[response.json()["user_id"]].append(response.json()["id"])
+        except httpx.HTTPError:
+            pass
+        if record:
+            results.setdefault(route, []).append(((loop.time() - scheduled) * 1000, status))
+
+    started = loop.time()
+    scheduled = started
+    while scheduled - started < duration:
+        scheduled += state.rng.expovariate(rps)
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(state.rng.choices(routes, weights=weights)[0], scheduled)))
+    await asyncio.gather(*tasks)
+    return loop.time() - started
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+
+def route_report(samples: List[Tuple[float, Optional[int]]], elapsed: float) -> Dict[str, Any]:
+    latencies = np.array([s[0] for s in samples])
+    statuses: Dict[str, int] = {}
+    for _, status in samples:
+        key = str(status) if status is not None else "connection_error"
+        statuses[key] = statuses.get(key, 0) + 1
+    errors = sum(n for key, n in statuses.items() if not key.startswith("2"))
+    counts, _ = np.histogram(latencies, bins=[0, *HISTOGRAM_BUCKETS_MS, np.inf])
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "requests": len(samples),
+        "rps": round(len(samples) / elapsed, 2),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4),
+        "statuses": statuses,
+        "mean_ms": round(float(latencies.mean()), 2),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "max_ms": round(float(latencies.max()), 2),
+        "histogram_ms": {
+            f"<={b}" if b != np.inf else f">{HISTOGRAM_BUCKETS_MS[-1]}": int(c)
+            for b, c in zip([*HISTOGRAM_BUCKETS_MS, np.inf], counts)
+        },
+    }
+
+
+def counter_delta(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    """Difference of the counters in two `/health/metrics` snapshots."""
+    def hits(section: Dict[str, Any], prev: Dict[str, Any]) -> Dict[str, Any]:
+        h = section.get("hits", 0) - prev.get("hits", 0)
+        m = section.get("misses", 0) - prev.get("misses", 0)
+        return {"hits": h, "misses": m, "hit_rate": round(h / (h + m), 4) if h + m else None}
+
+    response = {
+        prefix: hits(counters, before.get("response_cache", {}).get(prefix, {}))
+        for prefix, counters in after.get("response_cache", {}).items()
+    }
+    return {
+        "response_cache": response,
+        "embedding_cache": hits(after.get("embedding_cache", {}), before.get("embedding_cache", {})),
+        "index_cache": after.get("index_cache"),
+    }
+
+
+async def run(args, base_url: str, fake_openai: FakeOpenAI) -> Dict[str, Any]:
+    mix = {route: float(weight) for route, weight in (item.split(":") for item in args.mix.split(","))}
+    state = LoadState(random.Random(args.seed), args.distinct_queries)
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        print(f"Creating {args.tenants} tenants and {args.seed_notes} notes each...", file=sys.stderr)
+        await setup_tenants(client, state, args)
+        await wait_for_indexes(client, state)
+
+        results: Dict[str, List[Tuple[float, Optional[int]]]] = {}
+        if args.warmup > 0:
+            await drive(client, state, mix, args.rps, args.warmup, False, results)
+        metrics_before = (await client.get("/health/metrics", headers=state.admin_headers)).json()
+        openai_before = dict(fake_openai.calls)
+        print(f"Driving {args.rps} RPS for {args.duration}s...", file=sys.stderr)
+        elapsed = await drive(client, state, mix, args.rps, args.duration, True, results)
+        metrics_after = (await client.get("/health/metrics", headers=state.admin_headers)).json()
+
+    all_samples = [s for samples in results.values() for s in samples]
+    return {
+        "elapsed_seconds": round(elapsed, 2),
+        "achieved_rps": round(len(all_samples) / elapsed, 2),
+        "overall": route_report(all_samples, elapsed),
+        "routes": {route: route_report(samples, elapsed) for route, samples in sorted(results.items())},
+        "caches": counter_delta(metrics_before, metrics_after),
+        "openai_calls": {k: v - openai_before[k] for k, v in fake_openai.calls.items()},
+    }
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix="benchmark-api-load-")
+    fake_openai = FakeOpenAI(args.embedding_dim, args.embedding_latency_ms, args.chat_latency_ms)
+    fake_openai.start()
+    redis_server = None
+    if args.redis == "fake":
+        redis_server, redis_url = start_fake_redis()
+    else:
+        redis_url = "" if args.redis == "none" else args.redis
+    env = {
+        "DATABASE_URL": args.database_url or f"sqlite:///{os.path.join(workdir, 'load.db')}",
+        "REDIS_URL": redis_url,
+        "JWT_SECRET_KEY": os.environ.get("JWT_SECRET_KEY") or uuid.uuid4().hex * 2,
+        "OPENAI_API_KEY": "load-test",
+        "OPENAI_BASE_URL": fake_openai.base_url,
+        "LOG_LEVEL": "warning",
+    }
+    app, base_url = start_app(workdir, env, args.workers)
+    try:
+        results = asyncio.run(run(args, base_url, fake_openai))
+    finally:
+        app.terminate()
+        app.wait(timeout=30)
+        fake_openai.stop()
+        if redis_server is not None:
+            redis_server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "config": {**vars(args), "database": env["DATABASE_URL"].split(":", 1)[0], "redis": args.redis},
+        **results,
+    }
+    report["config"].pop("database_url", None)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'route':<12} {'requests':>8} {'err %':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for route, r in [*results["routes"].items(), ("overall", results["overall"])]:
+        print(
+            f"{route:<12} {r['requests']:>8} {r['error_rate'] * 100:>6.1f} "
+            f"{r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8}"
+        )
+    print(f"Achieved {results['achieved_rps']} RPS (target {args.rps})")
+    for prefix, c in results["caches"]["response_cache"].items():
+        print(f"Response cache '{prefix}': hit rate {c['hit_rate']}")
+    print(f"Embedding cache hit rate: {results['caches']['embedding_cache']['hit_rate']}")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,50 +1,303 @@
 """
-Benchmark script to measure vector retrieval latency.
+Retrieval benchmark suite over synthetic tenants.
 
-This script loads FAISS indexes for each tenant and runs a number of random
-queries.  It reports the average time taken to perform similarity search over
-the HNSW index.  Use this to tune parameters like `efSearch` and `M`.
+Needs neither OpenAI nor a database: each synthetic tenant gets clustered
+random vectors with generated metadata (users with a configurable skew, tags,
+creation dates spread over a time window), is built and published through the
+same code paths as real indexes, and is then searched through the real
+`semantic_search` path.  Query embeddings are pre-seeded into a private
+embedding cache, so no embedding calls are made.
+
+Measured per tenant:
+
+* build: index build and publish time, index family, in-memory and on-disk
+  size, and anonymous-memory growth during the build
+* latency: p50/p95/p99 and QPS for each thread-pool size
+* recall: recall@k against brute force, for each quality hint
+* selectivity: latency, recall and search strategy for date-range filters of
+  decreasing selectivity
+
+Results are written as JSON so runs can be compared.
+
+Usage:
+
+```
+python scripts/benchmark_retrieval.py [--tenants=1] [--vectors=100000] [--dim=384] \
+    [--users=20] [--user-skew=1.1] [--tags=10] [--tag-probability=0.2] [--days=365] \
+    [--index-type=auto] [--threads=1,4,8] [--queries=1000] [--top-k=10] \
+    [--output=benchmark.json]
+```
 """
 import argparse
 import json
 import os
+import platform
+import shutil
+import sys
+import tempfile
 import time
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+# The settings module requires these even though nothing connects to them
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("REDIS_URL", "")
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark-only-secret-key-not-for-production")
 
 import faiss
 import numpy as np
 
+from backend.app.core.config import settings
+from backend.app.rag import faiss_index
+from backend.app.rag.chunk_store import ChunkStore
+from backend.app.rag.embedding_cache import get_embedding_cache
+from backend.app.rag.index_cache import index_nbytes
+from backend.app.rag.index_types import build_index, index_type, needs_vector_store
+
+
+SELECTIVITIES = (1.0, 0.5, 0.1, 0.01, 0.001)
+QUALITIES = ("fast", "balanced", "accurate")
+WINDOW_END = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark retrieval over synthetic tenants")
+    parser.add_argument("--tenants", type=int, default=1, help="Number of synthetic tenants")
+    parser.add_argument("--vectors", type=int, default=100_000, help="Vectors per tenant")
+    parser.add_argument("--dim", type=int, default=384, help="Vector dimension")
+    parser.add_argument("--clusters", type=int, default=256, help="Gaussian clusters the vectors are drawn from")
+    parser.add_argument("--users", type=int, default=20, help="Users per tenant")
+    parser.add_argument("--user-skew", type=float, default=1.1, help="Zipf exponent of chunks per user (0 = uniform)")
+    parser.add_argument("--tags", type=int, default=10, help="Distinct tags per tenant")
+    parser.add_argument("--tag-probability", type=float, default=0.2, help="Chance a chunk carries each tag")
+    parser.add_argument("--days", type=int, default=365, help="Window of chunk creation dates")
+    parser.add_argument(
+        "--index-type", default=settings.index_type, help="Index family (auto, flat, hnsw, ivf_sq8, ivf_pq)"
+    )
+    parser.add_argument("--threads", default="1,4,8", help="Comma-separated thread-pool sizes")
+    parser.add_argument("--queries", type=int, default=1000, help="Queries per measurement")
+    parser.add_argument("--top-k", type=int, default=10, help="Results per query")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--output", default="benchmark_retrieval.json", help="Where to write the JSON results")
+    return parser.parse_args()
+
+
+def anon_memory_mb() -> Optional[float]:
+    """Anonymous resident memory of this process, if /proc is available."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("RssAnon:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def dir_size_mb(path: str) -> float:
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total / 1024 / 1024
+
+
+def percentiles(latencies_ms: List[float]) -> Dict[str, float]:
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {"p50_ms": round(p50, 3), "p95_ms": round(p95, 3), "p99_ms": round(p99, 3)}
+
+
+def synthetic_tenant(args, rng: np.random.Generator) -> Dict[str, Any]:
+    """Generate vectors and chunk metadata for one tenant."""
+    centers = rng.normal(size=(args.clusters, args.dim)).astype(np.float32)
+    assignment = rng.integers(0, args.clusters, args.vectors)
+    vectors = centers[assignment] + 0.3 * rng.normal(size=(args.vectors, args.dim)).astype(np.float32)
+
+    weights = 1.0 / np.arange(1, args.users + 1) ** args.user_skew
+    users = rng.choice(args.users, size=args.vectors, p=weights / weights.sum())
+    tag_matrix = rng.random((args.vectors, args.tags)) < args.tag_probability
+    ages = rng.random(args.vectors) * args.days
+    metas = [
+        {
+            "note_id": f"note-{i // 4}",
+            "user_id": f"user-{users[i]}",
+            "text": f"synthetic chunk {i}",
+            "created_at": (WINDOW_END - timedelta(days=float(ages[i]))).isoformat(),
+            "tags": [f"tag-{t}" for t in np.flatnonzero(tag_matrix[i])],
+        }
+        for i in range(args.vectors)
+    ]
+    return {"vectors": vectors, "metas": metas, "ages": ages}
+
+
+def build_and_publish(tenant_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    ids = np.arange(len(data["vectors"]), dtype=np.int64)
+    memory_before = anon_memory_mb()
+    started = time.perf_counter()
+    index = build_index(data["vectors"], ids)
+    build_seconds = time.perf_counter() - started
+    keep_vectors = data["vectors"] if needs_vector_store(index_type(index)) else None
+    store = ChunkStore.build(tenant_id, ids, data["metas"], vectors=keep_vectors)
+    memory_after = anon_memory_mb()
+
+    started = time.perf_counter()
+    generation = faiss_index.write_index_files(tenant_id, index, store)
+    publish_seconds = time.perf_counter() - started
+    return {
+        "index_type": index_type(index),
+        "vectors": int(index.ntotal),
+        "build_seconds": round(build_seconds, 3),
+        "publish_seconds": round(publish_seconds, 3),
+        "index_mb": round(index_nbytes(index) / 1024 / 1024, 2),
+        "chunk_store_mb": round(store.nbytes / 1024 / 1024, 2),
+        "disk_mb": round(dir_size_mb(faiss_index.generation_dir(tenant_id, generation)), 2),
+        "build_memory_growth_mb": (
+            round(memory_after - memory_before, 1) if memory_before is not None and memory_after is not None else None
+        ),
+    }
+
+
+def seed_queries(tenant_id: str, data: Dict[str, Any], count: int, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+    """Make query texts whose embeddings are perturbed stored vectors."""
+    rows = rng.integers(0, len(data["vectors"]), count)
+    vectors = data["vectors"][rows] + 0.1 * rng.normal(size=(count, data["vectors"].shape[1])).astype(np.float32)
+    texts = [f"{tenant_id} benchmark query {i}" for i in range(count)]
+    get_embedding_cache().put_many(settings.embedding_model, texts, vectors.tolist())
+    return {"texts": texts, "vectors": vectors}
+
+
+def run_queries(
+    tenant_id: str, texts: List[str], top_k: int, threads: int, filters=None, quality=None
+) -> Dict[str, Any]:
+    def one(text: str):
+        started = time.perf_counter()
+        results = faiss_index.semantic_search(tenant_id, text, top_k=top_k, filters=filters, quality=quality)
+        return (time.perf_counter() - started) * 1000, [r["chunk_id"] for r in results]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        outcomes = list(pool.map(one, texts))
+    wall = time.perf_counter() - started
+    return {
+        "latencies": [o[0] for o in outcomes],
+        "ids": [o[1] for o in outcomes],
+        "qps": round(len(texts) / wall, 1),
+    }
+
+
+def recall(found: List[List[int]], truth: np.ndarray) -> float:
+    scores = []
+    for ids, expected in zip(found, truth):
+        expected = [int(e) for e in expected if e >= 0]
+        if expected:
+            scores.append(len(set(ids) & set(expected)) / len(expected))
+    return round(float(np.mean(scores)), 4) if scores else 1.0
+
+
+def exact_neighbours(vectors: np.ndarray, queries: np.ndarray, rows: np.ndarray, k: int) -> np.ndarray:
+    """Brute-force top-k chunk IDs restricted to `rows` (-1 padded)."""
+    if not len(rows):
+        return np.full((len(queries), k), -1, dtype=np.int64)
+    _, found = faiss.knn(queries, vectors[rows], min(k, len(rows)))
+    return rows[found]
+
+
+def strategy_counts(before: Dict[str, Dict[str, float]], after: Dict[str, Dict[str, float]]) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for bucket, stats in after.items():
+        for key, value in stats.items():
+            if key in ("count", "total_ms", "max_ms", "mean_ms"):
+                continue
+            delta = value - before.get(bucket, {}).get(key, 0)
+            if delta:
+                counts[key] = counts.get(key, 0) + int(delta)
+    return counts
+
+
+def benchmark_tenant(tenant_id: str, args, rng: np.random.Generator) -> Dict[str, Any]:
+    data = synthetic_tenant(args, rng)
+    result: Dict[str, Any] = {"tenant_id": tenant_id, "build": build_and_publish(tenant_id, data)}
+    queries = seed_queries(tenant_id, data, args.queries, rng)
+    all_rows = np.arange(len(data["vectors"]), dtype=np.int64)
+    truth = exact_neighbours(data["vectors"], queries["vectors"], all_rows, args.top_k)
+
+    # Warm the cache so the first measurement does not include loading
+    faiss_index.semantic_search(tenant_id, queries["texts"][0], top_k=args.top_k)
 
-def load_index_and_metadata(tenant_id: str):
-    index = faiss.read_index(f"vector_indexes/index_{tenant_id}.faiss")
-    with open(f"vector_indexes/metadata_{tenant_id}.pkl", "rb") as f:
-        metadata = json.load(f)
-    return index, metadata
+    result["latency"] = []
+    for threads in [int(t) for t in args.threads.split(",")]:
+        run = run_queries(tenant_id, queries["texts"], args.top_k, threads)
+        result["latency"].append({"threads": threads, "qps": run["qps"], **percentiles(run["latencies"])})
 
+    result["recall"] = {}
+    for quality in QUALITIES:
+        run = run_queries(tenant_id, queries["texts"], args.top_k, 1, quality=quality)
+        result["recall"][quality] = {
+            f"recall@{args.top_k}": recall(run["ids"], truth),
+            **percentiles(run["latencies"]),
+        }
 
-def benchmark(tenant_id: str, num_queries: int = 100, top_k: int = 5):
-    index, metadata = load_index_and_metadata(tenant_id)
-    # Generate random query vectors by sampling existing vectors from the index
-    all_vectors = index.reconstruct_n(0, index.ntotal)
-    total_time = 0.0
-    for _ in range(num_queries):
-        q = all_vectors[np.random.randint(0, index.ntotal)]
-        start = time.time()
-        index.search(np.array([q]), top_k)
-        total_time += time.time() - start
-    avg_time_ms = (total_time / num_queries) * 1000
-    print(f"Tenant {tenant_id}: Avg search time for top{top_k} over {num_queries} queries: {avg_time_ms:.2f} ms")
+    result["selectivity"] = []
+    for target in SELECTIVITIES:
+        # Creation dates are uniform over the window, so a date range covering
+        # a fraction of it selects roughly that fraction of chunks
+        start = WINDOW_END - timedelta(days=args.days * target)
+        filters = {"start_date": start.isoformat()}
+        rows = np.flatnonzero(data["ages"] <= args.days * target)
+        stats_before = faiss_index.search_stats()
+        run = run_queries(tenant_id, queries["texts"], args.top_k, 1, filters=filters)
+        truth = exact_neighbours(data["vectors"], queries["vectors"], rows, args.top_k)
+        result["selectivity"].append({
+            "target": target,
+            "selectivity": round(len(rows) / len(all_rows), 5),
+            "candidates": int(len(rows)),
+            f"recall@{args.top_k}": recall(run["ids"], truth),
+            "strategies": strategy_counts(stats_before, faiss_index.search_stats()),
+            "qps": run["qps"],
+            **percentiles(run["latencies"]),
+        })
+    return result
 
 
 def main():
-    parser = argparse.ArgumentParser(description="Benchmark FAISS retrieval")
-    parser.add_argument("--tenant-id", required=True, help="Tenant ID to benchmark")
-    parser.add_argument("--queries", type=int, default=100, help="Number of queries to run")
-    parser.add_argument("--top-k", type=int, default=5, help="Number of nearest neighbours to retrieve")
-    args = parser.parse_args()
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix="benchmark-retrieval-")
+    faiss_index.INDEX_DIR = os.path.join(workdir, "vector_indexes")
+    settings.embedding_cache_path = os.path.join(workdir, "embedding_cache.sqlite3")
+    settings.index_type = args.index_type
+    rng = np.random.default_rng(args.seed)
+    try:
+        tenants = []
+        for t in range(args.tenants):
+            tenant_id = f"benchmark-{t}"
+            print(f"Benchmarking tenant {tenant_id} ({args.vectors} x {args.dim})...", file=sys.stderr)
+            tenants.append(benchmark_tenant(tenant_id, args, rng))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
 
-    benchmark(args.tenant_id, args.queries, args.top_k)
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "config": vars(args),
+        "environment": {
+            "python": platform.python_version(),
+            "faiss": faiss.__version__,
+            "numpy": np.__version__,
+            "cpus": os.cpu_count(),
+            "machine": platform.machine(),
+        },
+        "tenants": tenants,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    for tenant in tenants:
+        build = tenant["build"]
+        print(
+            f"{tenant['tenant_id']}: {build['index_type']} built in {build['build_seconds']}s, "
+            f"recall@{args.top_k} {tenant['recall']['balanced'][f'recall@{args.top_k}']}, "
+            + ", ".join(f"{l['threads']} threads {l['qps']} QPS p99 {l['p99_ms']} ms" for l in tenant["latency"])
+        )
+    print(f"Results written to {args.output}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,160 @@
+"""
+Measure per-node memory use as API workers are added.
+
+The script publishes a synthetic tenant index (or reuses an existing one),
+then starts 1..N worker processes that each load it through `load_index` and
+run searches, the way uvicorn workers serving the same tenant would.  For each
+worker count it reports the workers' combined RSS and PSS growth over an idle
+worker.  PSS (proportional set size) splits shared pages between the
+processes mapping them, so with memory-mapped serving the total stays roughly
+flat as workers are added; with private copies it grows linearly.
+
+Reads `/proc/<pid>/smaps_rollup`, so it only runs on Linux.
+
+Usage:
+
+```
+python scripts/benchmark_worker_memory.py [--vectors=200000] [--dim=256] \
+    [--index-type=hnsw] [--workers=1,2,4,8] [--compare-private] [--json]
+```
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import shutil
+import tempfile
+from typing import Dict, List
+
+import numpy as np
+
+from backend.app.core.config import settings
+from backend.app.rag import faiss_index
+
+
+TENANT_ID = "benchmark"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark per-node memory as workers are added")
+    parser.add_argument("--vectors", type=int, default=200_000, help="Vectors in the synthetic tenant index")
+    parser.add_argument("--dim", type=int, default=256, help="Vector dimension")
+    parser.add_argument("--index-type", default="hnsw", help="Index family to build (flat, hnsw, ivf_sq8, ivf_pq)")
+    parser.add_argument("--workers", default="1,2,4,8", help="Comma-separated worker counts to measure")
+    parser.add_argument("--queries", type=int, default=200, help="Searches each worker runs before measuring")
+    parser.add_argument("--index-dir", help="Use the index already published in this directory")
+    parser.add_argument("--compare-private", action="store_true", help="Also measure without memory mapping")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    return parser.parse_args()
+
+
+def memory_kb(pid: int) -> Dict[str, int]:
+    """Return the Rss/Pss/Private fields of /proc/<pid>/smaps_rollup in kB."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": fields["Rss"],
+        "pss": fields["Pss"],
+        "private": fields["Private_Clean"] + fields["Private_Dirty"],
+    }
+
+
+def publish_synthetic_index(index_dir: str, vectors: int, dim: int, index_type: str) -> None:
+    from backend.app.services.index_service import build_tenant_index
+
+    rng = np.random.default_rng(0)
+    matrix = rng.random((vectors, dim), dtype=np.float32)
+    words = np.array(["diary", "meeting", "project", "note", "idea", "task", "review", "plan"])
+    metas = [
+        {
+            "note_id": f"note-{i // 4}",
+            "user_id": f"user-{i % 16}",
+            "text": " ".join(rng.choice(words, 60)),
+            "tags": ["work"] if i % 3 == 0 else [],
+        }
+        for i in range(vectors)
+    ]
+    settings.index_type = index_type
+    faiss_index.INDEX_DIR = index_dir
+    index, store = build_tenant_index(TENANT_ID, matrix, metas)
+    faiss_index.write_index_files(TENANT_ID, index, store)
+
+
+def worker(index_dir: str, use_mmap: bool, queries: int, conn) -> None:
+    faiss_index.INDEX_DIR = index_dir
+    settings.index_mmap = use_mmap
+    conn.send("idle")
+    conn.recv()
+    index, _ = faiss_index.load_index(TENANT_ID)
+    rng = np.random.default_rng(os.getpid())
+    for _ in range(queries):
+        faiss_index.search_vectors(TENANT_ID, rng.random(index.d, dtype=np.float32), top_k=5)
+    conn.send("loaded")
+    conn.recv()
+
+
+def measure(index_dir: str, workers: int, use_mmap: bool, queries: int) -> Dict[str, float]:
+    ctx = mp.get_context("spawn")
+    procs, conns = [], []
+    for _ in range(workers):
+        parent, child = ctx.Pipe()
+        proc = ctx.Process(target=worker, args=(index_dir, use_mmap, queries, child))
+        proc.start()
+        procs.append(proc)
+        conns.append(parent)
+    try:
+        for conn in conns:
+            conn.recv()
+        idle = [memory_kb(p.pid) for p in procs]
+        for conn in conns:
+            conn.send("go")
+        for conn in conns:
+            conn.recv()
+        loaded = [memory_kb(p.pid) for p in procs]
+    finally:
+        for conn in conns:
+            conn.send("stop")
+        for proc in procs:
+            proc.join()
+
+    def growth(field: str) -> float:
+        return sum(after[field] - before[field] for before, after in zip(idle, loaded)) / 1024
+
+    return {
+        "workers": workers,
+        "mmap": use_mmap,
+        "rss_mb": round(growth("rss"), 1),
+        "pss_mb": round(growth("pss"), 1),
+        "private_mb": round(growth("private"), 1),
+    }
+
+
+def main():
+    args = parse_args()
+    worker_counts = [int(w) for w in args.workers.split(",")]
+    index_dir = args.index_dir or tempfile.mkdtemp(prefix="worker-memory-")
+    try:
+        if not args.index_dir:
+            publish_synthetic_index(index_dir, args.vectors, args.dim, args.index_type)
+        modes = [True, False] if args.compare_private else [True]
+        results: List[Dict[str, float]] = [
+            measure(index_dir, workers, use_mmap, args.queries) for use_mmap in modes for workers in worker_counts
+        ]
+    finally:
+        if not args.index_dir:
+            shutil.rmtree(index_dir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'workers':>8} {'mmap':>6} {'RSS MB':>10} {'PSS MB':>10} {'private MB':>11}")
+    for r in results:
+        print(f"{r['workers']:>8} {str(r['mmap']):>6} {r['rss_mb']:>10} {r['pss_mb']:>10} {r['private_mb']:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,15 @@
 """
 Script to build FAISS HNSW indexes for each tenant.
 
-This script reads notes from the database, generates embeddings using the OpenAI
-API (or any embedding function) and builds a FAISS index per tenant using the
-HNSW algorithm.  Each index is saved on disk under the `vector_indexes/`
+This script reads each tenant's note chunks and their stored embeddings from
+the `note_chunks` table and builds a FAISS index per tenant, of the family
+suited to its size.  Each index is saved on disk under the `vector_indexes/`
 directory.  When the backend starts, it will load these indexes on demand.
 
+Only chunks without a stored embedding are embedded (through the shared
+on-disk embedding cache), and notes written before chunks were stored are
+split first, so re-running the script over unchanged notes makes no API calls.
+
 Usage:
 
 ```
@@ -14,21 +18,18 @@ python scripts/create_faiss_index.py --db-url=<db-url> --openai-api-key=<key>
 """
 import argparse
 import os
-import pickle
-from typing import Dict, List
 
-import openai
 import sqlalchemy as sa
 from sqlalchemy.orm import Session
 
-import faiss
-import numpy as np
-
 from backend.app.models import note as note_model
+from backend.app.models import task as task_model
 from backend.app.models import user as user_model
 from backend.app.models import tenant as tenant_model
-from backend.app.core.config import Settings
-from backend.app.rag.utils import split_text
+from backend.app.core.config import settings
+from backend.app.rag.embedding_cache import get_embedding_cache
+from backend.app.rag.faiss_index import tenant_write_lock, write_index_files
+from backend.app.services.index_service import build_tenant_index, load_note_chunks
 
 
 def parse_args():
@@ -38,57 +39,36 @@ def parse_args():
     return parser.parse_args()
 
 
-def get_embedding(text: str) -> List[float]:
-    response = openai.Embedding.create(input=text, model="text-embedding-ada-002")
-    return response["data"][0]["embedding"]  # type: ignore
-
-
-def build_index_for_tenant(session: Session, tenant_id: str, notes: List[note_model.Note]) -> None:
-    vectors = []
-    metadata = []
-    for note in notes:
-        chunks = split_text(note.content or "")
-        for chunk in chunks:
-            emb = get_embedding(chunk)
-            vectors.append(emb)
-            metadata.append({
-                "note_id": str(note.id),
-                "user_id": str(note.user_id),
-                "tenant_id": tenant_id,
-                "text": chunk,
-            })
-
-    if not vectors:
-        return
-
-    dim = len(vectors[0])
-    vectors_np = np.array(vectors, dtype=np.float32)
-    # Build HNSW index
-    index = faiss.IndexHNSWFlat(dim, 32)  # M=32 by default
-    index.hnsw.efConstruction = 200
-    index.add(vectors_np)
+def build_index_for_tenant(session: Session, tenant_id: str) -> int:
+    # Held from reading the chunks to publishing, so a running API worker's
+    # incremental update is neither lost nor overwritten by an older build
+    with tenant_write_lock(tenant_id):
+        vectors, metadata = load_note_chunks(session, tenant_id)
+        if not vectors:
+            return 0
 
-    # Save index and metadata
-    os.makedirs("vector_indexes", exist_ok=True)
-    faiss.write_index(index, f"vector_indexes/index_{tenant_id}.faiss")
-    with open(f"vector_indexes/metadata_{tenant_id}.pkl", "wb") as f:
-        pickle.dump(metadata, f)
+        # Build an index of the family suited to the tenant's size and publish it
+        index, store = build_tenant_index(tenant_id, vectors, metadata)
+        write_index_files(tenant_id, index, store)
+        return len(vectors)
 
 
 def main():
     args = parse_args()
-    openai.api_key = args.openai_api_key
+    if args.openai_api_key:
+        settings.openai_api_key = args.openai_api_key
 
     engine = sa.create_engine(args.db_url)
     session = Session(engine)
 
     tenants = session.query(tenant_model.Tenant).all()
     for tenant in tenants:
-        notes = session.query(note_model.Note).filter(note_model.Note.tenant_id == tenant.id).all()
-        build_index_for_tenant(session, str(tenant.id), notes)
-        print(f"Built FAISS index for tenant {tenant.name} ({tenant.id}) with {len(notes)} notes")
+        chunks = build_index_for_tenant(session, str(tenant.id))
+        print(f"Built FAISS index for tenant {tenant.name} ({tenant.id}) with {chunks} chunks")
 
     session.close()
+    stats = get_embedding_cache().stats()
+    print(f"Embedding cache: {stats['hits']} hits, {stats['misses']} misses (hit rate {stats['hit_rate']:.1%})")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,53 @@
+"""
+Script to extract and store tasks for notes that have none stored yet.
+
+Tasks are extracted when notes are written, so this is only needed once
+after upgrading (existing notes have no stored tasks) or to catch up after
+the task worker was unavailable.  Notes whose stored tasks are already for
+their current version are skipped, so the script is safe to re-run; notes
+whose extraction fails are reported and picked up by the next run.
+
+Usage:
+
+```
+python scripts/extract_note_tasks.py --db-url=<db-url> --openai-api-key=<key>
+```
+"""
+import argparse
+import os
+
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from backend.app.models import note as note_model
+from backend.app.models import user as user_model
+from backend.app.models import tenant as tenant_model
+from backend.app.core.config import settings
+from backend.app.services.task_service import extract_stale_notes
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Extract tasks from notes")
+    parser.add_argument("--db-url", required=False, default=os.getenv("DATABASE_URL"), help="Database URL")
+    parser.add_argument("--openai-api-key", required=False, default=os.getenv("OPENAI_API_KEY"), help="OpenAI API key")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.openai_api_key:
+        settings.openai_api_key = args.openai_api_key
+
+    engine = sa.create_engine(args.db_url)
+    session = Session(engine)
+
+    tenants = session.query(tenant_model.Tenant).all()
+    for tenant in tenants:
+        extracted, failed = extract_stale_notes(session, str(tenant.id))
+        print(f"Extracted tasks for tenant {tenant.name} ({tenant.id}) from {extracted} notes, {len(failed)} failed")
+
+    session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Convert unversioned per-tenant index files into published generations.
+
+Older indexes were stored as `vector_indexes/index_<tenant>.faiss` next to
+either a pickled `metadata_<tenant>.pkl` or an unversioned `chunks_<tenant>/`
+store.  The backend can still read those files, but pickles have to be
+unpickled and re-encoded in every worker on every load, and neither layout can
+be replaced atomically.  This script publishes each tenant's index as the first
+generation of `vector_indexes/tenant_<tenant>/` with a memory-mappable chunk
+store, then removes the old files.
+
+Usage:
+
+```
+python scripts/migrate_chunk_metadata.py [--tenant-id=<uuid>] [--keep-legacy]
+```
+"""
+import argparse
+import glob
+import os
+import re
+
+from backend.app.rag import faiss_index
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Migrate unversioned index files to published generations")
+    parser.add_argument("--tenant-id", help="Only migrate this tenant")
+    parser.add_argument("--keep-legacy", action="store_true", help="Do not delete the old files after migrating")
+    return parser.parse_args()
+
+
+def migrate_tenant(tenant_id: str, keep_legacy: bool = False) -> int:
+    """Migrate one tenant and return the number of chunks written."""
+    with faiss_index.tenant_write_lock(tenant_id):
+        if faiss_index.read_manifest(tenant_id) is not None:
+            return 0
+        loaded = faiss_index.read_index_files(tenant_id)
+        if loaded is None:
+            return 0
+        index, store = loaded
+        faiss_index.write_index_files(tenant_id, index, store, remove_legacy=not keep_legacy)
+        return len(store)
+
+
+def main():
+    args = parse_args()
+    if args.tenant_id:
+        tenant_ids = [args.tenant_id]
+    else:
+        pattern = os.path.join(faiss_index.INDEX_DIR, "index_*.faiss")
+        names = (os.path.basename(p) for p in sorted(glob.glob(pattern)))
+        tenant_ids = [re.fullmatch(r"index_(.+)\.faiss", name).group(1) for name in names]
+
+    for tenant_id in tenant_ids:
+        chunks = migrate_tenant(tenant_id, keep_legacy=args.keep_legacy)
+        print(f"Migrated tenant {tenant_id}: {chunks} chunks")
+
+
+if __name__ == "__main__":
+    main()
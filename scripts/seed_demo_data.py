@@ -18,6 +18,7 @@ from backend.app.models import base as base_model
 from backend.app.models.tenant import Tenant
 from backend.app.models.user import User
 from backend.app.models.note import Note
+from backend.app.services.index_service import refresh_note_chunks
 
 
 TENANT_NAMES = ["Acme Corp", "Globex", "Umbrella", "Initech"]
@@ -73,6 +74,7 @@ def seed():
                 created_at=datetime.utcnow() - timedelta(days=random.randint(0, 30)),
                 updated_at=datetime.utcnow(),
             )
+            refresh_note_chunks(note)
             session.add(note)
         session.commit()
 
@@ -0,0 +1,136 @@
+"""
+Tune per-tenant search parameters against a recall target.
+
+For each tenant this samples stored vectors as queries, computes their exact
+top-k neighbours, and measures recall@k of the tenant's index for increasing
+values of its search-time knob (`efSearch` for HNSW, `nprobe` for IVF).  IVF
+indexes are measured the way they are served: fetching
+`settings.index_rerank_factor` times k candidates and re-ranking them
+exactly against the stored vectors.  The smallest value meeting the recall target is written to the tenant's manifest,
+and every API worker applies it the next time it loads (or refreshes) the
+index.  Flat indexes are exact and are skipped.
+
+HNSW's `M` is fixed when the graph is built and is not tuned here.
+
+Usage:
+
+```
+python scripts/tune_search_params.py [--tenant-id=<uuid>] [--recall-target=0.95] [--k=10] \
+    [--queries=200] [--dry-run]
+```
+"""
+import argparse
+import glob
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import faiss
+import numpy as np
+
+from backend.app.core.config import settings
+from backend.app.rag import faiss_index
+from backend.app.rag.index_types import apply_search_params, index_type, search_parameters, tuned_parameter
+
+
+EF_SEARCH_CANDIDATES = [8, 16, 24, 32, 48, 64, 96, 128, 192, 256, 384, 512]
+NPROBE_CANDIDATES = [1, 2, 4, 8, 12, 16, 24, 32, 48, 64, 96, 128, 256]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Tune efSearch / nprobe per tenant against a recall target")
+    parser.add_argument("--tenant-id", help="Only tune this tenant")
+    parser.add_argument("--recall-target", type=float, default=settings.search_recall_target, help="Target recall@k")
+    parser.add_argument("--k", type=int, default=10, help="Neighbours per query used to measure recall")
+    parser.add_argument("--queries", type=int, default=200, help="Stored vectors sampled as queries")
+    parser.add_argument("--dry-run", action="store_true", help="Report without writing parameters")
+    return parser.parse_args()
+
+
+def served_hits(index: faiss.Index, store, queries: np.ndarray, k: int, params) -> List[List[int]]:
+    """Top-k chunk IDs per query, fetched and re-ranked the way `search_vectors` serves them."""
+    if not faiss_index.reranks(index, store):
+        return index.search(queries, k, params=params)[1].tolist()
+    _, fetched = index.search(queries, k * settings.index_rerank_factor, params=params)
+    hits = []
+    for query, ids in zip(queries, fetched):
+        ids = ids[ids >= 0]
+        hits.append(faiss_index.exact_search(index, store, query[None], ids, k)[1].tolist() if len(ids) else [])
+    return hits
+
+
+def tune_tenant(tenant_id: str, recall_target: float, k: int, num_queries: int) -> Optional[Dict[str, Any]]:
+    """Measure recall for each candidate value and return the chosen parameters."""
+    loaded = faiss_index.read_index_files(tenant_id)
+    if loaded is None:
+        return None
+    index, store = loaded
+    kind = index_type(index)
+    knob = tuned_parameter(kind)
+    if knob is None or len(store) == 0:
+        return None
+
+    ids = np.asarray(store.ids, dtype=np.int64)
+    vectors = faiss_index.live_vectors(index, store)
+    rng = np.random.default_rng(0)
+    sample = rng.choice(len(ids), size=min(num_queries, len(ids)), replace=False)
+    queries = vectors[sample]
+    k = min(k, len(ids))
+
+    # Exact neighbours over the live vectors only
+    _, truth_rows = faiss.knn(queries, vectors, k)
+    truth = ids[truth_rows]
+
+    # Tombstoned vectors are excluded the same way search_vectors excludes them
+    bitmap = faiss_index.id_bitmap(ids, store.next_id) if store.tombstones else None
+    selector = faiss.IDSelectorBitmap(bitmap) if bitmap is not None else None
+
+    candidates = EF_SEARCH_CANDIDATES if knob == "efSearch" else [n for n in NPROBE_CANDIDATES if n <= index.nlist]
+    measurements: List[Dict[str, float]] = []
+    chosen = candidates[-1]
+    for value in candidates:
+        apply_search_params(index, {knob: value})
+        params = search_parameters(index, selector)
+        started = time.perf_counter()
+        found = served_hits(index, store, queries, k, params)
+        elapsed_ms = (time.perf_counter() - started) * 1000 / len(queries)
+        recall = float(np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth.tolist())]))
+        measurements.append({knob: value, "recall": round(recall, 4), "latency_ms": round(elapsed_ms, 3)})
+        if recall >= recall_target:
+            chosen = value
+            break
+
+    return {
+        knob: chosen,
+        "index_type": kind,
+        "recall_target": recall_target,
+        "k": k,
+        "measurements": measurements,
+    }
+
+
+def main():
+    args = parse_args()
+    if args.tenant_id:
+        tenant_ids = [args.tenant_id]
+    else:
+        pattern = os.path.join(faiss_index.INDEX_DIR, "tenant_*", "manifest.json")
+        tenant_ids = [os.path.basename(os.path.dirname(p))[len("tenant_"):] for p in sorted(glob.glob(pattern))]
+
+    for tenant_id in tenant_ids:
+        params = tune_tenant(tenant_id, args.recall_target, args.k, args.queries)
+        if params is None:
+            print(f"Tenant {tenant_id}: nothing to tune")
+            continue
+        knob = "efSearch" if "efSearch" in params else "nprobe"
+        last = params["measurements"][-1]
+        print(
+            f"Tenant {tenant_id} ({params['index_type']}): {knob}={params[knob]} "
+            f"recall@{params['k']}={last['recall']} at {last['latency_ms']} ms/query"
+        )
+        if not args.dry_run:
+            faiss_index.write_search_params(tenant_id, params)
+
+
+if __name__ == "__main__":
+    main()
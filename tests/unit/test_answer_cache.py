@@ -0,0 +1,43 @@
+"""
+Tests for the LLM answer cache.
+"""
+import fakeredis
+
+from backend.app.core import cache
+from backend.app.rag import answer_cache
+
+CHUNKS = [{"chunk_id": 1, "text": "budget review"}, {"chunk_id": 2, "text": "garden plans"}]
+
+
+def test_keys_depend_on_what_the_model_sees():
+    key = answer_cache.answer_key("summary", "gpt-4-turbo", 1, CHUNKS, "Budget  review?")
+
+    assert key == answer_cache.answer_key("summary", "gpt-4-turbo", 1, CHUNKS, "budget review")
+    assert key != answer_cache.answer_key("summary", "gpt-4-turbo", 2, CHUNKS, "budget review")
+    assert key != answer_cache.answer_key("summary", "gpt-4-turbo", 1, CHUNKS[::-1], "budget review")
+    assert key != answer_cache.answer_key(
+        "summary", "gpt-4-turbo", 1, [CHUNKS[0], {"chunk_id": 2, "text": "garden plan"}], "budget review"
+    )
+    assert key.startswith("llm:")
+
+
+def test_cached_reuses_outputs_and_skips_none(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(cache, "get_redis_client", lambda: fakeredis.FakeRedis(server=server, decode_responses=True))
+    monkeypatch.setattr(answer_cache.settings, "openai_api_key", "sk-test")
+    calls = []
+
+    def compute(value):
+        calls.append(value)
+        return value
+
+    key = answer_cache.answer_key("tasks", "gpt-4-turbo", 1, CHUNKS)
+    tasks = [{"description": "Send report"}]
+    assert answer_cache.cached(key, lambda: compute(tasks)) == tasks
+    assert answer_cache.cached(key, lambda: compute([])) == tasks
+    assert len(calls) == 1
+
+    other = answer_cache.answer_key("summary", "gpt-4-turbo", 1, CHUNKS, "budget")
+    assert answer_cache.cached(other, lambda: compute(None)) is None
+    assert answer_cache.cached(other, lambda: compute("Budget review")) == "Budget review"
+    assert len(calls) == 3
@@ -0,0 +1,69 @@
+"""
+Tests for the per-tenant BM25 lexical index.
+"""
+import math
+import random
+
+import numpy as np
+
+from backend.app.rag.bm25_index import BM25Index, tokenize
+from backend.app.rag.chunk_store import ChunkStore
+
+
+def reference_scores(texts, query, k1=1.2, b=0.75):
+    docs = [tokenize(t) for t in texts]
+    avg = sum(len(d) for d in docs) / len(docs)
+    scores = []
+    for doc in docs:
+        score = 0.0
+        for term in set(tokenize(query)):
+            df = sum(term in d for d in docs)
+            tf = doc.count(term)
+            if tf:
+                idf = math.log1p((len(docs) - df + 0.5) / (df + 0.5))
+                score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(doc) / avg))
+        scores.append(score)
+    return np.array(scores)
+
+
+def test_scores_match_reference_bm25_and_respect_mask():
+    rng = random.Random(0)
+    words = "budget meeting garden dentist launch review travel invoice".split()
+    texts = [" ".join(rng.choice(words) for _ in range(rng.randint(1, 20))) for _ in range(50)]
+    index = BM25Index.build(texts)
+
+    np.testing.assert_allclose(index.scores("budget garden the"), reference_scores(texts, "budget garden"), rtol=1e-5)
+
+    mask = np.zeros(len(texts), dtype=bool)
+    mask[::2] = True
+    rows, scores = index.search("budget garden", top_k=5, mask=mask)
+    assert len(rows) == 5 and all(r % 2 == 0 for r in rows)
+    assert list(scores) == sorted(scores, reverse=True)
+    assert len(index.search("unknownword", top_k=5)[0]) == 0
+
+
+def test_take_and_concat_match_a_fresh_build():
+    texts = ["budget meeting", "garden garden plans", "dentist on friday", "budget review for launch"]
+    index = BM25Index.build(texts[:2]).concat(BM25Index.build(texts[2:])).take(np.array([3, 1, 0]))
+    fresh = BM25Index.build([texts[3], texts[1], texts[0]])
+
+    for query in ("budget", "garden launch", "dentist"):
+        np.testing.assert_allclose(index.scores(query), fresh.scores(query), rtol=1e-6)
+
+
+def test_chunk_store_keeps_lexical_index_row_aligned(tmp_path):
+    records = [
+        {"note_id": "n1", "user_id": "alice", "text": "quarterly budget meeting"},
+        {"note_id": "n2", "user_id": "bob", "text": "garden plans for the weekend"},
+        {"note_id": "n3", "user_id": "bob", "text": "budget for the garden"},
+    ]
+    store = ChunkStore.build("t1", [0, 1, 2], records)
+    store = store.drop([0], tombstone=True)
+    store = store.append([3], [{"note_id": "n4", "user_id": "alice", "text": "budget review"}])
+    store.save(str(tmp_path))
+    store = ChunkStore.load(str(tmp_path))
+
+    rows, _ = store.lexical.search("budget", top_k=10, mask=store.filter_mask({"user_id": "bob"}))
+    assert [store.record(int(r))["chunk_id"] for r in rows] == [2]
+    rows, _ = store.lexical.search("budget", top_k=10)
+    assert sorted(store.record(int(r))["chunk_id"] for r in rows) == [2, 3]
@@ -0,0 +1,78 @@
+"""
+Tests for the columnar chunk metadata store.
+"""
+import pickle
+
+import numpy as np
+
+from backend.app.rag import faiss_index
+from backend.app.rag.chunk_store import ChunkStore
+
+
+RECORDS = [
+    {"note_id": "n1", "user_id": "alice", "text": "first", "created_at": "2024-01-01T09:00:00", "tags": ["work"]},
+    {"note_id": "n1", "user_id": "alice", "text": "sécond", "created_at": "2024-01-01T09:00:00", "tags": ["work"]},
+    {"note_id": "n2", "user_id": "bob", "text": "third", "created_at": "2024-02-01T09:00:00+00:00", "tags": []},
+    {"note_id": "n3", "user_id": "bob", "text": "fourth", "created_at": None, "tags": ["home", "work"]},
+]
+
+
+def build():
+    return ChunkStore.build("t1", [0, 1, 2, 3], RECORDS)
+
+
+def test_filters_are_vectorised_over_columns():
+    store = build()
+    assert store.matching_ids({"user_id": "bob"}).tolist() == [2, 3]
+    assert store.matching_ids({"user_id": "nobody"}).tolist() == []
+    assert store.matching_ids({"tags": "home,missing"}).tolist() == [3]
+    # Chunks without a date are never excluded by a date range
+    assert store.matching_ids({"start_date": "2024-01-15"}).tolist() == [2, 3]
+    assert store.matching_ids({"user_id": "alice", "end_date": "2024-01-01T10:00:00"}).tolist() == [0, 1]
+
+
+def test_round_trip_through_memory_mapped_files(tmp_path):
+    build().save(str(tmp_path))
+    store = ChunkStore.load(str(tmp_path))
+
+    assert isinstance(store.ids, np.memmap)
+    record = store.records([1])[0]
+    assert record["text"] == "sécond"
+    assert record["note_id"] == "n1"
+    assert record["tags"] == ["work"]
+    assert record["created_at"].startswith("2024-01-01T09:00:00")
+    assert store.records([99]) == [None]
+
+
+def test_append_and_drop_rewrite_only_affected_rows():
+    store = build().drop([0, 1], tombstone=True)
+    store = store.append([4], [{"note_id": "n1", "user_id": "carol", "text": "new", "tags": ["travel"]}])
+
+    assert store.tombstones == {0, 1}
+    assert store.ids.tolist() == [2, 3, 4]
+    assert [r["text"] for r in store.records([2, 3, 4])] == ["third", "fourth", "new"]
+    assert store.matching_ids({"tags": ["travel"]}).tolist() == [4]
+    assert store.next_id == 5
+
+
+def test_drop_keeps_text_of_every_remaining_run(tmp_path):
+    build().save(str(tmp_path))
+    store = ChunkStore.load(str(tmp_path)).drop([1, 3])
+
+    assert [r["text"] for r in store.records([0, 2])] == ["first", "third"]
+    assert store.text_offsets.tolist() == [0, 5, 10]
+    assert [r["text"] for r in ChunkStore.build("t1", [3, 1, 0, 2], RECORDS).records([0, 1, 2, 3])] == [
+        "third", "sécond", "fourth", "first"
+    ]
+
+
+def test_legacy_pickle_is_migrated(tmp_path, monkeypatch):
+    monkeypatch.setattr(faiss_index, "INDEX_DIR", str(tmp_path))
+    with open(faiss_index.legacy_metadata_path("t1"), "wb") as f:
+        pickle.dump(RECORDS, f)
+
+    store = faiss_index.read_legacy_metadata("t1")
+
+    assert store.ids.tolist() == [0, 1, 2, 3]
+    assert store.next_id == 4
+    assert store.records([2])[0]["text"] == "third"
@@ -0,0 +1,52 @@
+"""
+Tests for token-budgeted context packing.
+"""
+from backend.app.rag.chunk_store import ChunkStore
+from backend.app.rag.context_packer import count_tokens, pack_context
+
+
+def chunk(chunk_id, words):
+    text = " ".join(f"word{chunk_id}x{i}" for i in range(words))
+    return {"chunk_id": chunk_id, "text": text, "tokens": count_tokens(text)}
+
+
+def test_packs_in_rank_order_and_truncates_the_last_chunk():
+    chunks = [chunk(1, 20), chunk(2, 20), chunk(3, 200), chunk(4, 5)]
+    budget = chunks[0]["tokens"] + chunks[1]["tokens"] + 2 + 60
+
+    packed, report = pack_context(chunks, budget)
+
+    assert [c["chunk_id"] for c in packed] == [1, 2, 3]
+    assert packed[:2] == chunks[:2]
+    tail = packed[2]["text"]
+    assert chunks[2]["text"].startswith(tail) and chunks[2]["text"][len(tail)] == " "
+    assert report["packed_tokens"] == sum(c["tokens"] for c in packed) + 2 <= budget
+    assert report["dropped_tokens"] == sum(c["tokens"] for c in chunks) - sum(c["tokens"] for c in packed)
+    assert report["dropped_chunks"] == 1
+    assert report["truncated_chunks"] == 1
+
+
+def test_small_remainders_are_dropped_not_truncated():
+    chunks = [chunk(1, 20), chunk(2, 200)]
+
+    packed, report = pack_context(chunks, chunks[0]["tokens"] + 10)
+
+    assert packed == chunks[:1]
+    assert report["dropped_chunks"] == 1 and report["truncated_chunks"] == 0
+    assert report["dropped_tokens"] == chunks[1]["tokens"]
+
+
+def test_chunk_store_records_token_counts(tmp_path):
+    records = [
+        {"note_id": "n1", "user_id": "alice", "text": "quarterly budget meeting"},
+        {"note_id": "n2", "user_id": "bob", "text": "garden plans for the weekend"},
+    ]
+    store = ChunkStore.build("t1", [0, 1], records).drop([0])
+    store = store.append([2], [{"note_id": "n3", "user_id": "bob", "text": "dentist"}])
+    store.save(str(tmp_path))
+    store = ChunkStore.load(str(tmp_path))
+
+    assert [r["tokens"] for r in store.records([1, 2])] == [
+        count_tokens("garden plans for the weekend"),
+        count_tokens("dentist"),
+    ]
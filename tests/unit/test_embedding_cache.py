@@ -0,0 +1,99 @@
+"""
+Tests for the on-disk embedding cache.
+"""
+import sqlite3
+from types import SimpleNamespace
+
+from backend.app.rag import embedding_cache, faiss_index
+from backend.app.rag.embedding_cache import EmbeddingCache, content_hash
+
+
+def test_hits_and_misses_are_counted(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), max_entries=100)
+    assert cache.get_many("m", ["a", "b"]) == [None, None]
+
+    cache.put_many("m", ["a", "b"], [[1.0, 2.0], [3.0, 4.0]])
+
+    assert cache.get_many("m", ["b", "a", "c"]) == [[3.0, 4.0], [1.0, 2.0], None]
+    # Embeddings are keyed by model as well as by text
+    assert cache.get_many("other", ["a"]) == [None]
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 4
+    assert stats["entries"] == 2
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), max_entries=10)
+    texts = [f"chunk {i}" for i in range(10)]
+    cache.put_many("m", texts, [[float(i)] for i in range(10)])
+    # Touch the first entry so it survives eviction
+    cache.get_many("m", ["chunk 0"])
+
+    cache.put_many("m", ["new"], [[99.0]])
+
+    stats = cache.stats()
+    assert stats["entries"] <= 10
+    assert stats["evictions"] > 0
+    assert cache.get_many("m", ["chunk 0", "new"]) == [[0.0], [99.0]]
+
+
+def last_used(cache, text):
+    (value,) = cache._conn.execute(
+        "SELECT last_used FROM embeddings WHERE hash = ?", (content_hash(text),)
+    ).fetchone()
+    return value
+
+
+def test_hits_are_recorded_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_cache, "_TOUCH_FLUSH_SIZE", 3)
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), max_entries=100)
+    texts = ["a", "b", "c"]
+    cache.put_many("m", texts, [[1.0]] * 3)
+    stored = last_used(cache, "a")
+
+    cache.get_many("m", ["a", "b"])
+    cache.get_many("m", ["a"])
+    assert last_used(cache, "a") == stored
+
+    cache.get_many("m", ["c"])
+    assert all(last_used(cache, t) > stored for t in texts)
+
+
+def test_size_is_checked_every_few_inserts(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_cache, "_EVICTION_CHECK_ROWS", 4)
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), max_entries=1000)
+    counts = []
+    evict = cache._evict
+    monkeypatch.setattr(cache, "_evict", lambda: counts.append(1) or evict())
+
+    for i in range(10):
+        cache.put_many("m", [f"chunk {i}"], [[float(i)]])
+
+    assert len(counts) == 2
+
+
+class BrokenCache:
+    """A cache whose database file cannot be read or cannot be written."""
+
+    def __init__(self, reads=True):
+        self.reads = reads
+
+    def get_many(self, model, texts):
+        if self.reads:
+            raise sqlite3.OperationalError("database is locked")
+        return [None] * len(texts)
+
+    def put_many(self, model, texts, vectors):
+        raise sqlite3.OperationalError("database or disk is full")
+
+
+def test_embeddings_are_computed_when_the_cache_fails(monkeypatch):
+    service = SimpleNamespace(model="m", embed_many=lambda texts: [[float(len(t))] for t in texts])
+    monkeypatch.setattr(faiss_index, "get_embedding_service", lambda: service)
+
+    monkeypatch.setattr(faiss_index, "get_embedding_cache", lambda: BrokenCache(reads=True))
+    assert faiss_index.compute_embeddings(["a", "bb"]) == [[1.0], [2.0]]
+
+    monkeypatch.setattr(faiss_index, "get_embedding_cache", lambda: BrokenCache(reads=False))
+    assert faiss_index.compute_embeddings(["ccc"]) == [[3.0]]
@@ -0,0 +1,133 @@
+"""
+Tests for the micro-batched embedding service.
+"""
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from backend.app.rag import embedding_service
+from backend.app.rag.embedding_service import EmbeddingService
+
+
+class StubClient:
+    """Stands in for the OpenAI client, recording the texts of each call."""
+
+    def __init__(self, error=None):
+        self.calls = []
+        self.error = error
+        self.embeddings = self
+
+    def create(self, input, model):
+        self.calls.append(list(input))
+        if self.error is not None:
+            raise self.error
+        # Returned out of order, as the API may
+        data = [SimpleNamespace(index=i, embedding=[float(len(text)), float(i)]) for i, text in enumerate(input)]
+        return SimpleNamespace(data=data[::-1])
+
+
+def embed_concurrently(service, texts):
+    """Call `service.embed` for each text from its own thread; return results or exceptions."""
+    results = [None] * len(texts)
+    barrier = threading.Barrier(len(texts))
+
+    def call(i):
+        barrier.wait()
+        try:
+            results[i] = service.embed(texts[i])
+        except Exception as exc:
+            results[i] = exc
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(texts))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    return results
+
+
+def test_concurrent_requests_share_one_call():
+    client = StubClient()
+    service = EmbeddingService("m", max_batch_size=64, max_wait_ms=200, client=client)
+
+    results = embed_concurrently(service, [f"text {i}" * (i + 1) for i in range(8)])
+
+    assert len(client.calls) == 1 and len(client.calls[0]) == 8
+    assert [r[0] for r in results] == [float(len(f"text {i}" * (i + 1))) for i in range(8)]
+    stats = service.stats()
+    assert stats["requests"] == 8 and stats["batches"] == 1 and stats["mean_batch_size"] == 8
+
+
+def test_batches_are_capped_at_max_batch_size():
+    client = StubClient()
+    service = EmbeddingService("m", max_batch_size=3, max_wait_ms=300, client=client)
+
+    embed_concurrently(service, [f"text {i}" for i in range(7)])
+
+    assert sorted(len(batch) for batch in client.calls) == [1, 3, 3]
+
+
+def test_a_lone_request_waits_at_most_max_wait():
+    client = StubClient()
+    service = EmbeddingService("m", max_batch_size=64, max_wait_ms=50, client=client)
+
+    start = time.monotonic()
+    assert service.embed("hello") == [5.0, 0.0]
+    elapsed = time.monotonic() - start
+
+    assert 0.04 <= elapsed < 1.0
+    assert client.calls == [["hello"]]
+
+
+def test_identical_texts_are_sent_once():
+    client = StubClient()
+    service = EmbeddingService("m", max_batch_size=64, max_wait_ms=200, client=client)
+
+    results = embed_concurrently(service, ["same", "same", "other", "same"])
+
+    assert client.calls == [["same", "other"]]
+    assert results[0] == results[1] == results[3] != results[2]
+
+
+def test_a_failed_call_fails_every_waiting_caller():
+    client = StubClient(error=RuntimeError("rate limited"))
+    service = EmbeddingService("m", max_batch_size=64, max_wait_ms=200, client=client)
+
+    results = embed_concurrently(service, ["a", "b", "c"])
+
+    assert len(client.calls) == 1
+    assert all(isinstance(r, RuntimeError) and str(r) == "rate limited" for r in results)
+    # The worker survives the failure
+    client.error = None
+    assert service.embed("d") == [1.0, 0.0]
+
+
+def test_worker_is_restarted_after_fork(monkeypatch):
+    service = EmbeddingService("m", max_wait_ms=1, client=StubClient())
+    service.embed("a")
+    parent_worker = service._worker
+
+    # A forked child has a new PID and none of the parent's threads
+    monkeypatch.setattr(embedding_service.os, "getpid", lambda: -1)
+    assert service.embed("b") == [1.0, 0.0]
+
+    assert service._worker is not parent_worker and service._worker_pid == -1
+
+
+def test_embed_many_sends_build_batches_in_input_order():
+    client = StubClient()
+    service = EmbeddingService("m", build_batch_size=2, client=client)
+    texts = ["a", "bb", "ccc", "dddd", "eeeee"]
+
+    vectors = service.embed_many(texts)
+
+    assert client.calls == [["a", "bb"], ["ccc", "dddd"], ["eeeee"]]
+    assert [v[0] for v in vectors] == [1.0, 2.0, 3.0, 4.0, 5.0]
+
+
+def test_missing_api_key_is_reported(monkeypatch):
+    monkeypatch.setattr(embedding_service.settings, "openai_api_key", "")
+    with pytest.raises(RuntimeError, match="OPENAI_API_KEY"):
+        EmbeddingService("m").embed_many(["a", "b"])
@@ -0,0 +1,141 @@
+"""
+Tests for filtered vector search strategies.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from backend.app.rag import faiss_index, index_types
+from backend.app.services import index_service
+
+
+DIM = 16
+COUNT = 2_000
+START = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def tenant(monkeypatch):
+    """An HNSW index of COUNT chunks; one in 50 belongs to u1, one in 10 is tagged "work"."""
+    monkeypatch.setattr(index_types.settings, "index_type", "hnsw")
+    monkeypatch.setattr(faiss_index, "_search_stats", {})
+    vectors = np.random.default_rng(0).random((COUNT, DIM), dtype=np.float32)
+    metas = [
+        {
+            "note_id": f"n{i}",
+            "user_id": "u1" if i % 50 == 0 else "u2",
+            "text": str(i),
+            "created_at": (START + timedelta(days=i % 100)).isoformat(),
+            "tags": ["work"] if i % 10 == 0 else [],
+        }
+        for i in range(COUNT)
+    ]
+    index, store = index_service.build_tenant_index("t1", vectors.tolist(), metas)
+    state = {"index": index, "store": store, "searches": []}
+    search = index.search
+
+    def recording_search(query, k, params=None):
+        state["searches"].append(params)
+        return search(query, k, params=params)
+
+    index.search = recording_search
+    monkeypatch.setattr(faiss_index, "load_index", lambda tenant_id: (state["index"], state["store"]))
+    state["vectors"] = vectors
+    return state
+
+
+def exact_top_k(vectors, query, ids, k):
+    distances = ((vectors[ids] - query) ** 2).sum(axis=1)
+    return [int(i) for i in np.asarray(ids)[np.argsort(distances, kind="stable")[:k]]]
+
+
+def strategies():
+    return {key for stats in faiss_index.search_stats().values() for key in stats} & {
+        "exact", "hnsw", "hnsw+exact", "empty"
+    }
+
+
+def test_small_candidate_sets_are_searched_exactly(tenant, monkeypatch):
+    monkeypatch.setattr(faiss_index.settings, "search_exact_max_candidates", 100)
+    candidates = np.arange(0, COUNT, 50)
+    query = tenant["vectors"][1]
+
+    results = faiss_index.search_vectors("t1", query, top_k=5, filters={"user_id": "u1"})
+
+    assert [r["chunk_id"] for r in results] == exact_top_k(tenant["vectors"], query, candidates, 5)
+    assert tenant["searches"] == []
+    assert strategies() == {"exact"}
+
+
+def test_larger_candidate_sets_push_the_filter_into_the_index(tenant, monkeypatch):
+    monkeypatch.setattr(faiss_index.settings, "search_exact_max_candidates", 0)
+    query = tenant["vectors"][100]
+
+    results = faiss_index.search_vectors("t1", query, top_k=5, filters={"user_id": "u1"})
+
+    (params,) = tenant["searches"]
+    assert [params.sel.is_member(i) for i in (0, 1, 50, 51)] == [True, False, True, False]
+    assert len(results) == 5 and all(r["user_id"] == "u1" for r in results)
+    assert results[0]["chunk_id"] == 100 and results[0]["score"] == 0.0
+    assert strategies() == {"hnsw"}
+
+
+def test_too_few_index_hits_fall_back_to_an_exact_scan(tenant, monkeypatch):
+    monkeypatch.setattr(faiss_index.settings, "search_exact_max_candidates", 0)
+    # An index search that dead-ends in the filtered graph
+    tenant["index"].search = lambda query, k, params=None: (np.full((1, k), np.inf), np.full((1, k), -1))
+    candidates = np.arange(0, COUNT, 50)
+    query = tenant["vectors"][3]
+
+    results = faiss_index.search_vectors("t1", query, top_k=5, filters={"user_id": "u1"})
+
+    assert [r["chunk_id"] for r in results] == exact_top_k(tenant["vectors"], query, candidates, 5)
+    assert strategies() == {"hnsw+exact"}
+
+
+@pytest.mark.parametrize("exact_max_candidates", [0, 10_000])
+@pytest.mark.parametrize("top_k", [1, 10, 40, 60])
+def test_top_k_results_whenever_that_many_chunks_match(tenant, monkeypatch, exact_max_candidates, top_k):
+    monkeypatch.setattr(faiss_index.settings, "search_exact_max_candidates", exact_max_candidates)
+    monkeypatch.setattr(index_types.settings, "search_ef_min", 1)
+
+    results = faiss_index.search_vectors(
+        "t1", tenant["vectors"][7], top_k=top_k, filters={"user_id": "u1"}, quality="fast"
+    )
+
+    # 40 chunks belong to u1
+    assert len(results) == min(top_k, 40)
+    assert len({r["chunk_id"] for r in results}) == len(results)
+    assert all(r["user_id"] == "u1" for r in results)
+
+
+def test_tombstoned_chunks_are_never_returned(tenant):
+    store = tenant["store"]
+    dropped = store.ids_for_notes([f"n{i}" for i in range(20)])
+    tenant["store"] = store.drop(dropped, tombstone=True)
+
+    results = faiss_index.search_vectors("t1", tenant["vectors"][0], top_k=10)
+
+    (params,) = tenant["searches"]
+    assert not params.sel.is_member(int(dropped[0])) and params.sel.is_member(COUNT - 1)
+    assert len(results) == 10
+    assert not {r["chunk_id"] for r in results} & set(dropped.tolist())
+
+
+@pytest.mark.parametrize("exact_max_candidates", [0, 10_000])
+def test_tag_and_date_filters(tenant, monkeypatch, exact_max_candidates):
+    monkeypatch.setattr(faiss_index.settings, "search_exact_max_candidates", exact_max_candidates)
+    query = tenant["vectors"][5]
+
+    tagged = faiss_index.search_vectors("t1", query, top_k=20, filters={"tags": ["work"]})
+    assert len(tagged) == 20 and all(r["tags"] == ["work"] for r in tagged)
+
+    window = {"start_date": (START + timedelta(days=10)).isoformat(), "end_date": START + timedelta(days=12)}
+    dated = faiss_index.search_vectors("t1", query, top_k=100, filters=window)
+    # Days 10-12 of the 100-day cycle
+    assert len(dated) == 60
+    assert {r["created_at"][:10] for r in dated} == {"2026-01-11", "2026-01-12", "2026-01-13"}
+
+    both = faiss_index.search_vectors("t1", query, top_k=100, filters={**window, "tags": "work"})
+    assert {r["chunk_id"] for r in both} == {r["chunk_id"] for r in dated if r["chunk_id"] % 10 == 0}
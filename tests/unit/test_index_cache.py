@@ -0,0 +1,51 @@
+"""
+Tests for the memory-budgeted index cache.
+"""
+import numpy as np
+
+from backend.app.rag.index_cache import MISSING, IndexCache, index_nbytes
+from backend.app.services.index_service import build_index
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_least_recently_used_entries_are_evicted_to_fit_budget():
+    cache = IndexCache(max_bytes=100, idle_ttl=0, negative_ttl=0)
+    cache.put("a", "A", 40)
+    cache.put("b", "B", 40)
+    cache.get("a")
+
+    cache.put("c", "C", 40)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    stats = cache.stats()
+    assert stats["resident_bytes"] == 80
+    assert stats["evictions"] == 1
+
+
+def test_idle_entries_expire_and_negatives_are_cached():
+    clock = FakeClock()
+    cache = IndexCache(max_bytes=100, idle_ttl=10, negative_ttl=5, clock=clock)
+    cache.put("a", "A", 1)
+    cache.put_missing("b")
+
+    clock.now = 4
+    assert cache.get("b") is MISSING
+    clock.now = 11
+    assert cache.get("b") is None
+    clock.now = 20
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_index_size_estimate_covers_vectors():
+    vectors = np.zeros((100, 16), dtype=np.float32)
+    index = build_index(vectors, np.arange(100, dtype=np.int64))
+    assert index_nbytes(index) >= vectors.nbytes
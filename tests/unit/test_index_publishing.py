@@ -0,0 +1,90 @@
+"""
+Tests for generation-numbered index publishing and hot swapping.
+"""
+import multiprocessing
+import os
+
+import numpy as np
+
+from backend.app.rag import faiss_index
+from backend.app.rag.chunk_store import ChunkStore
+from backend.app.rag.index_sync import IndexWatcher
+from backend.app.services import index_service
+from backend.app.services.index_service import build_index
+
+
+def publish(tenant_id, count):
+    ids = np.arange(count, dtype=np.int64)
+    vectors = np.random.default_rng(count).random((count, 4), dtype=np.float32)
+    store = ChunkStore.build(tenant_id, ids, [{"note_id": f"n{i}", "text": str(i)} for i in range(count)])
+    return faiss_index.write_index_files(tenant_id, build_index(vectors, ids), store)
+
+
+def test_cached_generation_is_served_until_refreshed(tmp_path, monkeypatch):
+    monkeypatch.setattr(faiss_index, "INDEX_DIR", str(tmp_path))
+    faiss_index.invalidate_index("t1")
+
+    assert publish("t1", 3) == 1
+    index, _ = faiss_index.load_index("t1")
+    assert index.ntotal == 3
+
+    assert publish("t1", 5) == 2
+    assert faiss_index.load_index("t1")[0] is index
+
+    faiss_index.refresh_index("t1")
+    assert faiss_index.load_index("t1")[0].ntotal == 5
+    assert faiss_index.read_manifest("t1")["generation"] == 2
+    faiss_index.invalidate_index("t1")
+
+
+def test_old_generations_are_garbage_collected(tmp_path, monkeypatch):
+    monkeypatch.setattr(faiss_index, "INDEX_DIR", str(tmp_path))
+    monkeypatch.setattr(faiss_index.settings, "index_generations_keep", 2)
+
+    for count in (1, 2, 3):
+        publish("t2", count)
+
+    assert sorted(os.listdir(faiss_index.tenant_dir("t2"))) == ["gen-00000002", "gen-00000003", "manifest.json"]
+    faiss_index.remove_index_files("t2")
+    assert faiss_index.read_index_files("t2") is None
+
+
+def test_watcher_refreshes_tenants_whose_manifest_changed(tmp_path, monkeypatch):
+    monkeypatch.setattr(faiss_index, "INDEX_DIR", str(tmp_path))
+    publish("t3", 2)
+    refreshed = []
+    watcher = IndexWatcher(refreshed.append, lambda: ["t3"], faiss_index.manifest_path, poll_interval=0)
+
+    watcher.poll_once()
+    watcher.poll_once()
+    assert refreshed == ["t3"]
+
+    os.utime(faiss_index.manifest_path("t3"), ns=(0, 0))
+    watcher.poll_once()
+    assert refreshed == ["t3", "t3"]
+
+
+def add_notes(tenant_id, prefix, count):
+    """Add `count` notes one read-modify-publish cycle at a time, as API workers do."""
+    for i in range(count):
+        with faiss_index.tenant_write_lock(tenant_id):
+            index, store = faiss_index.read_index_files(tenant_id)
+            store = index_service._add_chunks(index, store, [[float(i)] * 4], [{"note_id": f"{prefix}{i}", "text": ""}])
+            faiss_index.write_index_files(tenant_id, index, store)
+
+
+def test_writers_in_other_processes_do_not_lose_updates(tmp_path, monkeypatch):
+    monkeypatch.setattr(faiss_index, "INDEX_DIR", str(tmp_path))
+    publish("t4", 1)
+    context = multiprocessing.get_context("fork")
+    writers = [context.Process(target=add_notes, args=("t4", prefix, 10)) for prefix in ("a", "b")]
+
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join(timeout=60)
+
+    assert [writer.exitcode for writer in writers] == [0, 0]
+    index, store = faiss_index.read_index_files("t4")
+    assert index.ntotal == len(store) == 21
+    assert faiss_index.read_manifest("t4")["generation"] == 21
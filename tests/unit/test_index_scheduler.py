@@ -0,0 +1,99 @@
+"""
+Tests for the debounced, single-flight index scheduler.
+"""
+import threading
+import time
+
+from backend.app.services.index_scheduler import IndexScheduler
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_writes_within_window_are_coalesced():
+    calls = []
+    scheduler = IndexScheduler(0.05, runner=lambda *args: calls.append(args) or True)
+
+    for i in range(5):
+        scheduler.schedule_note("t1", f"n{i}")
+    scheduler.schedule_note("t1", "n0", deleted=True)
+
+    assert wait_until(lambda: scheduler.stats()["t1"]["builds"] == 1)
+    assert len(calls) == 1
+    tenant_id, upserts, deletes, full_rebuild = calls[0]
+    assert upserts == {"n1", "n2", "n3", "n4"}
+    assert deletes == {"n0"}
+    assert not full_rebuild
+
+
+def test_writes_during_build_mark_tenant_dirty():
+    release = threading.Event()
+    running = []
+    calls = []
+
+    def runner(tenant_id, upserts, deletes, full_rebuild):
+        running.append(1)
+        assert len(running) == 1, "builds for one tenant must not overlap"
+        calls.append(set(upserts))
+        release.wait(2)
+        running.pop()
+        return True
+
+    scheduler = IndexScheduler(0.01, runner=runner)
+    scheduler.schedule_note("t1", "a")
+    assert wait_until(lambda: scheduler.stats()["t1"]["building"])
+
+    scheduler.schedule_note("t1", "b")
+    assert scheduler.stats()["t1"]["dirty"]
+    assert scheduler.stats()["t1"]["queue_depth"] == 1
+    release.set()
+
+    assert wait_until(lambda: scheduler.stats()["t1"]["builds"] == 2)
+    assert calls == [{"a"}, {"b"}]
+    assert scheduler.stats()["t1"]["last_build_seconds"] is not None
+
+
+def test_failed_update_promotes_next_to_full_rebuild():
+    calls = []
+    scheduler = IndexScheduler(0.01, runner=lambda *args: calls.append(args) and False, retry_base_seconds=0.5)
+
+    scheduler.schedule_note("t1", "a")
+    assert wait_until(lambda: scheduler.stats()["t1"]["failures"] == 1)
+    scheduler.schedule_note("t1", "b")
+
+    # The write waits for the retry rather than opening its own window
+    assert wait_until(lambda: len(calls) == 2)
+    assert calls[1][1] == {"b"} and calls[1][3] is True
+
+
+def test_failed_update_is_retried_with_capped_backoff():
+    calls = []
+
+    def runner(*args):
+        calls.append(time.monotonic())
+        return len(calls) == 4
+
+    scheduler = IndexScheduler(
+        0.01,
+        runner=runner,
+        retry_base_seconds=0.1,
+        retry_max_seconds=0.2,
+    )
+
+    scheduler.schedule_note("t1", "a")
+
+    # Retried without further writes until an update succeeds
+    assert wait_until(lambda: scheduler.stats()["t1"]["builds"] == 4, timeout=5)
+    delays = [later - earlier for earlier, later in zip(calls, calls[1:])]
+    # 0.1s, doubled to 0.2s, then capped at 0.2s rather than 0.4s
+    assert 0.1 <= delays[0] and 0.2 <= delays[1] and 0.2 <= delays[2] < 0.4
+    stats = scheduler.stats()["t1"]
+    assert stats["failures"] == 3 and stats["consecutive_failures"] == 0
+    time.sleep(0.3)
+    assert len(calls) == 4
@@ -0,0 +1,125 @@
+"""
+Tests for incremental FAISS index maintenance.
+"""
+from types import SimpleNamespace
+from uuid import uuid4
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import backend.app.models.task  # noqa: F401 (maps Note.tasks for the session tests)
+from backend.app.models.base import Base
+from backend.app.models.note import Note
+from backend.app.models.tenant import Tenant
+from backend.app.models.user import User
+from backend.app.rag.chunk_store import ChunkStore
+from backend.app.services import index_service
+
+
+DIM = 8
+
+
+def make_index(note_chunks):
+    """Build an index with `note_chunks` = {note_id: number of chunks}."""
+    rng = np.random.default_rng(0)
+    store = ChunkStore.empty("t1")
+    index = index_service.build_index(np.zeros((0, DIM), dtype=np.float32), np.zeros(0, dtype=np.int64), kind="hnsw")
+    for note_id, count in note_chunks.items():
+        vectors = rng.random((count, DIM), dtype=np.float32).tolist()
+        metas = [{"note_id": note_id, "user_id": "u1", "text": f"{note_id}-{i}"} for i in range(count)]
+        store = index_service._add_chunks(index, store, vectors, metas)
+    assert index.ntotal == sum(note_chunks.values())
+    return index, store
+
+
+def test_update_tombstones_old_chunks_and_keeps_ids_stable():
+    index, store = make_index({"a": 3, "b": 2})
+    b_ids = store.ids_for_notes(["b"]).tolist()
+
+    store = index_service._drop_note_chunks(index, store, ["a"])
+    store = index_service._add_chunks(index, store, np.ones((2, DIM)).tolist(), [{"note_id": "a", "text": "new"}] * 2)
+
+    assert store.tombstones == {0, 1, 2}
+    assert store.ids_for_notes(["b"]).tolist() == b_ids
+    assert store.ids_for_notes(["a"]).tolist() == [5, 6]
+    assert store.ids.tolist() == [3, 4, 5, 6]
+    assert [r["text"] for r in store.records([4, 5])] == ["b-1", "new"]
+
+
+def test_compaction_drops_tombstones_without_reembedding():
+    index, store = make_index({"a": 3, "b": 2})
+    expected = index.reconstruct(3)
+    store = index_service._drop_note_chunks(index, store, ["a"])
+    assert index_service._needs_compaction(index, store)
+
+    compacted, store = index_service._compact(index, store)
+
+    assert compacted.ntotal == 2
+    assert store.tombstones == set()
+    np.testing.assert_array_equal(compacted.reconstruct(3), expected)
+
+
+def test_note_chunks_are_embedded_once_and_kept_across_edits(monkeypatch):
+    embedded = []
+
+    def compute_embeddings(texts):
+        embedded.extend(texts)
+        return [[float(len(t))] * DIM for t in texts]
+
+    monkeypatch.setattr(index_service, "compute_embeddings", compute_embeddings)
+    monkeypatch.setattr(index_service, "get_embedding_service", lambda: SimpleNamespace(model="m1"))
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    tenant_id, user_id = uuid4(), uuid4()
+    db.add(Tenant(id=tenant_id, name="acme"))
+    db.add(User(id=user_id, tenant_id=tenant_id, username="ann", email="ann@example.com", hashed_password="x"))
+    paragraphs = [f"Paragraph {i}: " + "budget review " * 30 for i in range(3)]
+    note = Note(tenant_id=tenant_id, user_id=user_id, content="\n\n".join(paragraphs))
+    index_service.refresh_note_chunks(note)
+    db.add(note)
+    db.commit()
+    assert [c.ordinal for c in note.chunks] == [0, 1, 2] and all(c.token_count > 0 for c in note.chunks)
+
+    vectors, metas = index_service.load_note_chunks(db, str(tenant_id))
+    assert len(embedded) == 3 and len(vectors) == 3
+    assert [m["text"] for m in metas] == embedded and metas[0]["tokens"] == note.chunks[0].token_count
+
+    # A rebuild reads the stored embeddings; an edit re-embeds only changed chunks
+    assert np.array_equal(index_service.load_note_chunks(db, str(tenant_id))[0], vectors)
+    note.content = "\n\n".join(paragraphs[:2] + ["A new ending " * 20])
+    index_service.refresh_note_chunks(note)
+    db.commit()
+    vectors, metas = index_service.load_note_chunks(db, str(tenant_id), [str(note.id)])
+    assert len(embedded) == 4 and embedded[-1].startswith("A new ending")
+    assert len(vectors) == 3
+    db.close()
+
+
+def test_chunks_whose_embedding_fails_are_skipped_and_retried(monkeypatch):
+    def compute_embeddings(texts):
+        if any(t.startswith("Broken") for t in texts):
+            raise RuntimeError("embedding failed")
+        return [[1.0] * DIM for _ in texts]
+
+    monkeypatch.setattr(index_service, "compute_embeddings", compute_embeddings)
+    monkeypatch.setattr(index_service, "get_embedding_service", lambda: SimpleNamespace(model="m1"))
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    tenant_id, user_id = uuid4(), uuid4()
+    db.add(Tenant(id=tenant_id, name="acme"))
+    db.add(User(id=user_id, tenant_id=tenant_id, username="ann", email="ann@example.com", hashed_password="x"))
+    for content in ["Budget review", "Broken chunk"]:
+        note = Note(tenant_id=tenant_id, user_id=user_id, content=content)
+        index_service.refresh_note_chunks(note)
+        db.add(note)
+    db.commit()
+
+    vectors, metas = index_service.load_note_chunks(db, str(tenant_id))
+
+    assert [m["text"] for m in metas] == ["Budget review"] and len(vectors) == 1
+    stored = {c.text: c.embedding for n in db.query(Note) for c in n.chunks}
+    assert stored["Budget review"] is not None and stored["Broken chunk"] is None
+    db.close()
@@ -0,0 +1,66 @@
+"""
+Tests for size-tiered index families.
+"""
+import numpy as np
+
+from backend.app.rag import faiss_index, index_types
+from backend.app.services import index_service
+
+
+DIM = 16
+
+
+def test_index_family_follows_tenant_size(monkeypatch):
+    monkeypatch.setattr(index_types.settings, "index_type", "auto")
+    monkeypatch.setattr(index_types.settings, "index_flat_max_vectors", 100)
+    monkeypatch.setattr(index_types.settings, "index_memory_target_bytes", 10_000 * DIM * 4)
+
+    assert index_types.choose_index_type(50, DIM) == index_types.FLAT
+    assert index_types.choose_index_type(1_000, DIM) == index_types.HNSW
+    assert index_types.choose_index_type(20_000, DIM) == index_types.IVF_SQ8
+    assert index_types.choose_index_type(100_000, DIM) == index_types.IVF_PQ
+    # Shrinking just below a boundary does not trigger a rebuild
+    assert not index_types.should_retier(index_types.HNSW, 90, DIM)
+    assert index_types.should_retier(index_types.HNSW, 10, DIM)
+
+
+def test_quantized_index_is_reranked_against_stored_vectors(tmp_path, monkeypatch):
+    monkeypatch.setattr(faiss_index, "INDEX_DIR", str(tmp_path))
+    monkeypatch.setattr(index_types.settings, "index_type", "ivf_sq8")
+    vectors = np.random.default_rng(0).random((2_000, DIM), dtype=np.float32).tolist()
+    metas = [{"note_id": f"n{i}", "user_id": "u1" if i % 2 else "u2", "text": str(i)} for i in range(2_000)]
+
+    index, store = index_service.build_tenant_index("t1", vectors, metas)
+    assert index_types.index_type(index) == index_types.IVF_SQ8
+    assert store.vectors is not None
+    faiss_index.write_index_files("t1", index, store)
+    faiss_index.invalidate_index("t1")
+
+    query = np.asarray(vectors[7], dtype=np.float32)
+    results = faiss_index.search_vectors("t1", query, top_k=3)
+    assert results[0]["chunk_id"] == 7
+    assert results[0]["score"] == 0.0
+    assert results[0]["index_type"] == "ivf_sq8"
+    assert "approx_score" in results[0]
+
+    filtered = faiss_index.search_vectors("t1", query, top_k=3, filters={"user_id": "u2"})
+    assert all(r["user_id"] == "u2" for r in filtered)
+    faiss_index.invalidate_index("t1")
+
+
+def test_tuned_search_params_are_applied_on_load_and_scaled_by_quality(tmp_path, monkeypatch):
+    monkeypatch.setattr(faiss_index, "INDEX_DIR", str(tmp_path))
+    monkeypatch.setattr(index_types.settings, "index_type", "hnsw")
+    monkeypatch.setattr(index_types.settings, "search_ef_max", 64)
+    vectors = np.random.default_rng(0).random((200, DIM), dtype=np.float32).tolist()
+    index, store = index_service.build_tenant_index("t2", vectors, [{"note_id": "n", "text": "x"}] * 200)
+    faiss_index.write_index_files("t2", index, store)
+
+    faiss_index.write_search_params("t2", {"efSearch": 40})
+    faiss_index.invalidate_index("t2")
+    loaded, _ = faiss_index.load_index("t2")
+
+    assert index_types.search_parameters(loaded, None).efSearch == 40
+    assert index_types.search_parameters(loaded, None, "fast").efSearch == 20
+    assert index_types.search_parameters(loaded, None, "accurate").efSearch == 64
+    faiss_index.invalidate_index("t2")
@@ -0,0 +1,195 @@
+"""
+Tests for the streaming and async knowledge assistant.
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Query, sessionmaker
+
+import backend.app.models.task  # noqa: F401 (maps Note.tasks for the session tests)
+from backend.app.models.base import Base
+from backend.app.models.note import Note
+from backend.app.models.tenant import Tenant
+from backend.app.models.user import User
+from backend.app.rag import answer_cache, faiss_index
+from backend.app.rag.chunk_store import ChunkStore
+from backend.app.services import index_service, rag_service
+
+
+def test_stream_assistant_sends_chunks_before_answer_and_tasks(monkeypatch):
+    monkeypatch.setattr(rag_service, "summarise_stream", lambda chunks, query: iter(["Budget ", "review "]))
+    monkeypatch.setattr(
+        rag_service, "note_tasks", lambda db, tenant_id, note_ids: [{"description": "Send report", "due_date": None}]
+    )
+    results = [{"chunk_id": 1, "note_id": "n1", "text": "budget review on monday"}]
+
+    ranking = {"selected": 1}
+    events = list(rag_service.stream_assistant(None, "t1", "budget", "u1", results, ranking))
+
+    assert [event for event, _ in events] == ["chunks", "answer", "answer", "tasks", "done"]
+    assert events[0][1] == {"chunks": results, "ranking": ranking}
+    assert ranking["selected"] == 1 and ranking["packed_tokens"] > 0
+    assert events[-1][1] == {
+        "answer": "Budget review",
+        "chunks": results,
+        "tasks": [{"description": "Send report", "due_date": None}],
+        "ranking": ranking,
+    }
+
+
+def test_stream_assistant_without_results():
+    events = list(rag_service.stream_assistant(None, "t1", "budget", None, [], {}))
+
+    assert events[1] == ("answer", {"delta": "No relevant notes found."})
+    assert events[-1][1]["answer"] == "No relevant notes found."
+    assert events[-1][1]["tasks"] == []
+
+
+def test_query_assistant_async_reads_tasks_during_summary_with_timeout(monkeypatch):
+    results = [{"chunk_id": 1, "note_id": "n1", "text": "budget review on monday"}]
+
+    async def summarise_async(chunks, query):
+        await asyncio.sleep(0.2)
+        return "Budget review"
+
+    def note_tasks(db, tenant_id, note_ids):
+        time.sleep(0.2)
+        return [{"description": "Send report", "due_date": None}]
+
+    monkeypatch.setattr(rag_service, "retrieve_chunks", lambda *args: (results, {"selected": 1}))
+    monkeypatch.setattr(rag_service, "summarise_async", summarise_async)
+    monkeypatch.setattr(rag_service, "note_tasks", note_tasks)
+
+    started = time.perf_counter()
+    result = asyncio.run(rag_service.query_assistant_async(None, "t1", "budget"))
+    assert time.perf_counter() - started < 0.35
+    assert result["answer"] == "Budget review"
+    assert result["tasks"] == [{"description": "Send report", "due_date": None}]
+
+    monkeypatch.setattr(rag_service.settings, "llm_summary_timeout_seconds", 0.05)
+    result = asyncio.run(rag_service.query_assistant_async(None, "t1", "budget"))
+    assert result["answer"] == "budget review on monday"
+    assert len(result["tasks"]) == 1
+
+
+
+def test_empty_answers_fall_back_and_are_not_cached(monkeypatch):
+    cached = []
+    monkeypatch.setattr(answer_cache, "_enabled", lambda: True)
+    monkeypatch.setattr(answer_cache, "cache_get", lambda key: None)
+    monkeypatch.setattr(answer_cache, "cache_set", lambda key, value, ttl: cached.append(value))
+    monkeypatch.setattr(rag_service, "summarise_stream", lambda chunks, query: iter(["", " "]))
+    monkeypatch.setattr(rag_service, "summarise", lambda chunks, query: None)
+    monkeypatch.setattr(rag_service, "note_tasks", lambda db, tenant_id, note_ids: [])
+    results = [{"chunk_id": 1, "note_id": "n1", "text": "budget review on monday"}]
+    monkeypatch.setattr(rag_service, "retrieve_chunks", lambda *args: (results, {}))
+
+    events = list(rag_service.stream_assistant(None, "t1", "budget", None, results, {}))
+    assert ("answer", {"delta": "budget review on monday"}) in events
+    assert events[-1][1]["answer"] == "budget review on monday"
+
+    assert rag_service.query_assistant(None, "t1", "budget")["answer"] == "budget review on monday"
+    assert cached == []
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def _keyword_notes(db, notes):
+    """Store `notes` = [(title, content, chunked)] for a new tenant; return its ID and the notes."""
+    tenant_id, user_id = uuid4(), uuid4()
+    db.add(Tenant(id=tenant_id, name=f"acme-{tenant_id}"))
+    db.add(User(id=user_id, tenant_id=tenant_id, username="ann", email=f"ann@{tenant_id}.com", hashed_password="x"))
+    stored = []
+    for title, content, chunked in notes:
+        note = Note(tenant_id=tenant_id, user_id=user_id, title=title, content=content)
+        if chunked:
+            index_service.refresh_note_chunks(note)
+        stored.append(note)
+    db.add_all(stored)
+    db.commit()
+    return str(tenant_id), stored
+
+
+def _keyword_search(db, tenant_id, query, top_k=10):
+    return rag_service._keyword_search(db, tenant_id, query, None, None, None, None, top_k)
+
+
+def test_keyword_search_falls_back_to_ilike_and_scores_chunks_by_term_coverage(db, monkeypatch):
+    def load_index(tenant_id):
+        raise ValueError("no index")
+
+    monkeypatch.setattr(faiss_index, "load_index", load_index)
+    tenant_id, (both, title_only, legacy, _) = _keyword_notes(db, [
+        (None, "Budget review on Monday", True),
+        ("Budget", "Plan the offsite", True),
+        (None, "Quarterly REVIEW notes", False),
+        (None, "Lunch with Bob", True),
+    ])
+
+    results = _keyword_search(db, tenant_id, "budget, review?")
+
+    by_note = {r["note_id"]: r for r in results}
+    assert set(by_note) == {str(both.id), str(title_only.id), str(legacy.id)}
+    assert by_note[str(both.id)]["score"] == 1.0
+    # A note written before chunks were stored is split on the fly
+    assert by_note[str(legacy.id)]["text"] == "Quarterly REVIEW notes" and by_note[str(legacy.id)]["score"] == 0.5
+    # Matched on its title only: its first chunk is kept at a floor score
+    assert by_note[str(title_only.id)]["score"] == 0.25
+    assert by_note[str(both.id)]["tokens"] == both.chunks[0].token_count
+    assert results[0]["note_id"] == str(both.id)
+    assert _keyword_search(db, tenant_id, "?!") == []
+
+
+def test_keyword_search_scores_chunks_stored_with_the_index(db, monkeypatch):
+    tenant_id, (indexed, unindexed) = _keyword_notes(db, [
+        (None, "Budget review on Monday", True),
+        (None, "Review the budget draft", True),
+    ])
+    # The index holds two chunks of the first note; it is not re-chunked from its content
+    records = [
+        {"note_id": str(indexed.id), "user_id": "u1", "text": "Agenda: budget"},
+        {"note_id": str(indexed.id), "user_id": "u1", "text": "Budget review follow-up"},
+    ]
+    store = ChunkStore.build(tenant_id, [7, 8], records)
+    monkeypatch.setattr(faiss_index, "load_index", lambda tenant_id: (None, store))
+
+    results = _keyword_search(db, tenant_id, "budget review")
+
+    assert [(r["note_id"], r.get("chunk_id"), r["score"]) for r in results] == [
+        (str(indexed.id), 8, 1.0),
+        (str(unindexed.id), None, 1.0),
+        (str(indexed.id), 7, 0.5),
+    ]
+    assert results[1]["text"] == "Review the budget draft"
+
+
+def test_postgres_keyword_search_builds_a_tsquery_of_words_only(db, monkeypatch):
+    tenant_id, _ = _keyword_notes(db, [])
+    statements = []
+
+    def all_(query):
+        statements.append(query.statement.compile(dialect=postgresql.dialect()))
+        return []
+
+    monkeypatch.setattr(db, "get_bind", lambda *args, **kwargs: SimpleNamespace(dialect=postgresql.dialect()))
+    monkeypatch.setattr(Query, "all", all_)
+
+    # Punctuation that is tsquery syntax (& | ! : ( ) ') never reaches to_tsquery
+    assert _keyword_search(db, tenant_id, "budget & (review) | Q3's plan: !draft", top_k=3) == []
+
+    (statement,) = statements
+    assert "to_tsquery" in str(statement) and "@@" in str(statement) and "ts_rank_cd" in str(statement)
+    assert "budget | review | q3 | s | plan | draft" in statement.params.values()
+    assert 6 in statement.params.values()
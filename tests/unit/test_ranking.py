@@ -0,0 +1,36 @@
+"""
+Tests for result fusion and near-duplicate pruning.
+"""
+import numpy as np
+
+from backend.app.rag.ranking import mmr_select, reciprocal_rank_fusion, similarity_matrix
+
+
+def test_reciprocal_rank_fusion_merges_shared_results():
+    semantic = [{"chunk_id": 1, "text": "a"}, {"chunk_id": 2, "text": "b"}, {"chunk_id": 3, "text": "c"}]
+    keyword = [{"chunk_id": 3, "text": "c"}, {"chunk_id": 4, "text": "d"}]
+
+    fused = reciprocal_rank_fusion([semantic, keyword], key=lambda r: r["chunk_id"], k=60)
+
+    # Chunk 3 is ranked by both retrievers and overtakes the semantic-only top hit
+    assert [r["chunk_id"] for r in fused] == [3, 1, 2, 4]
+    assert fused[0]["rrf_score"] == 1 / 63 + 1 / 61
+
+
+def test_mmr_prunes_near_duplicates_and_prefers_diverse_chunks():
+    base = np.array([1.0, 0.0, 0.0])
+    vectors = [base, base + [0.0, 0.01, 0.0], np.array([0.7, 0.7, 0.0]), np.array([0.0, 0.0, 1.0])]
+    sims = similarity_matrix(vectors, ["a", "b", "c", "d"])
+
+    selected, pruned = mmr_select(np.array([1.0, 0.95, 0.9, 0.5]), sims, top_k=3, lambda_=0.7)
+
+    assert pruned == [1]
+    assert selected == [0, 2, 3]
+
+
+def test_similarity_falls_back_to_token_overlap_without_vectors():
+    texts = ["budget meeting on monday", "budget meeting on monday!", "garden plans"]
+    sims = similarity_matrix([np.array([1.0, 0.0]), None, None], texts)
+
+    assert sims[0, 1] == 1.0
+    assert sims[0, 2] == 0.0
@@ -0,0 +1,65 @@
+"""
+Tests for schema-validated JSON-mode task extraction.
+"""
+import json
+from types import SimpleNamespace
+
+import openai
+
+from backend.app.rag import structured_answer, task_extraction
+
+
+def completion(content):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(prompt_tokens=100, completion_tokens=20),
+    )
+
+
+class StubOpenAI:
+    """Stands in for the OpenAI client, recording each request."""
+
+    requests = []
+    reply = ""
+
+    def __init__(self, api_key):
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, **request):
+        StubOpenAI.requests.append(request)
+        return completion(StubOpenAI.reply)
+
+
+def test_parse_validates_against_schema():
+    reply = {"tasks": [{"description": " Send report ", "due_date": "2024-05-01"}, {"description": "Call Bob"}]}
+    before = structured_answer.structured_answer_stats()
+
+    assert structured_answer.parse_tasks(completion(json.dumps(reply))) == [
+        {"description": "Send report", "due_date": "2024-05-01"},
+        {"description": "Call Bob", "due_date": None},
+    ]
+    assert structured_answer.parse_tasks(completion('{"tasks": []}')) == []
+    assert structured_answer.parse_tasks(completion('[{"description": "Send report"}]')) is None
+    assert structured_answer.parse_tasks(completion('{"tasks": [{"due_date": null}]}')) is None
+    assert structured_answer.parse_tasks(completion("not json")) is None
+
+    after = structured_answer.structured_answer_stats()
+    assert after["calls"] - before["calls"] == 5
+    assert after["invalid"] - before["invalid"] == 3
+    assert after["prompt_tokens"] - before["prompt_tokens"] == 500
+
+
+def test_extract_tasks_uses_json_mode_and_parses_invalid_replies_with_regexes(monkeypatch):
+    monkeypatch.setattr(task_extraction.settings, "openai_api_key", "sk-test")
+    monkeypatch.setattr(openai, "OpenAI", StubOpenAI)
+    monkeypatch.setattr(StubOpenAI, "requests", [])
+
+    monkeypatch.setattr(StubOpenAI, "reply", '{"tasks": [{"description": "Send report", "due_date": null}]}')
+    assert task_extraction.extract_tasks(["Send the report"]) == [{"description": "Send report", "due_date": None}]
+    (request,) = StubOpenAI.requests
+    assert request["response_format"] == {"type": "json_object"}
+    assert "JSON" in request["messages"][0]["content"]
+
+    # A reply that is not the JSON-mode object is still read by the regex parser
+    monkeypatch.setattr(StubOpenAI, "reply", '```json\n[{"description": "Call Bob"}]\n```')
+    assert task_extraction.extract_tasks(["Call Bob"]) == [{"description": "Call Bob", "due_date": None}]
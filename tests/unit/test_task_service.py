@@ -0,0 +1,166 @@
+"""
+Tests for write-time task extraction.
+"""
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.models.base import Base
+from backend.app.models.note import Note
+from backend.app.models.task import Task
+from backend.app.models.tenant import Tenant
+from backend.app.models.user import User
+from backend.app.services import task_service
+
+
+@pytest.fixture
+def db(monkeypatch):
+    # Tasks come from the "TODO:" heuristic, never the API
+    monkeypatch.setattr(task_service.settings, "openai_api_key", "")
+    monkeypatch.setattr(task_service, "cached", lambda key, compute: compute())
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def _notes(db, count):
+    tenant_id, user_id = uuid4(), uuid4()
+    db.add(Tenant(id=tenant_id, name=f"acme-{tenant_id}"))
+    db.add(User(id=user_id, tenant_id=tenant_id, username="ann", email=f"ann@{tenant_id}.com", hashed_password="x"))
+    notes = [
+        Note(tenant_id=tenant_id, user_id=user_id, content=f"TODO: Call Bob\nTODO: Draft report {i}")
+        for i in range(count)
+    ]
+    db.add_all(notes)
+    db.commit()
+    return str(tenant_id), notes
+
+
+def test_extract_note_tasks_stores_tasks_per_note_in_constant_round_trips(db):
+    tenant_id, _ = _notes(db, 5)
+    notes = task_service.stale_notes(db, tenant_id)
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    assert task_service.extract_note_tasks(db, notes) == (5, set())
+
+    assert len(statements) == 3
+    for note in notes:
+        assert sorted(t.description for t in note.tasks) == ["Call Bob", note.content.split(": ")[-1]]
+    assert task_service.stale_notes(db, tenant_id) == []
+    assert task_service.extract_note_tasks(db, notes) == (0, set())
+
+
+def _statements(db, notes):
+    """Run `extract_note_tasks` and return the SQL statements it sent."""
+    statements = []
+
+    def record(*args):
+        statements.append(args[2])
+
+    event.listen(db.get_bind(), "before_cursor_execute", record)
+    try:
+        task_service.extract_note_tasks(db, notes)
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", record)
+    return statements
+
+
+def test_saving_tasks_costs_the_same_round_trips_for_any_number_of_notes(db):
+    few, _ = _notes(db, 1)
+    many, _ = _notes(db, 20)
+    assert len(_statements(db, task_service.stale_notes(db, few))) == len(
+        _statements(db, task_service.stale_notes(db, many))
+    )
+
+    # Edits replace the notes' open tasks, adding a delete
+    for note in db.query(Note):
+        note.content = "TODO: Book venue"
+        note.updated_at = datetime.utcnow() + timedelta(seconds=1)
+    db.commit()
+    edited_few = _statements(db, task_service.stale_notes(db, few))
+    edited_many = _statements(db, task_service.stale_notes(db, many))
+    assert len(edited_few) == len(edited_many)
+    assert any(statement.startswith("DELETE") for statement in edited_many)
+
+
+def test_note_update_replaces_extracted_open_tasks_only(db):
+    tenant_id, (note,) = _notes(db, 1)
+    # Stored by search-time extraction, before tasks had a source
+    db.add(Task(tenant_id=note.tenant_id, user_id=note.user_id, note_id=note.id, description="Pay rent"))
+    db.commit()
+    task_service.extract_note_tasks(db, [note])
+    done = next(t for t in note.tasks if t.description == "Call Bob")
+    done.status = "completed"
+    note.content = "TODO: Call Bob\nTODO: Book venue"
+    note.updated_at = datetime.utcnow() + timedelta(seconds=1)
+    db.commit()
+
+    assert task_service.stale_notes(db, tenant_id, {str(note.id)}) == [note]
+    task_service.extract_note_tasks(db, task_service.stale_notes(db, tenant_id))
+
+    # "Draft report 0" is gone; the completed task is not added again
+    tasks = sorted((t.description, t.status) for t in db.query(Task).filter(Task.note_id == note.id))
+    assert tasks == [("Book venue", "open"), ("Call Bob", "completed"), ("Pay rent", "open")]
+
+
+def test_failed_notes_are_retried_alone(db, monkeypatch):
+    tenant_id, (legacy, flaky, fine) = _notes(db, 3)
+    monkeypatch.setattr(task_service, "_retry", {})
+    monkeypatch.setattr(task_service, "SessionLocal", sessionmaker(bind=db.get_bind()))
+    monkeypatch.setattr(task_service, "cache_delete_pattern", lambda pattern: 0)
+    extract = task_service._extract
+    failing = {flaky.id}
+
+    def extract_once(note):
+        if note.id in failing:
+            failing.discard(note.id)
+            raise RuntimeError("LLM unavailable")
+        return extract(note)
+
+    monkeypatch.setattr(task_service, "_extract", extract_once)
+
+    assert not task_service._run_task_job(tenant_id, {str(flaky.id), str(fine.id)}, set(), False)
+    assert task_service._retry == {tenant_id: {str(flaky.id)}}
+    # After a failure the scheduler asks for a full run, which retries only the failed note
+    assert task_service._run_task_job(tenant_id, set(), set(), True)
+
+    db.expire_all()
+    assert task_service.stale_notes(db, tenant_id) == [legacy]
+    assert task_service._retry == {}
+    assert {t.note_id for t in db.query(Task)} == {flaky.id, fine.id}
+
+
+def test_retries_pick_up_edited_notes_failed_elsewhere(db, monkeypatch):
+    tenant_id, (legacy, edited) = _notes(db, 2)
+    task_service.extract_note_tasks(db, [edited])
+    edited.content = "TODO: Book venue"
+    db.commit()
+    # Another worker's extraction of the edit failed; this one has no record of it
+    monkeypatch.setattr(task_service, "_retry", {})
+    monkeypatch.setattr(task_service, "SessionLocal", sessionmaker(bind=db.get_bind()))
+    monkeypatch.setattr(task_service, "cache_delete_pattern", lambda pattern: 0)
+
+    assert task_service._run_task_job(tenant_id, set(), set(), True)
+
+    db.expire_all()
+    assert task_service.stale_notes(db, tenant_id) == [legacy]
+    assert [t.description for t in db.query(Task).filter(Task.note_id == edited.id)] == ["Book venue"]
+
+
+def test_note_tasks_follow_note_rank(db):
+    tenant_id, notes = _notes(db, 2)
+    task_service.extract_note_tasks(db, notes)
+
+    tasks = task_service.note_tasks(db, tenant_id, [str(notes[1].id), str(notes[0].id), "not-a-uuid"])
+
+    assert [t["description"] for t in tasks if t["description"].startswith("Draft")] == [
+        "Draft report 1",
+        "Draft report 0",
+    ]
+    assert all(t["due_date"] is None for t in tasks)